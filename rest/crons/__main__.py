@@ -19,10 +19,7 @@ import sys
 import traceback
 
 # Pip imports
-from RestOC import Conf, Record_Base, Record_ReDB, REST, Services
-
-# Shared imports
-from shared import EMail
+from RestOC import Conf, EMail, Record_Base, Record_MySQL, REST, Services
 
 # If the version argument is missing
 if len(sys.argv) < 2:
@@ -37,7 +34,15 @@ if os.path.isfile(sConfOverride):
 
 # Add the global prepend and primary host to mysql
 Record_Base.db_prepend(Conf.get(("mysql", "prepend"), ''))
-Record_ReDB.add_host('primary', Conf.get(("mysql", "hosts", "primary")))
+Record_MySQL.add_host('primary', Conf.get(("mysql", "hosts", "primary")))
+
+# Set the timestamp timezone
+Record_MySQL.timestamp_timezone(
+	Conf.get(('mysql', 'timestamp_timezone'), '+00:00')
+)
+
+# Init email
+EMail.init(Conf.get('email'))
 
 # Register all services
 Services.register(
@@ -65,7 +70,7 @@ try:
 except Exception as e:
 
 	# Send an email about the error
-	EMail.error('TIMS Cron Failed', '%s\n\n%s' % (
+	EMail.error('TIMS Cron Failed\n\n%s\n\n%s' % (
 		', '.join([str(s) for s in e.args]),
 		traceback.format_exc()
 	))
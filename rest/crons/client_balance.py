@@ -0,0 +1,60 @@
+# coding=utf8
+""" Client Balance
+
+Compares the client balance ledger with the actual invoices and payments,
+reports any client that has drifted, and then resets every balance
+
+	python -m crons client_balance
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Pip imports
+from RestOC import EMail
+
+# Record imports
+from records import ClientBalance
+
+# Cron imports
+from . import isRunning
+
+def run():
+	"""Run
+
+	Entry point into the script
+
+	Returns:
+		int
+	"""
+
+	# If the cron is already running, do nothing
+	if isRunning('tims_client_balance'):
+		return 0
+
+	# Find any clients whose ledger doesn't match
+	lDrift = ClientBalance.drift()
+
+	# If there are any, report them
+	if lDrift:
+		lLines = ['%s invoiced %s / %s (%d / %d), paid %s / %s (%d / %d)' % (
+			d['client'],
+			d['invoiced'], d['invoiced_actual'],
+			d['invoices'], d['invoices_actual'],
+			d['paid'], d['paid_actual'],
+			d['payments'], d['payments_actual']
+		) for d in lDrift]
+		print('\n'.join(lLines))
+		EMail.error('TIMS Client Balance Drift\n\nledger / actual\n\n%s' % (
+			'\n'.join(lLines)
+		))
+
+	# Reset the balances
+	ClientBalance.rebuild()
+
+	# Notify and return OK
+	print('%d client balances drifted' % len(lDrift))
+	return 0
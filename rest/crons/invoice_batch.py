@@ -0,0 +1,94 @@
+# coding=utf8
+""" Invoice Batch
+
+Generates the invoices of every client, or the ones given, for a period, by
+default the previous month, and writes a report of the result of each client
+
+	python -m crons invoice_batch [start] [end] [client ...]
+
+start and end are dates (YYYY-MM-DD) in the local timezone, or timestamps, and
+the end date is included
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Pip imports
+import arrow
+
+# Service imports
+from services.primary import Primary
+
+# Shared imports
+from shared import InvoiceBatch
+
+# Cron imports
+from . import isRunning
+
+def _time(value):
+	"""Time
+
+	Converts a date or timestamp argument into an arrow instance
+
+	Arguments:
+		value (str): The date or timestamp
+
+	Returns:
+		arrow.Arrow
+	"""
+	if value.isdigit():
+		return arrow.get(int(value)).to('local')
+	return arrow.get(value, 'YYYY-MM-DD', tzinfo='local')
+
+def run(start=None, end=None, *clients):
+	"""Run
+
+	Entry point into the script
+
+	Arguments:
+		start (str): Optional, the first day of the period
+		end (str): Optional, the last day of the period
+		clients (str[]): Optional, the IDs of the clients
+
+	Returns:
+		int
+	"""
+
+	# If the cron is already running, do nothing
+	if isRunning('tims_invoice_batch'):
+		return 0
+
+	# Get the period, defaulting to the previous month
+	if start is None:
+		oStart = arrow.now().shift(months=-1).floor('month')
+		oEnd = oStart.ceil('month')
+	else:
+		oStart = _time(start).floor('day')
+		oEnd = end is None and oStart.ceil('month') or _time(end).ceil('day')
+
+	# Init the service so the cache and the queue are ready
+	Primary().initialise()
+
+	# Generate the invoices and write the report
+	dResults = InvoiceBatch.run(
+		oStart.int_timestamp,
+		oEnd.int_timestamp,
+		clients and list(clients) or None
+	)
+	sReport = InvoiceBatch.report(
+		oStart.int_timestamp, oEnd.int_timestamp, dResults
+	)
+
+	# Notify
+	print('%s to %s: %s' % (
+		oStart.format('YYYY-MM-DD'),
+		oEnd.format('YYYY-MM-DD'),
+		', '.join(['%d %s' % (v, k) for k, v in dResults['counts'].items()])
+	))
+	print('Report written to %s' % sReport)
+
+	# Return OK unless any client failed
+	return dResults['counts'][InvoiceBatch.FAILED] and 1 or 0
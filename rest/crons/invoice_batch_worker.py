@@ -0,0 +1,91 @@
+# coding=utf8
+""" Invoice Batch Worker
+
+Worker that generates the invoices of the batches requested through
+/admin/invoices as they are added to the queue, and writes a report of the
+result of each client. Runs until stopped, and is meant to be kept alive by
+supervisor. Only one should be run at a time
+
+	python -m crons invoice_batch_worker
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import traceback
+
+# Pip imports
+from RestOC import EMail
+
+# Service imports
+from services.primary import Primary
+
+# Shared imports
+from shared import InvoiceBatch, Jobs
+
+# Cron imports
+from . import isRunning
+
+# Defines
+QUEUE = 'invoice_batch'
+
+def run():
+	"""Run
+
+	Entry point into the script
+
+	Returns:
+		int
+	"""
+
+	# If the worker is already running, do nothing
+	if isRunning('tims_invoice_batch_worker'):
+		return 0
+
+	# Init the service so the cache and the queues are ready
+	Primary().initialise()
+
+	# Put back any batch the last worker didn't finish, any invoice it
+	#	already created is skipped on the next run
+	iRecovered = Jobs.recover(QUEUE)
+	if iRecovered:
+		print('Recovered %d batches' % iRecovered)
+
+	# Loop forever
+	while True:
+
+		# Wait for a batch
+		dJob = Jobs.pop(QUEUE)
+		if not dJob:
+			continue
+
+		# Generate the invoices and write the report, catching anything
+		#	unexpected so the worker stays up
+		dData = dJob['data']
+		try:
+			dResults = InvoiceBatch.run(
+				dData['start'], dData['end'], dData['clients']
+			)
+			sReport = InvoiceBatch.report(
+				dData['start'], dData['end'], dResults
+			)
+			mError = dResults['counts'][InvoiceBatch.FAILED] and \
+				'%d clients failed, see %s' % (
+					dResults['counts'][InvoiceBatch.FAILED], sReport
+				) or None
+		except Exception as e:
+			sTraceback = traceback.format_exc()
+			print(sTraceback)
+			EMail.error('TIMS Invoice Batch Failed\n\n%s\n\n%s' % (
+				dJob['_id'], sTraceback
+			))
+			sReport = None
+			mError = 'Invoice Batch Failed: %s' % str(e.args)
+
+		# Mark the batch as done
+		Jobs.done(QUEUE, dJob, mError)
+		print('%s %s %s' % (dJob['_id'], mError or 'OK', sReport or ''))
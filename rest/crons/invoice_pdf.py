@@ -0,0 +1,86 @@
+# coding=utf8
+""" Invoice PDF
+
+Worker that generates and uploads the PDFs of new invoices as they are added
+to the queue. Runs until stopped, and is meant to be kept alive by supervisor.
+Several workers can be run at once by giving each one a different number
+
+	python -m crons invoice_pdf [number]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import traceback
+
+# Pip imports
+from RestOC import EMail, Templates
+
+# Service imports
+from services.primary import Primary
+
+# Shared imports
+from shared import Jobs
+
+# Cron imports
+from . import isRunning
+
+# Defines
+QUEUE = 'invoice_pdf'
+
+def run(worker=None):
+	"""Run
+
+	Entry point into the script
+
+	Arguments:
+		worker (str): Optional, the number of the worker
+
+	Returns:
+		int
+	"""
+
+	# If the worker is already running, do nothing
+	sName = 'tims_invoice_pdf'
+	if worker is not None:
+		sName = '%s_%s' % (sName, worker)
+	if isRunning(sName):
+		return 0
+
+	# Init the templates and the service used to generate the PDFs
+	Templates.init('templates')
+	oPrimary = Primary()
+	oPrimary.initialise()
+
+	# Put back any jobs the last worker didn't finish
+	iRecovered = Jobs.recover(QUEUE, worker)
+	if iRecovered:
+		print('Recovered %d jobs' % iRecovered)
+
+	# Loop forever
+	while True:
+
+		# Wait for a job
+		dJob = Jobs.pop(QUEUE, worker=worker)
+		if not dJob:
+			continue
+
+		# Generate the PDF, catching anything unexpected so the worker stays
+		#	up
+		try:
+			mError = oPrimary._generate_invoice_pdf(dJob['_id'])
+		except Exception as e:
+			sTraceback = traceback.format_exc()
+			print(sTraceback)
+			EMail.error('TIMS Invoice PDF Failed\n\n%s\n\n%s' % (
+				dJob['_id'], sTraceback
+			))
+			mError = 'PDF Generation Failed: %s' % str(e.args)
+
+		# Mark the job as done
+		Jobs.done(QUEUE, dJob, mError)
+		print('%s %s' % (dJob['_id'], mError or 'OK'))
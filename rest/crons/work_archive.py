@@ -0,0 +1,55 @@
+# coding=utf8
+""" Work Archive
+
+Moves the months of work older than the configured number of months to the
+compressed archive table and drops their partitions. The daily totals aren't
+touched, so reports that use them still include archived work
+
+	python -m crons work_archive [months]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Pip imports
+from RestOC import Conf
+
+# Shared imports
+from shared import WorkPartitions
+
+# Cron imports
+from . import isRunning
+
+def run(months=None):
+	"""Run
+
+	Entry point into the script
+
+	Arguments:
+		months (str): Optional, the number of full months to keep, overrides
+			the config
+
+	Returns:
+		int
+	"""
+
+	# If the cron is already running, do nothing
+	if isRunning('tims_work_archive'):
+		return 0
+
+	# Get the months to keep
+	iMonths = months is None and \
+		Conf.get(('work', 'archive_months'), 36) or \
+		int(months)
+
+	# Archive the old months
+	dArchived = WorkPartitions.archive(iMonths)
+
+	# Notify and return OK
+	for sName, iCount in dArchived.items():
+		print('Archived %s, %d rows' % (sName, iCount))
+	print('Archived %d months of work' % len(dArchived))
+	return 0
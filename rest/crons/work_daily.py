@@ -0,0 +1,39 @@
+# coding=utf8
+""" Work Daily
+
+Rebuilds the daily work totals from scratch using the raw work records
+
+	python -m crons work_daily
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Record imports
+from records import WorkDaily
+
+# Cron imports
+from . import isRunning
+
+def run():
+	"""Run
+
+	Entry point into the script
+
+	Returns:
+		int
+	"""
+
+	# If the cron is already running, do nothing
+	if isRunning('tims_work_daily'):
+		return 0
+
+	# Rebuild the totals
+	iCount = WorkDaily.rebuild()
+
+	# Notify and return OK
+	print('Generated %d daily work totals' % iCount)
+	return 0
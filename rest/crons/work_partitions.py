@@ -0,0 +1,45 @@
+# coding=utf8
+""" Work Partitions
+
+Makes sure the work table has a partition for each of the coming months, run
+at least once a month
+
+	python -m crons work_partitions
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Pip imports
+from RestOC import Conf
+
+# Shared imports
+from shared import WorkPartitions
+
+# Cron imports
+from . import isRunning
+
+def run():
+	"""Run
+
+	Entry point into the script
+
+	Returns:
+		int
+	"""
+
+	# If the cron is already running, do nothing
+	if isRunning('tims_work_partitions'):
+		return 0
+
+	# Create any missing months
+	lNew = WorkPartitions.ensure(Conf.get(('work', 'partitions_ahead'), 3))
+
+	# Notify and return OK
+	print('Created %d work partitions%s' % (
+		len(lNew), lNew and (': %s' % ', '.join(lNew)) or ''
+	))
+	return 0
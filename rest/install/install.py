@@ -13,6 +13,9 @@ from RestOC import Conf, Record_MySQL
 # Records
 from records import install, Company, User
 
+# Shared
+from shared import WorkPartitions
+
 # Only run if called directly
 if __name__ == "__main__":
 
@@ -31,6 +34,10 @@ if __name__ == "__main__":
 	# Install
 	install()
 
+	# Partition the work table and create its archive
+	WorkPartitions.convert(Conf.get(('work', 'partitions_ahead'), 3))
+	WorkPartitions.archive_create()
+
 	# Install admin user
 	oUser = User({
 		'email': 'admin@localhost',
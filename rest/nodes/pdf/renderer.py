@@ -0,0 +1,445 @@
+# coding=utf8
+""" PDF Renderer
+
+Keeps a pool of wkhtmltopdf processes running, each started with
+--read-args-from-stdin so that it renders one document for every line of
+arguments it's sent instead of exiting, and accepts jobs on a unix socket. The
+cost of starting the process and Qt is paid once per process instead of once
+per PDF. A process that takes too long is killed and replaced, and each one is
+replaced after a number of jobs to keep its memory in check
+
+	python -m nodes.pdf.renderer
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import platform
+import queue
+import select
+import socketserver
+import subprocess
+import sys
+import tempfile
+from time import time
+import traceback
+
+# Pip imports
+import pdfkit
+from RestOC import Conf, JSON
+
+# Shared imports
+from shared.PDF import frame_read, frame_write
+
+# The HTML rendered by each process when it starts so that everything it needs
+#	is loaded before the first real job
+_WARM = '<html><body></body></html>'
+
+class RenderException(Exception):
+	"""Render Exception
+
+	Raised when a process fails to render a document
+
+	Extends:
+		Exception
+	"""
+	pass
+
+class Renderer(object):
+	"""Renderer
+
+	A single wkhtmltopdf process reading jobs from its stdin
+	"""
+
+	def __init__(self, binary, recycle, folder):
+		"""Constructor (__init__)
+
+		Initialises the renderer and starts its process
+
+		Arguments:
+			binary (str): The path to wkhtmltopdf, empty to find it
+			recycle (uint): The number of jobs before the process is replaced
+			folder (str): The folder the documents are written to
+
+		Returns:
+			Renderer
+		"""
+		self.configuration = binary and \
+			pdfkit.configuration(wkhtmltopdf=binary) or \
+			pdfkit.configuration()
+		self.recycle = recycle
+		self.folder = folder
+		self.process = None
+		self.jobs = 0
+		self.start()
+
+	def _args(self, html, output):
+		"""Args
+
+		Returns the command pdfkit would run for the HTML, including any
+		options found in its meta tags
+
+		Arguments:
+			html (str): The HTML to render
+			output (str): The file to write the PDF to
+
+		Returns:
+			list
+		"""
+		return pdfkit.PDFKit(
+			html, 'string', configuration=self.configuration
+		).command(output)
+
+	def _job(self, html, timeout):
+		"""Job
+
+		Sends a single document to the process and returns the PDF
+
+		Arguments:
+			html (str): The HTML to render
+			timeout (uint): The seconds the job can take
+
+		Raises:
+			RenderException
+
+		Returns:
+			bytes
+		"""
+
+		# Create the files for the HTML and the PDF
+		fdIn, sIn = tempfile.mkstemp(suffix='.html', dir=self.folder)
+		fdOut, sOut = tempfile.mkstemp(suffix='.pdf', dir=self.folder)
+		os.close(fdOut)
+
+		# Get the arguments, without the binary, and without the quiet flag as
+		#	we need the output to know when it's done
+		lArgs = [s for s in self._args(html, sOut)[1:] \
+					if s not in ['--quiet', '-q']]
+
+		# Read the HTML from the file instead of stdin
+		lArgs[len(lArgs) - 1 - lArgs[::-1].index('-')] = sIn
+
+		try:
+
+			# Write the HTML
+			with os.fdopen(fdIn, 'w', encoding='utf-8') as oF:
+				oF.write(html)
+
+			# Send the job and wait for it to finish
+			try:
+				self.process.stdin.write(
+					(' '.join(self._quote(s) for s in lArgs) + '\n').encode('utf-8')
+				)
+				self.process.stdin.flush()
+			except OSError as e:
+				raise RenderException('write failed', str(e.args))
+			self._wait(timeout)
+
+			# Read the PDF
+			with open(sOut, 'rb') as oF:
+				bPDF = oF.read()
+			if not bPDF.startswith(b'%PDF'):
+				raise RenderException('invalid pdf')
+
+		# Remove the files
+		finally:
+			for s in [sIn, sOut]:
+				try: os.unlink(s)
+				except OSError: pass
+
+		# Return the PDF
+		return bPDF
+
+	@staticmethod
+	def _quote(arg):
+		"""Quote
+
+		Quotes an argument the way wkhtmltopdf splits the lines it reads
+
+		Arguments:
+			arg (str): The argument
+
+		Returns:
+			str
+		"""
+		return '"%s"' % arg.replace('\\', '\\\\').replace('"', '\\"')
+
+	def _wait(self, timeout):
+		"""Wait
+
+		Reads the output of the process until it reports the document is done
+
+		Arguments:
+			timeout (uint): The seconds to wait
+
+		Raises:
+			RenderException
+
+		Returns:
+			None
+		"""
+
+		# Read until we get the last line of a job, or run out of time
+		fEnd = time() + timeout
+		sBuffer = ''
+		while True:
+
+			# Wait for some output
+			fLeft = fEnd - time()
+			if fLeft <= 0:
+				raise RenderException('timeout')
+			lReady = select.select([self.process.stderr], [], [], fLeft)[0]
+			if not lReady:
+				raise RenderException('timeout')
+
+			# Read what's there, if there's nothing the process died
+			b = os.read(self.process.stderr.fileno(), 65536)
+			if not b:
+				raise RenderException('process exited', self.process.poll())
+			sBuffer += b.decode('utf-8', 'replace')
+
+			# Progress is updated with carriage returns, so look at every part
+			#	of each full line
+			lLines = sBuffer.replace('\r', '\n').split('\n')
+			sBuffer = lLines.pop()
+			for s in lLines:
+				s = s.strip()
+				if s == 'Done':
+					return
+				if s.startswith('Exit with code'):
+					raise RenderException(s)
+
+	def render(self, html, timeout):
+		"""Render
+
+		Renders the HTML into a PDF, replacing the process if it fails, or if
+		it has done enough jobs
+
+		Arguments:
+			html (str): The HTML to render
+			timeout (uint): The seconds the job can take
+
+		Raises:
+			RenderException
+
+		Returns:
+			bytes
+		"""
+
+		# Render the document, if it fails, the process may be stuck or in a
+		#	bad state, so replace it
+		try:
+			bPDF = self._job(html, timeout)
+		except RenderException:
+			self.restart()
+			raise
+
+		# If the process has done enough, replace it
+		self.jobs += 1
+		if self.recycle and self.jobs >= self.recycle:
+			self.restart()
+
+		# Return the PDF
+		return bPDF
+
+	def restart(self):
+		"""Restart
+
+		Replaces the process with a new one
+
+		Returns:
+			None
+		"""
+		self.stop()
+		self.start()
+
+	def start(self):
+		"""Start
+
+		Starts the process and renders the warm up document
+
+		Returns:
+			None
+		"""
+		self.process = subprocess.Popen(
+			[self._args(_WARM, '-')[0], '--read-args-from-stdin'],
+			stdin=subprocess.PIPE,
+			stdout=subprocess.DEVNULL,
+			stderr=subprocess.PIPE
+		)
+		self.jobs = 0
+		try:
+			self._job(_WARM, 30)
+		except RenderException as e:
+			print('Warm up failed: %s' % str(e.args), file=sys.stderr)
+
+	def stop(self):
+		"""Stop
+
+		Stops the process
+
+		Returns:
+			None
+		"""
+		if self.process and self.process.poll() is None:
+			self.process.kill()
+			self.process.wait()
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	"""Server
+
+	Accepts jobs on the unix socket, each one handled in its own thread by
+	the first free renderer
+	"""
+
+	daemon_threads = True
+
+	def __init__(self, conf):
+		"""Constructor (__init__)
+
+		Starts the renderers and listens on the socket
+
+		Arguments:
+			conf (dict): The socket, workers, timeout, wait, recycle, and
+				binary values
+
+		Returns:
+			Server
+		"""
+
+		# Store the config
+		self.conf = conf
+
+		# Start the renderers
+		self.folder = tempfile.mkdtemp(prefix='tims_pdf_')
+		self.renderers = queue.Queue()
+		for i in range(conf['workers']):
+			self.renderers.put(Renderer(conf['binary'], conf['recycle'], self.folder))
+
+		# Remove any socket left by a previous run and listen
+		if os.path.exists(conf['socket']):
+			os.unlink(conf['socket'])
+		super().__init__(conf['socket'], Handler)
+		os.chmod(conf['socket'], 0o660)
+
+	def server_close(self):
+		"""Server Close
+
+		Stops listening and stops the renderers
+
+		Returns:
+			None
+		"""
+		super().server_close()
+		while not self.renderers.empty():
+			self.renderers.get().stop()
+		try: os.unlink(self.conf['socket'])
+		except OSError: pass
+
+class Handler(socketserver.BaseRequestHandler):
+	"""Handler
+
+	Handles a single job
+	"""
+
+	def handle(self):
+		"""Handle
+
+		Reads the job, renders it, and sends back the status and the PDF
+
+		Returns:
+			None
+		"""
+
+		# Read the job
+		try:
+			dJob = JSON.decode(frame_read(self.request).decode('utf-8'))
+		except Exception as e:
+			print('Invalid job: %s' % str(e.args), file=sys.stderr)
+			return
+
+		# Get the config
+		dConf = self.server.conf
+
+		# Wait for a free renderer, no longer than the client will wait
+		fStart = time()
+		try:
+			oRenderer = self.server.renderers.get(
+				timeout=min(dJob.get('wait') or dConf['wait'], dConf['wait'])
+			)
+		except queue.Empty:
+			return self.respond('busy')
+
+		# Render the job, always giving the renderer back
+		try:
+			bPDF = oRenderer.render(
+				dJob['html'],
+				min(dJob.get('timeout') or dConf['timeout'], dConf['timeout'])
+			)
+		except RenderException as e:
+			print('Render failed: %s' % str(e.args), file=sys.stderr)
+			return self.respond(' '.join(str(s) for s in e.args))
+		except Exception as e:
+			print(traceback.format_exc(), file=sys.stderr)
+			return self.respond(str(e.args))
+		finally:
+			self.server.renderers.put(oRenderer)
+
+		# Send the PDF
+		self.respond(None, bPDF)
+		print('%d bytes in %.3fs' % (len(bPDF), time() - fStart))
+
+	def respond(self, error, pdf=b''):
+		"""Respond
+
+		Sends the status and the PDF back
+
+		Arguments:
+			error (str|None): The reason the job failed, if it did
+			pdf (bytes): The PDF
+
+		Returns:
+			None
+		"""
+		try:
+			frame_write(self.request, JSON.encode({'error': error}).encode('utf-8'))
+			frame_write(self.request, pdf)
+		except OSError as e:
+			print('Respond failed: %s' % str(e.args), file=sys.stderr)
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Load the config
+	Conf.load('config.json')
+	sConfOverride = 'config.%s.json' % platform.node()
+	if os.path.isfile(sConfOverride):
+		Conf.load_merge(sConfOverride)
+
+	# Get the renderer config
+	dConf = {
+		'socket': '/tmp/tims_pdf.sock',
+		'workers': 4,
+		'timeout': 30,
+		'wait': 30,
+		'recycle': 500,
+		'binary': ''
+	}
+	dConf.update(Conf.get(('pdf', 'renderer'), {}))
+	dConf['socket'] = Conf.get(('pdf', 'socket'), dConf['socket'])
+
+	# Start the renderers and handle jobs until stopped
+	oServer = Server(dConf)
+	print('Listening on %s with %d renderers' % (dConf['socket'], dConf['workers']))
+	try:
+		oServer.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		oServer.server_close()
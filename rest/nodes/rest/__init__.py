@@ -12,12 +12,216 @@ __email__		= "chris@ouroboroscoding.com"
 __created__		= "2021-04-02"
 
 # Python imports
+from hashlib import sha1
 import os
 import platform
+import sys
+import traceback
 
 # Pip imports
-from RestOC import Conf, EMail, Record_Base, Record_MySQL, REST, \
-					Services, Session, Templates
+import bottle
+from RestOC import Conf, EMail, Errors, JSON, Record_Base, Record_MySQL, \
+					REST, Services, Session, Templates
+
+# Record imports
+from records import request_avoided
+
+# Shared imports
+from shared import Compress, Headers, MySQLPool, QueryLog, Versions
+
+# The tables every list depends on, as they decide what a user can see
+_ETAG_TABLES = ['access', 'user']
+
+def _cors(route):
+	"""CORS
+
+	Allows the origin of the request if CORS is enabled on the route and the
+	origin matches, the same way REST._Route does
+
+	Arguments:
+		route (REST._Route): The original route
+
+	Returns:
+		None
+	"""
+	if route.cors and 'origin' in bottle.request.headers and \
+		route.cors.match(bottle.request.headers['origin']):
+		bottle.response.headers['Access-Control-Allow-Origin'] = bottle.request.headers['origin']
+		bottle.response.headers['Vary'] = 'Origin'
+
+def _crashed(route, req):
+	"""Crashed
+
+	Prints the exception being handled, passes the details to the error
+	callback of the route, if it has one, and returns the error, the same way
+	REST._Route does when a service crashes
+
+	Arguments:
+		route (REST._Route): The original route
+		req (dict): The request details passed to the service
+
+	Returns:
+		Services.Error
+	"""
+
+	# Print the exception
+	sError = traceback.format_exc()
+	print(sError, file=sys.stderr)
+
+	# If there's a callback, pass it the details
+	if route.error_callback:
+		dDetails = {
+			'service': route.service,
+			'method': bottle.request.method,
+			'path': route.path,
+			'environment': req['environment'],
+			'traceback': sError
+		}
+		for s in ['data', 'session']:
+			if s in req:
+				dDetails[s] = req[s]
+		route.error_callback(dDetails)
+
+	# Return the error
+	return Services.Error(
+		Errors.SERVICE_CRASHED,
+		'%s:%s' % (route.service, route.path)
+	)
+
+def _route(server, uri):
+	"""Route
+
+	Returns the callback currently handling GET requests to the uri. Every
+	replacement adds another route to the server, so the first one added is
+	not necessarily the one in use, the router is asked instead
+
+	Arguments:
+		server (REST.Server): The server the route was added to
+		uri (str): The uri of the route
+
+	Raises:
+		ValueError
+
+	Returns:
+		callable
+	"""
+	try:
+		oRoute, dArgs = server.router.match({
+			'REQUEST_METHOD': 'GET',
+			'PATH_INFO': uri
+		})
+	except bottle.HTTPError:
+		raise ValueError('uri', uri)
+	return oRoute.callback
+
+def _session(req):
+	"""Session
+
+	Loads the session sent with the request, if any, into the request details
+	and extends it, the same way REST._Route does. Returns the response to
+	send if the session isn't valid, or None
+
+	Arguments:
+		req (dict): The request details passed to the service
+
+	Returns:
+		str|None
+	"""
+
+	# If no session was sent, there's nothing to do
+	if 'Authorization' not in bottle.request.headers:
+		return None
+
+	# Get the session from the Authorization token
+	req['session'] = Session.load(bottle.request.headers['Authorization'])
+
+	# If the session is not found
+	if not req['session']:
+		bottle.response.status = 401
+		return str(Services.Error(Errors.REST_AUTHORIZATION, 'Unauthorized'))
+
+	# Else, extend the session
+	req['session'].extend()
+	return None
+
+def compress(server, uris, conf={}):
+	"""Compress
+
+	Replaces the GET routes of the given uris with CompressRoutes wrapping
+	them. Must be called after any other wrapping of the same routes
+
+	Arguments:
+		server (REST.Server): The server the routes were added to
+		uris (str[]): The uris of the routes
+		conf (dict): Optional, any of enabled, min_size, gzip_level, and
+			brotli_quality
+
+	Raises:
+		ValueError
+
+	Returns:
+		None
+	"""
+
+	# If compression is off, leave the routes as they are
+	if not conf.get('enabled', True):
+		return
+
+	# Go through each uri
+	for sURI in uris:
+
+		# Replace the route in use with the compressed version
+		server.route(sURI, 'GET', CompressRoute(_route(server, sURI), conf))
+
+def etag(server, uri, tables):
+	"""ETag
+
+	Replaces the GET route of the given uri with an ETagRoute wrapping it
+
+	Arguments:
+		server (REST.Server): The server the route was added to
+		uri (str): The uri of the route
+		tables (str[]): The tables the data of the route comes from
+
+	Raises:
+		ValueError
+
+	Returns:
+		None
+	"""
+
+	# Replace the route in use with the etag version
+	server.route(uri, 'GET', ETagRoute(_route(server, uri), tables))
+
+def headers_apply():
+	"""Headers Apply
+
+	Hook called after every request to add any headers set by the services to
+	the response, and let the browser read them
+
+	Returns:
+		None
+	"""
+	dHeaders = Headers.pop()
+	if dHeaders:
+		for k, v in dHeaders.items():
+			bottle.response.set_header(k, v)
+		bottle.response.set_header(
+			'Access-Control-Expose-Headers', ', '.join(dHeaders.keys())
+		)
+
+def identity_apply():
+	"""Identity Apply
+
+	Hook called after every request, before the per request data is reset, to
+	report the number of record fetches the identity map avoided
+
+	Returns:
+		None
+	"""
+	iAvoided = request_avoided()
+	if iAvoided:
+		Headers.set('X-Identity-Avoided', str(iAvoided))
 
 def init(dbs=[], services={}, templates=False):
 	"""Initialise
@@ -42,9 +246,15 @@ def init(dbs=[], services={}, templates=False):
 	# Add the global prepend
 	Record_Base.db_prepend(Conf.get(('mysql', 'prepend'), ''))
 
-	# Go through the list of DBs requested
+	# Go through the list of DBs requested, skipping any optional ones that
+	#	aren't in the config
 	for s in dbs:
-		Record_MySQL.add_host(s, Conf.get(('mysql', 'hosts', s)))
+		dHost = Conf.get(('mysql', 'hosts', s))
+		if dHost is not None:
+			Record_MySQL.add_host(s, dHost)
+
+	# Pool the connections to the DBs
+	MySQLPool.init(Conf.get(('mysql', 'pool'), {}))
 
 	# Set the timestamp timezone
 	Record_MySQL.timestamp_timezone(
@@ -87,4 +297,359 @@ def init(dbs=[], services={}, templates=False):
 		Templates.init(templates)
 
 	# Return the REST config
-	return oRestConf
\ No newline at end of file
+	return oRestConf
+
+def queries_start():
+	"""Queries Start
+
+	Hook called before every request to note the method and path of the
+	request so that it's recorded with every statement it runs
+
+	Returns:
+		None
+	"""
+	QueryLog.request_start('%s %s' % (
+		bottle.request.method, bottle.request.path
+	))
+
+def stream(server, uri, formats):
+	"""Stream
+
+	Replaces the GET route of the given uri with a StreamRoute wrapping it
+
+	Arguments:
+		server (REST.Server): The server the route was added to
+		uri (str): The uri of the route
+		formats (dict): Format names to the mime type sent with them
+
+	Raises:
+		ValueError
+
+	Returns:
+		None
+	"""
+
+	# Replace the route in use with the stream version
+	server.route(uri, 'GET', StreamRoute(_route(server, uri), formats))
+
+def wrapped(server, uri, cls):
+	"""Wrapped
+
+	Returns True if the route currently handling GET requests to the uri is,
+	or wraps, an instance of the given class
+
+	Arguments:
+		server (REST.Server): The server the route was added to
+		uri (str): The uri of the route
+		cls (class): The class to look for, e.g. StreamRoute
+
+	Raises:
+		ValueError
+
+	Returns:
+		bool
+	"""
+	oRoute = _route(server, uri)
+	while oRoute is not None:
+		if isinstance(oRoute, cls):
+			return True
+		oRoute = getattr(oRoute, 'route', None)
+	return False
+
+class CompressRoute(object):
+	"""Compress Route
+
+	Wraps an existing route so that responses are compressed with the best
+	encoding the client accepts. Single responses under the minimum size are
+	sent as is, as the headers would cost more than is saved, while streamed
+	responses are always compressed one chunk at a time
+	"""
+
+	def __init__(self, route, conf={}):
+		"""Constructor (__init__)
+
+		Initialises an instance of the route
+
+		Arguments:
+			route (callable): The original route
+			conf (dict): Optional, any of min_size, gzip_level, and
+				brotli_quality
+
+		Returns:
+			CompressRoute
+		"""
+		self.route = route
+		self.min_size = conf.get('min_size', 1024)
+		self.levels = {
+			'br': conf.get('brotli_quality', 4),
+			'gzip': conf.get('gzip_level', 6)
+		}
+
+	def __call__(self):
+		"""Call (__call__)
+
+		Python magic method that allows the instance to be called
+
+		Returns:
+			str|bytes|generator
+		"""
+
+		# Call the original route
+		mRet = self.route()
+
+		# Let caches know the response depends on the encodings accepted
+		sVary = bottle.response.headers.get('Vary')
+		if not sVary:
+			bottle.response.headers['Vary'] = 'Accept-Encoding'
+		elif 'accept-encoding' not in sVary.lower():
+			bottle.response.headers['Vary'] = '%s, Accept-Encoding' % sVary
+
+		# If there's no body, or it's already encoded, send it as is
+		if bottle.response.status_code in [204, 304] or \
+			'Content-Encoding' in bottle.response.headers:
+			return mRet
+
+		# If the client doesn't accept anything we have, send it as is
+		sEncoding = Compress.negotiate(
+			bottle.request.headers.get('Accept-Encoding')
+		)
+		if not sEncoding:
+			return mRet
+
+		# If it's a single response
+		if isinstance(mRet, (bytes, str)):
+
+			# If it's too small, send it as is
+			bData = isinstance(mRet, str) and mRet.encode('utf-8') or mRet
+			if len(bData) < self.min_size:
+				return mRet
+
+			# Compress it
+			mRet = Compress.compress(bData, sEncoding, self.levels[sEncoding])
+			bottle.response.headers['Content-Length'] = str(len(mRet))
+
+		# Else, it's streamed, compress each chunk as it's generated
+		else:
+			mRet = Compress.stream(mRet, sEncoding, self.levels[sEncoding])
+
+		# Set the encoding, and weaken any ETag, as the same one is sent for
+		#	every encoding
+		bottle.response.headers['Content-Encoding'] = sEncoding
+		sETag = bottle.response.headers.get('ETag')
+		if sETag and not sETag.startswith('W/'):
+			bottle.response.headers['ETag'] = 'W/%s' % sETag
+
+		# Return the compressed data
+		return mRet
+
+class ETagRoute(object):
+	"""ETag Route
+
+	Wraps an existing REST route so that GET requests are sent an ETag
+	generated from the user, the data sent, and the epoch and versions of the
+	tables the data comes from. When the browser sends the same ETag back, nothing has
+	changed, and 304 Not Modified is returned without calling the service
+	"""
+
+	def __init__(self, route, tables):
+		"""Constructor (__init__)
+
+		Initialises an instance of the route
+
+		Arguments:
+			route (REST._Route): The original route
+			tables (str[]): The tables the data of the route comes from
+
+		Returns:
+			ETagRoute
+		"""
+		self.route = route
+		self.tables = sorted(set(tables + _ETAG_TABLES))
+
+	def __call__(self):
+		"""Call (__call__)
+
+		Python magic method that allows the instance to be called
+
+		Returns:
+			str
+		"""
+
+		# If there's no session, let the original route handle it
+		if 'Authorization' not in bottle.request.headers:
+			return self.route()
+
+		# If the session isn't valid, let the original route handle it
+		oSession = Session.load(bottle.request.headers['Authorization'])
+		if not oSession:
+			return self.route()
+
+		# Generate the ETag, if the versions can't be fetched, just let the
+		#	original route handle it
+		try:
+			sETag = '"%s"' % sha1(JSON.encode([
+				self.route.path,
+				bottle.request.query.get('d'),
+				oSession['user_id'],
+				Versions.tables(self.tables)
+			]).encode('utf-8')).hexdigest()
+		except Exception as e:
+			print('ETag failed: %s' % str(e.args), file=sys.stderr)
+			return self.route()
+
+		# If the browser already has it
+		if sETag in [
+			s.strip().replace('W/', '') for s in
+			bottle.request.headers.get('If-None-Match', '').split(',')
+		]:
+
+			# Allow the origin if it matches
+			_cors(self.route)
+
+			# Extend the session as the original route would
+			oSession.extend()
+
+			# Tell the browser to use what it has
+			self.headers(sETag)
+			bottle.response.status = 304
+			return ''
+
+		# Call the original route
+		sRet = self.route()
+
+		# If it worked, send the ETag with it, errors are never kept
+		if not sRet.startswith('{"error"'):
+			self.headers(sETag)
+
+		# Return the response
+		return sRet
+
+	def headers(self, etag):
+		"""Headers
+
+		Sets the ETag and the headers that make the browser check it on every
+		request, and keep it separate for each session
+
+		Arguments:
+			etag (str): The ETag
+
+		Returns:
+			None
+		"""
+		bottle.response.headers['ETag'] = etag
+		bottle.response.headers['Cache-Control'] = 'private, no-cache'
+		bottle.response.headers['Vary'] = 'Origin, Authorization'
+
+class StreamRoute(object):
+	"""Stream Route
+
+	Wraps an existing REST route so that GET requests with a 'format' in the
+	data matching one of the formats passed are sent back in chunks as the
+	service generates them, instead of being encoded as a single JSON response.
+	Any other request is handed to the original route
+	"""
+
+	def __init__(self, route, formats):
+		"""Constructor (__init__)
+
+		Initialises an instance of the route
+
+		Arguments:
+			route (REST._Route): The original route
+			formats (dict): Format names to the mime type sent with them
+
+		Returns:
+			StreamRoute
+		"""
+		self.route = route
+		self.formats = formats
+
+	def __call__(self):
+		"""Call (__call__)
+
+		Python magic method that allows the instance to be called
+
+		Returns:
+			str|generator
+		"""
+
+		# If there's no data, let the original route handle it
+		if 'd' not in bottle.request.query:
+			return self.route()
+
+		# If the data can't be decoded, or doesn't request a stream format, let
+		#	the original route handle it
+		try:
+			dData = JSON.decode(bottle.request.query['d'])
+			sFormat = dData['format']
+			if sFormat not in self.formats:
+				return self.route()
+		except Exception:
+			return self.route()
+
+		# Allow the origin if it matches
+		_cors(self.route)
+
+		# Errors are still sent as JSON
+		bottle.response.headers['Content-Type'] = 'application/json; charset=utf-8'
+
+		# Init the request details
+		dReq = {
+			'data': dData,
+			'environment': bottle.request.environ
+		}
+
+		# Load the session, if one was sent, and stop if it's not valid
+		sUnauthorized = _session(dReq)
+		if sUnauthorized:
+			return sUnauthorized
+
+		# In case the service crashes
+		try:
+			oResponse = Services.read(self.route.service, self.route.path, dReq)
+		except Exception:
+			oResponse = _crashed(self.route, dReq)
+
+		# If there's an error, return it as JSON
+		if oResponse.error_exists():
+			try: oResponse.error['service'].append([self.route.service, self.route.path])
+			except KeyError: oResponse.error['service'] = [[self.route.service, self.route.path]]
+			return str(oResponse)
+
+		# Set the type of the data and return the generator, without a length
+		#	the server will send it chunked
+		bottle.response.headers['Content-Type'] = self.formats[sFormat]
+		return self.chunks(oResponse.data)
+
+	def chunks(self, lines, size=65536):
+		"""Chunks
+
+		Joins the lines generated by the service into larger chunks so we
+		aren't sending one tiny chunk per record
+
+		Arguments:
+			lines (iterable): The lines to send
+			size (uint): The minimum size of each chunk
+
+		Returns:
+			generator
+		"""
+
+		# Init the buffer
+		lBuffer = []
+		iLen = 0
+
+		# Go through each line
+		for s in lines:
+			lBuffer.append(s)
+			iLen += len(s)
+
+			# If we've hit the size, send it and reset
+			if iLen >= size:
+				yield ''.join(lBuffer).encode('utf-8')
+				lBuffer = []
+				iLen = 0
+
+		# Send whatever is left
+		if lBuffer:
+			yield ''.join(lBuffer).encode('utf-8')
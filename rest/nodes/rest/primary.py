@@ -15,24 +15,39 @@ __created__		= "2021-04-02"
 from body import errors
 from RestOC import Conf, REST
 
+# Record imports
+from records import request_end, request_start
+
+# Shared imports
+from shared import Headers, MySQLPool, QueryLog
+
 # Service imports
 from services.primary import Primary
 
 # Local imports
-from . import init
+from . import StreamRoute, compress, etag, headers_apply, identity_apply, \
+				init, queries_start, stream, wrapped
 
 # Only run if called directly
 if __name__ == '__main__':
 
 	# Init the REST info
 	oRestConf = init(
-		dbs=['primary'],
+		dbs=['primary', 'replica'],
 		services={'primary':Primary()},
 		templates='templates'
 	)
 
 	# Create the HTTP server and map requests to service
-	REST.Server({
+	oServer = REST.Server({
+
+		# Admin
+		'/admin/balances': {'methods': REST.READ},
+		'/admin/cache': {'methods': REST.READ},
+		'/admin/invoices': {'methods': REST.CREATE | REST.READ},
+		'/admin/mysql': {'methods': REST.READ},
+		'/admin/queries': {'methods': REST.DELETE | REST.READ},
+		'/admin/working': {'methods': REST.READ},
 
 		# Clients
 		'/client': {'methods': REST.ALL},
@@ -90,7 +105,47 @@ if __name__ == '__main__':
 		'primary',
 		'https?://(.*\\.)?%s' % Conf.get(('rest', 'allowed')).replace('.', '\\.'),
 		error_callback=errors.service_error
-	).run(
+	)
+
+	# Reset the per request data before each request and note the endpoint
+	#	every statement is run for. The after request hooks are run in the
+	#	reverse of the order they're added, so once done, the fetches avoided
+	#	are reported before the per request data is reset, then any headers
+	#	set by the service are added, and finally the statements are logged
+	#	and the DB connections given back to the pool
+	oServer.add_hook('before_request', request_start)
+	oServer.add_hook('before_request', queries_start)
+	oServer.add_hook('before_request', Headers.clear)
+	oServer.add_hook('after_request', MySQLPool.release)
+	oServer.add_hook('after_request', QueryLog.request_end)
+	oServer.add_hook('after_request', headers_apply)
+	oServer.add_hook('after_request', request_end)
+	oServer.add_hook('after_request', identity_apply)
+
+	# Let the browser skip lists it already has
+	etag(oServer, '/account/clients', ['client'])
+	etag(oServer, '/clients', ['client'])
+	etag(oServer, '/projects', ['project'])
+	etag(oServer, '/tasks', ['project', 'task'])
+	etag(oServer, '/users', ['user'])
+
+	# Allow works to be streamed
+	stream(oServer, '/works', {
+		'csv': 'text/csv; charset=utf-8',
+		'ndjson': 'application/x-ndjson; charset=utf-8'
+	})
+
+	# Compress the larger responses
+	compress(oServer, [
+		'/client/works', '/invoices', '/payments', '/works'
+	], Conf.get(('rest', 'compression'), {}))
+
+	# Make sure works can still be streamed with every wrapper applied
+	if not wrapped(oServer, '/works', StreamRoute):
+		raise RuntimeError('/works is no longer streamed')
+
+	# Run the server
+	oServer.run(
 		host=oRestConf['primary']['host'],
 		port=oRestConf['primary']['port'],
 		workers=oRestConf['primary']['workers'],
@@ -12,13 +12,246 @@ __email__		= "ourboroscode@gmail.com"
 __created__		= "2021-04-02"
 
 # Python imports
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal
 from hashlib import sha1
+import os
+import pickle
 import re
+import sys
+import threading
+from time import time
+import uuid
 
 # Pip imports
+import FormatOC
 from FormatOC import Tree
+import pymysql
+from redis.exceptions import WatchError
 from RestOC import Conf, JSON, Record_MySQL, StrHelper
 
+# Per request data, only set between request_start and request_end
+_request = threading.local()
+
+# The file the definitions are compiled to by tools.compile_definitions, and
+#	the version of its layout
+DEFINITIONS_COMPILED = 'definitions/compiled.pickle'
+DEFINITIONS_VERSION = 1
+
+# The hash of the open work of each user, and the script that removes one only
+#	if it's the expected work
+_WORK_OPEN = 'work:open'
+_WORK_OPEN_CLEAR = """
+local v = redis.call('HGET', KEYS[1], ARGV[1])
+if v and cjson.decode(v)['_id'] == ARGV[2] then
+	return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+_UUID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+def _compiled_load():
+	"""Compiled Load
+
+	Loads the definitions compiled by tools.compile_definitions, if there are
+	any and they were compiled by the same versions of everything
+
+	Returns:
+		dict
+	"""
+
+	# Load the file
+	try:
+		with open(DEFINITIONS_COMPILED, 'rb') as oF:
+			dCompiled = pickle.load(oF)
+
+	# If there's no file, the definitions will be parsed
+	except FileNotFoundError:
+		return {}
+
+	# If it can't be loaded, note it
+	except Exception as e:
+		print('Compiled definitions ignored: %s' % str(e.args))
+		return {}
+
+	# If it was compiled by anything else, it can't be trusted
+	if dCompiled.get('version') != definitions_version():
+		print('Compiled definitions ignored: version %s is not %s' % (
+			str(dCompiled.get('version')), str(definitions_version())
+		))
+		return {}
+
+	# Return the definitions
+	return dCompiled['definitions']
+
+def _config(name):
+	"""Config
+
+	Returns the config of a record type, from the compiled definitions if the
+	JSON hasn't changed since they were compiled, else by parsing the JSON
+
+	Arguments:
+		name (str): The name of the definition file, without the extension
+
+	Returns:
+		dict
+	"""
+
+	# Every record uses the DB from the config
+	dOverride = {'db': Conf.get(('mysql', 'db'), 'tims-oc')}
+
+	# If the definition was compiled, and the source is the same, use it. It's
+	#	removed as each record only asks once
+	dCompiled = _compiled.pop(name, None)
+	if dCompiled:
+		if dCompiled['checksum'] == definition_checksum(name):
+			return dict(dCompiled['config'], **dOverride)
+		print('definitions/%s.json changed since it was compiled' % name)
+
+	# Parse the JSON and generate the config
+	return Record_MySQL.Record.generate_config(
+		Tree.fromFile('definitions/%s.json' % name),
+		override=dOverride
+	)
+
+def _keyset(field, cursor, desc=True):
+	"""Keyset
+
+	Returns the SQL condition for the records after a cursor, when the records
+	are ordered by a timestamp field and then `_id`
+
+	Arguments:
+		field (str): The escaped timestamp field, including the table alias
+		cursor (str): The cursor returned by cursor_encode
+		desc (bool): True if the records are in descending order
+
+	Raises:
+		ValueError
+
+	Returns:
+		str
+	"""
+
+	# Decode the cursor
+	iTime, sID = cursor_decode(cursor)
+
+	# Generate and return the condition
+	return "(%(field)s %(op)s FROM_UNIXTIME(%(time)d) OR " \
+			"(%(field)s = FROM_UNIXTIME(%(time)d) AND %(id)s %(op)s '%(_id)s'))" % {
+		"field": field,
+		"id": field[:field.index('.')] + '.`_id`',
+		"op": desc and '<' or '>',
+		"time": iTime,
+		"_id": sID
+	}
+
+def _stream_rows(host, con, cursor):
+	"""Stream Rows
+
+	Yields each row of a select started by stream, and gives the connection
+	back once done. If the rows weren't all read, the rest of the result is
+	still waiting on the connection, so it can't be used again
+
+	Arguments:
+		host (str): The name of the host
+		con (pymysql.Connection): The connection the select is on
+		cursor (pymysql.cursors.SSDictCursor): The cursor of the select
+
+	Returns:
+		generator
+	"""
+
+	# Yield each row
+	bFinished = False
+	try:
+		for d in cursor:
+			yield d
+		cursor.close()
+		bFinished = True
+
+	# Whether we finished or not, give the connection back
+	finally:
+		stream_checkin(host, con, bFinished)
+
+def cursor_decode(cursor):
+	"""Cursor Decode
+
+	Returns the timestamp and ID stored in a cursor
+
+	Arguments:
+		cursor (str): The cursor returned by cursor_encode
+
+	Raises:
+		ValueError
+
+	Returns:
+		tuple
+	"""
+
+	# Decode the cursor and check the values, the ID is added to SQL so it
+	#	has to be a valid UUID
+	try:
+		iTime, sID = JSON.decode(urlsafe_b64decode(cursor.encode('ascii')))
+		iTime = int(iTime)
+	except Exception:
+		raise ValueError('cursor')
+	if not isinstance(sID, str) or not _UUID.match(sID):
+		raise ValueError('cursor')
+
+	# Return the values
+	return iTime, sID
+
+def cursor_encode(time_, _id):
+	"""Cursor Encode
+
+	Returns an opaque cursor for the position of a record ordered by a
+	timestamp and its ID
+
+	Arguments:
+		time_ (uint): The timestamp of the record
+		_id (str): The ID of the record
+
+	Returns:
+		str
+	"""
+	return urlsafe_b64encode(
+		JSON.encode([time_, _id]).encode('utf-8')
+	).decode('ascii')
+
+def definition_checksum(name):
+	"""Definition Checksum
+
+	Returns the checksum of a definition's JSON file
+
+	Arguments:
+		name (str): The name of the definition file, without the extension
+
+	Returns:
+		str
+	"""
+	with open('definitions/%s.json' % name, 'rb') as oF:
+		return sha1(oF.read()).hexdigest()
+
+def definitions_version():
+	"""Definitions Version
+
+	Returns the version compiled definitions must have to be used, which
+	changes with the layout of the file and the versions of Python, FormatOC,
+	and RestOC, as any of them can change what's pickled
+
+	Returns:
+		str
+	"""
+	return '%d:%d.%d:%s:%s' % (
+		DEFINITIONS_VERSION,
+		sys.version_info[0], sys.version_info[1],
+		getattr(FormatOC, '__version__', '-'),
+		getattr(Record_MySQL, '__version__', '-')
+	)
+
 def install():
 	"""Install
 
@@ -29,6 +262,7 @@ def install():
 	"""
 	Access.table_create()
 	Client.table_create()
+	ClientBalance.table_create()
 	Company.table_create()
 	Invoice.table_create()
 	InvoiceAdditional.table_create()
@@ -39,352 +273,667 @@ def install():
 	Task.table_create()
 	User.table_create()
 	Work.table_create()
+	WorkDaily.table_create()
 
-# Access class
-class Access(Record_MySQL.Record):
-	"""Access
+def request_avoided():
+	"""Request Avoided
 
-	Represents a single permission associated with a user
+	Returns the number of fetches avoided by the identity map in the current
+	request
+
+	Returns:
+		uint
 	"""
+	return getattr(_request, 'avoided', 0)
 
-	_conf = None
-	"""Configuration"""
+def request_end():
+	"""Request End
 
-	@classmethod
-	def config(cls):
-		"""Config
+	Removes any data stored for the current request
 
-		Returns the configuration data associated with the record type
+	Returns:
+		None
+	"""
+	_request.users = None
+	_request.records = None
+	_request.avoided = 0
 
-		Returns:
-			dict
-		"""
+def request_start():
+	"""Request Start
 
-		# If we haven't loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/access.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+	Resets the data stored for the current request, called before every
+	request is handled so that records fetched more than once per request are
+	only decoded the first time
 
-		# Return the config
-		return cls._conf
+	Returns:
+		None
+	"""
+	_request.users = {}
+	_request.records = {}
+	_request.avoided = 0
 
-# Client class
-class Client(Record_MySQL.Record):
-	"""Client
+def stream(host, sql):
+	"""Stream
 
-	Represents a client (company) that can be billed
+	Runs a select on a connection of its own, with an unbuffered cursor, and
+	returns a generator that yields the rows as they are read from the server.
+	The select is run before returning, so any error is raised here, and not
+	once the rows are being read
+
+	Arguments:
+		host (str): The name of the host
+		sql (str): The select to run
+
+	Returns:
+		generator
 	"""
 
-	_conf = None
-	"""Configuration"""
+	# Get a connection
+	oCon = stream_checkout(host)
 
-	@classmethod
-	def config(cls):
-		"""Config
+	# Run the select, giving the connection back if it fails
+	try:
+		oCursor = oCon.cursor(pymysql.cursors.SSDictCursor)
+		oCursor.execute(sql)
+	except BaseException:
+		stream_checkin(host, oCon, False)
+		raise
 
-		Returns the configuration data associated with the record type
+	# Return the generator of the rows
+	return _stream_rows(host, oCon, oCursor)
 
-		Returns:
-			dict
-		"""
+def stream_checkin(host, con, usable):
+	"""Stream Checkin
 
-		# If we haven loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/client.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+	Gives back a connection returned by stream_checkout by closing it.
+	Replaced by MySQLPool.init with one that puts it back in its pool
 
-		# Return the config
-		return cls._conf
+	Arguments:
+		host (str): The name of the host
+		con (pymysql.Connection): The connection
+		usable (bool): False if the connection can't be used again
 
-# Company class
-class Company(Record_MySQL.Record):
-	"""Company
+	Returns:
+		None
+	"""
+	con.close()
 
-	Represents the company doing the tasks that will invoice the client
+def stream_checkout(host):
+	"""Stream Checkout
+
+	Returns a new connection to the host, with the same conversions as
+	Record_MySQL, for a select read as it arrives. Replaced by MySQLPool.init
+	with one that takes it from a bounded pool
+
+	Arguments:
+		host (str): The name of the host
+
+	Returns:
+		pymysql.Connection
 	"""
 
-	_conf = None
-	"""Configuration"""
+	# Connect to the host
+	dConf = Conf.get(('mysql', 'hosts', host)).copy()
+	dConf.setdefault('charset', 'utf8')
+	oCon = pymysql.connect(**dConf)
+	oCon.autocommit(True)
 
-	@classmethod
-	def config(cls):
-		"""Config
+	# Use the same conversions as Record_MySQL
+	dConv = oCon.decoders.copy()
+	for k in dConv:
+		if k in [7]: dConv[k] = Record_MySQL._converter_timestamp
+		elif k in [10,11,12]: dConv[k] = str
+	oCon.decoders = dConv
 
-		Returns the configuration data associated with the record type
+	# Return the connection
+	return oCon
 
-		Returns:
-			dict
-		"""
+@contextmanager
+def transaction(host='primary'):
+	"""Transaction
 
-		# If we haven loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/company.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+	Runs every statement made on the host inside the with block in a single
+	transaction, committed if the block finishes, rolled back if it raises.
+	Record_MySQL reconnects and retries statements that fail on a lost
+	connection, which would run the rest of the block outside of the
+	transaction, so if the connection was replaced, nothing is committed
 
-		# Return the config
-		return cls._conf
+	Arguments:
+		host (str): The name of the host to run the transaction on
 
-# Invoice class
-class Invoice(Record_MySQL.Record):
-	"""Invoice
+	Raises:
+		ConnectionError
 
-	Represents a client invoice
+	Returns:
+		None
 	"""
 
-	_conf = None
-	"""Configuration"""
+	# Start the transaction and note the connection it's on
+	Record_MySQL.Commands.execute(host, 'START TRANSACTION')
+	iThread = Record_MySQL._connection(host).thread_id()
+
+	# Run the block, rolling back on any exception
+	try:
+		yield
+	except BaseException:
+		Record_MySQL.Commands.execute(host, 'ROLLBACK')
+		raise
+
+	# If the connection changed, the transaction was lost with the old one
+	if Record_MySQL._connection(host).thread_id() != iThread:
+		Record_MySQL.Commands.execute(host, 'ROLLBACK')
+		raise ConnectionError(
+			'transaction', 'connection to %s lost during the transaction' % host
+		)
+
+	# Commit everything
+	Record_MySQL.Commands.execute(host, 'COMMIT')
+
+# Bulk class
+class Bulk(object):
+	"""Bulk
+
+	Mixin for Record_MySQL.Record classes that adds creating many records with
+	a single multi-row INSERT. Unlike Record_MySQL.Record.create_many, only the
+	fields set on the records are sent, so defaults like `_created` are still
+	filled in by the DB
+	"""
 
 	@classmethod
-	def by_client(cls, client, custom={}):
-		"""Range
+	def create_bulk(cls, records, custom={}):
+		"""Create Bulk
 
-		Returns all invoices associated with a specific client
+		Inserts all the records at once and returns their primary keys. Any
+		record without a primary key is given a new UUID
 
 		Arguments:
-			client (str): ID of the client
+			records (Record[]): The instances to create
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			str[]
 		"""
 
+		# If there's no records, there's nothing to do
+		if not records:
+			return []
+
 		# Fetch the record structure
 		dStruct = cls.struct(custom)
 
-		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`i`.`_id` as `_id`,\n" \
-				"	`i`.`_created` as `_created`,\n" \
-				"	`i`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`i`.`identifier` as `identifier`,\n" \
-				"	`i`.`start` as `start`,\n" \
-				"	`i`.`end` as `end`,\n" \
-				"	`i`.`total` as `total`\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
-				"WHERE `client` %(client)s\n" \
-				"ORDER BY `i`.`_created` DESC" % {
-			"db": dStruct['db'],
-			"table": dStruct['table'],
-			"client": cls.process_value(dStruct, 'client', client)
-		}
+		# Make sure every record has a primary key
+		for o in records:
+			if dStruct['primary'] not in o:
+				o[dStruct['primary']] = str(uuid.uuid4())
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
+		# Get the raw data of each record
+		lRecords = [o.record() for o in records]
+
+		# Get the fields set on any of the records, with the primary first
+		lFields = [dStruct['primary']] + [
+			f for f in dStruct['tree'].keys() \
+			if f != dStruct['primary'] and any(f in d for d in lRecords)
+		]
+
+		# Generate the values of each record, letting the DB use the default
+		#	for any field missing
+		lValues = []
+		for d in lRecords:
+			lRow = []
+			for f in lFields:
+				if f in d:
+					lRow.append(cls.escape(dStruct['host'], dStruct['tree'][f], d[f]))
+				else:
+					lRow.append('DEFAULT')
+			lValues.append('(%s)' % ', '.join(lRow))
+
+		# Generate SQL
+		sSQL = "INSERT INTO `%s`.`%s` (`%s`)\nVALUES %s" % (
+			dStruct['db'],
+			dStruct['table'],
+			'`, `'.join(lFields),
+			',\n'.join(lValues)
 		)
 
+		# Execute the insert
+		Record_MySQL.Commands.execute(dStruct['host'], sSQL)
+
+		# Return the primary keys
+		return [d[dStruct['primary']] for d in lRecords]
+
+# Cache class
+class Cache(object):
+	"""Cache
+
+	Mixin for Record_MySQL.Record classes that adds a read-through Redis cache
+	of raw records, modeled on User.cache_get / User.clear. Records are removed
+	from the cache whenever an instance is saved or deleted, and hits and
+	misses are counted per table in the `cache:stats` hash
+
+	Must come before Record_MySQL.Record in the list of bases
+	"""
+
+	_redis = None
+	"""The Redis instance used to store the records"""
+
+	_ttl = 0
+	"""The number of seconds records are kept in the cache, 0 for no expiry"""
+
+	_decimals = None
+	"""The fields that have to be converted back to Decimal when decoded"""
+
 	@classmethod
-	def config(cls):
-		"""Config
+	def cache_clear(cls, _id):
+		"""Cache Clear
 
-		Returns the configuration data associated with the record type
+		Removes a record from the cache, as well as the first record if the
+		type is used as a single record
+
+		Arguments:
+			_id (str): The ID of the record to clear
 
 		Returns:
-			dict
+			None
 		"""
 
-		# If we haven loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/invoice.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+		# If there's no cache, do nothing
+		if not cls._redis:
+			return
 
-		# Return the config
-		return cls._conf
+		# Delete the keys in Redis
+		cls._redis.delete(cls.cache_key(_id), cls.cache_key(None))
 
 	@classmethod
-	def range(cls, range, clients, custom={}):
-		"""Range
+	def cache_get(cls, _id=None):
+		"""Cache Get
 
-		Returns all invoices in a timeframe that are optionally associated with
-		specific clients
+		Gets a record from the cache, if it can't be found, defaults to
+		fetching from the DB and filling the cache. If no ID is passed, the
+		first record is returned, for types used as a single record
 
 		Arguments:
-			range (uint[]): The start and end date of the invoices
-			clients (str): Optional ID or IDs of clients
-			custom (dict): Custom Host and DB info
-				'host' the name of the host to get/set data on
-				'append' optional postfix for dynamic DBs
+			_id (str): Optional, the ID of the record to fetch
 
 		Returns:
-			list
+			dict
 		"""
 
-		# Fetch the record structure
-		dStruct = cls.struct(custom)
+		# If there's no cache, go straight to the DB
+		if not cls._redis:
+			return cls.get(_id, raw=True, limit=(_id is None and 1 or None))
 
-		# Init the where
-		lWhere = ['`i`.`_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
-			int(range[0]), int(range[1])
-		)]
+		# Get the name of the key
+		sKey = cls.cache_key(_id)
 
-		# If we have clients
-		if clients:
-			lWhere.append('`i`.`client` %s' % cls.process_value(dStruct, 'client', clients))
+		# Fetch the key
+		sRecord = cls._redis.get(sKey)
 
-		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`i`.`_id` as `_id`,\n" \
-				"	`i`.`_created` as `_created`,\n" \
-				"	`i`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`i`.`identifier` as `identifier`,\n" \
-				"	`i`.`start` as `start`,\n" \
-				"	`i`.`end` as `end`,\n" \
-				"	`i`.`total` as `total`\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
-				"WHERE %(where)s\n" \
-				"ORDER BY `i`.`_created` DESC" % {
-			"db": dStruct['db'],
-			"table": dStruct['table'],
-			"where": '\nAND'.join(lWhere)
-		}
+		# If we have a record
+		if sRecord:
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
-		)
+			# Count the hit
+			cls._redis.hincrby('cache:stats', '%s:hit' % cls.struct()['table'])
+
+			# Decode it and convert any decimals
+			dRecord = JSON.decode(sRecord)
+			for f in cls._cache_decimals():
+				if dRecord[f] is not None:
+					dRecord[f] = Decimal(dRecord[f])
+
+			# Return it
+			return dRecord
+
+		# Fetch the record from the DB
+		dRecord = cls.get(_id, raw=True, limit=(_id is None and 1 or None))
+
+		# Count the miss and, if we got the record, store it in the cache
+		oPipe = cls._redis.pipeline()
+		oPipe.hincrby('cache:stats', '%s:miss' % cls.struct()['table'])
+		if dRecord:
+			oPipe.set(sKey, JSON.encode(dRecord), ex=(cls._ttl or None))
+		oPipe.execute()
+
+		# Return the record
+		return dRecord
 
 	@classmethod
-	def total(cls, clients, custom={}):
-		"""Total
+	def cache_get_many(cls, ids):
+		"""Cache Get Many
 
-		Returns the total invoices amount for one or multiple clients
+		Gets several records from the cache in a single trip, any that can't be
+		found are fetched from the DB together and added to the cache
 
 		Arguments:
-			clients (str|str[]): The ID(s) of the client(s)
-			custom (dict): Custom Host and DB info
-				'host' the name of the host to get/set data on
-				'append' optional postfix for dynamic DBs
+			ids (str[]): The IDs of the records to fetch
 
 		Returns:
-			str
+			dict: Records by ID, missing any that don't exist
 		"""
 
-		# Fetch the record structure
-		dStruct = cls.struct(custom)
+		# If there's nothing to fetch, return nothing
+		if not ids:
+			return {}
+
+		# If there's no cache, go straight to the DB
+		if not cls._redis:
+			return {d['_id']: d for d in cls.get(list(ids), raw=True)}
+
+		# Fetch all the keys
+		lIDs = list(ids)
+		lRecords = cls._redis.mget([cls.cache_key(s) for s in lIDs])
+
+		# Decode the ones found and note the ones missing
+		dRet = {}
+		lMissing = []
+		for i in range(len(lIDs)):
+			if lRecords[i]:
+				dRecord = JSON.decode(lRecords[i])
+				for f in cls._cache_decimals():
+					if dRecord[f] is not None:
+						dRecord[f] = Decimal(dRecord[f])
+				dRet[lIDs[i]] = dRecord
+			else:
+				lMissing.append(lIDs[i])
+
+		# Count the hits and misses, fetch the missing records from the DB,
+		#	and store them in the cache
+		sTable = cls.struct()['table']
+		oPipe = cls._redis.pipeline()
+		if dRet:
+			oPipe.hincrby('cache:stats', '%s:hit' % sTable, len(dRet))
+		if lMissing:
+			oPipe.hincrby('cache:stats', '%s:miss' % sTable, len(lMissing))
+			for dRecord in cls.get(lMissing, raw=True):
+				dRet[dRecord['_id']] = dRecord
+				oPipe.set(
+					cls.cache_key(dRecord['_id']),
+					JSON.encode(dRecord),
+					ex=(cls._ttl or None)
+				)
+		oPipe.execute()
+
+		# Return the records
+		return dRet
 
-		# Generate SQL
-		sSQL = "SELECT SUM(`total`)\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"WHERE `client` %(client)s\n" % {
-			"db": dStruct['db'],
-			"table": dStruct['table'],
-			"client": cls.process_value(dStruct, 'client', clients)
-		}
+	@classmethod
+	def cache_key(cls, _id):
+		"""Cache Key
 
-		# Get the total
-		sTotal = Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.CELL
+		Returns the key used to store a record in the cache
+
+		Arguments:
+			_id (str): The ID of the record, or None for the first record
+
+		Returns:
+			str
+		"""
+		return '%s:%s' % (
+			cls.struct()['table'],
+			_id is None and '__first__' or _id
 		)
 
-		# If it's None
-		if sTotal == None:
-			return '0.00'
+	@staticmethod
+	def cache_stats(redis):
+		"""Cache Stats
 
-		# Return the total
-		return sTotal
+		Returns the hits and misses of every table using the cache
 
-# InvoiceAdditional class
-class InvoiceAdditional(Record_MySQL.Record):
-	"""Invoice Additional
+		Arguments:
+			redis (StrictRedis): A Redis instance
 
-	Represents a client invoice item that is not associated with time
-	"""
+		Returns:
+			dict
+		"""
 
-	_conf = None
-	"""Configuration"""
+		# Init the return
+		dRet = {}
+
+		# Go through each field in the hash and split out the table and type
+		for sField, sCount in redis.hgetall('cache:stats').items():
+			sTable, sType = sField.decode().split(':')
+			try:
+				dRet[sTable][sType] = int(sCount)
+			except KeyError:
+				dRet[sTable] = {'hit': 0, 'miss': 0}
+				dRet[sTable][sType] = int(sCount)
+
+		# Return the stats
+		return dRet
 
 	@classmethod
-	def config(cls):
-		"""Config
+	def _cache_decimals(cls):
+		"""Cache Decimals
 
-		Returns the configuration data associated with the record type
+		Returns the list of fields in the record that are stored as decimals,
+		which JSON encodes as strings
 
 		Returns:
-			dict
+			str[]
 		"""
 
-		# If we haven loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/invoice_additional.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+		# If we haven't generated the list yet
+		if cls._decimals is None:
+			oTree = cls.struct()['tree']
+			cls._decimals = [
+				f for f in oTree.keys() \
+				if oTree[f].className() == 'Node' and \
+					oTree[f].type() in ['decimal', 'price']
+			]
 
-		# Return the config
-		return cls._conf
+		# Return the list
+		return cls._decimals
 
-# InvoiceItem class
-class InvoiceItem(Record_MySQL.Record):
-	"""Invoice Item
+	def delete(self, changes=None):
+		"""Delete
 
-	Represents a client invoice item associated with a project / time
+		Deletes the record and removes it from the cache
+
+		Arguments:
+			changes (dict): Data needed to store a change record
+
+		Returns:
+			bool
+		"""
+
+		# Delete the record
+		bRes = super().delete(changes)
+
+		# Clear the cache and return the result
+		self.cache_clear(self['_id'])
+		return bRes
+
+	@classmethod
+	def redis(cls, redis, ttl=0):
+		"""Redis
+
+		Stores the Redis connection to be used to fetch and store records
+
+		Arguments:
+			redis (StrictRedis): A Redis instance
+			ttl (uint): Optional, seconds records are kept in the cache
+
+		Returns:
+			None
+		"""
+		cls._redis = redis
+		cls._ttl = ttl
+
+	def save(self, replace=False, changes=None):
+		"""Save
+
+		Saves the record and removes it from the cache
+
+		Arguments:
+			replace (bool): If true, replace all fields instead of updating
+			changes (dict): Data needed to store a change record
+
+		Returns:
+			bool
+		"""
+
+		# Save the record
+		bRes = super().save(replace, changes)
+
+		# Clear the cache and return the result
+		self.cache_clear(self['_id'])
+		return bRes
+
+# Identity class
+class Identity(object):
+	"""Identity
+
+	Mixin for Record_MySQL.Record classes that keeps every record fetched by a
+	single ID during a request, so that fetching it again returns the one
+	already loaded instead of going back to the DB or the cache. Instances are
+	returned as is, raw records as copies so the caller can change them. Each
+	fetch avoided is counted, see request_avoided
+
+	Must come before Cache and Record_MySQL.Record in the list of bases
 	"""
 
-	_conf = None
-	"""Configuration"""
+	@classmethod
+	def _identity(cls, kind, _id, fetch):
+		"""Identity
+
+		Returns the record of the given kind from the current request, or
+		fetches it and keeps it for the rest of the request
+
+		Arguments:
+			kind (str): 'instance' or 'raw'
+			_id (str): The ID of the record, or None for the first record
+			fetch (callable): Called to fetch the record if it's not loaded
+
+		Returns:
+			Record_MySQL.Record|dict|None
+		"""
+
+		# If we're not in a request, just fetch it
+		dRecords = getattr(_request, 'records', None)
+		if dRecords is None:
+			return fetch()
+
+		# If we already have it, count the fetch avoided and return it
+		tKey = (cls.struct()['table'], kind, _id is None and '__first__' or _id)
+		if tKey in dRecords:
+			_request.avoided += 1
+			mRecord = dRecords[tKey]
+			return kind == 'raw' and dict(mRecord) or mRecord
+
+		# Fetch it and, if it exists, keep it for the request
+		mRecord = fetch()
+		if mRecord:
+			dRecords[tKey] = kind == 'raw' and dict(mRecord) or mRecord
+
+		# Return the record
+		return mRecord
 
 	@classmethod
-	def by_invoice(cls, invoice, custom={}):
-		"""By Invoice
+	def cache_get(cls, _id=None):
+		"""Cache Get
 
-		Returns all items associated with a specific invoice, including the
-		names of the projects
+		Returns the raw record if it was already loaded in the request, else
+		gets it from the cache
 
 		Arguments:
-			invoice (str): The ID of the invoice
-			custom (dict): Custom Host and DB info
-				'host' the name of the host to get/set data on
-				'append' optional postfix for dynamic DBs
+			_id (str): Optional, the ID of the record to fetch
 
 		Returns:
-			list
+			dict
 		"""
+		return cls._identity('raw', _id, lambda: super(Identity, cls).cache_get(_id))
 
-		# Fetch the record structure
-		dStruct = cls.struct(custom)
+	def delete(self, changes=None):
+		"""Delete
 
-		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`i`.`project` as `project`,\n" \
-				"	`p`.`name` as `projectName`,\n" \
-				"	`i`.`minutes` as `minutes`,\n" \
-				"	`i`.`amount` as `amount`" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"JOIN `%(db)s`.`project` as `p` ON `i`.`project` = `p`.`_id`\n" \
-				"WHERE `invoice` = '%(invoice)s'\n" \
-				"ORDER BY `p`.`name`" % {
-			"db": dStruct['db'],
-			"table": dStruct['table'],
-			"invoice": invoice
-		}
+		Deletes the record and removes it from the request
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
+		Arguments:
+			changes (dict): Data needed to store a change record
+
+		Returns:
+			bool
+		"""
+		bRes = super().delete(changes)
+		self.identity_clear(self['_id'])
+		return bRes
+
+	@classmethod
+	def get(cls, _id=None, *args, **kwargs):
+		"""Get
+
+		Returns the record if it was already loaded in the request, else
+		fetches it. Only fetches of a single ID, with no other arguments than
+		raw, are kept
+
+		Returns:
+			Record_MySQL.Record|dict|list|None
+		"""
+
+		# If it's not a fetch of a single record, pass it along
+		mRaw = kwargs.get('raw')
+		if args or not isinstance(_id, str) or \
+			set(kwargs) - {'raw', 'custom'} or kwargs.get('custom') or \
+			mRaw not in [None, False, True]:
+			return super().get(_id, *args, **kwargs)
+
+		# Return it from the request, or fetch it
+		return cls._identity(
+			mRaw and 'raw' or 'instance',
+			_id,
+			lambda: super(Identity, cls).get(_id, **kwargs)
 		)
 
+	@classmethod
+	def identity_clear(cls, _id):
+		"""Identity Clear
+
+		Removes a record from the request, as well as the first record if the
+		type is used as a single record
+
+		Arguments:
+			_id (str): The ID of the record to clear
+
+		Returns:
+			None
+		"""
+		dRecords = getattr(_request, 'records', None)
+		if dRecords:
+			sTable = cls.struct()['table']
+			for sKind in ['instance', 'raw']:
+				dRecords.pop((sTable, sKind, _id), None)
+				dRecords.pop((sTable, sKind, '__first__'), None)
+
+	def save(self, replace=False, changes=None):
+		"""Save
+
+		Saves the record and removes it from the request
+
+		Arguments:
+			replace (bool): If true, replace all fields instead of updating
+			changes (dict): Data needed to store a change record
+
+		Returns:
+			bool
+		"""
+		bRes = super().save(replace, changes)
+		self.identity_clear(self['_id'])
+		return bRes
+
+# Load the compiled definitions, if there are any
+_compiled = _compiled_load()
+
+# Access class
+class Access(Record_MySQL.Record):
+	"""Access
+
+	Represents a single permission associated with a user
+	"""
+
+	_conf = None
+	"""Configuration"""
+
 	@classmethod
 	def config(cls):
 		"""Config
@@ -395,21 +944,18 @@ class InvoiceItem(Record_MySQL.Record):
 			dict
 		"""
 
-		# If we haven loaded the config yet
+		# If we haven't loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/invoice_item.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('access')
 
 		# Return the config
 		return cls._conf
 
-# Key class
-class Key(Record_MySQL.Record):
-	"""Key
+# Client class
+class Client(Identity, Cache, Record_MySQL.Record):
+	"""Client
 
-	Represents a key for email verification, forgotten password, etc.
+	Represents a client (company) that can be billed
 	"""
 
 	_conf = None
@@ -427,38 +973,153 @@ class Key(Record_MySQL.Record):
 
 		# If we haven loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/key.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('client')
 
 		# Return the config
 		return cls._conf
 
-# Payment class
-class Payment(Record_MySQL.Record):
-	"""Payment
+# ClientBalance class
+class ClientBalance(Record_MySQL.Record):
+	"""Client Balance
 
-	Represents a single payment by a client
+	Represents the running totals of the invoices and payments of a client, so
+	that what a client owes can be read without summing their entire history
 	"""
 
 	_conf = None
 	"""Configuration"""
 
+	_fields = {
+		'invoice': ['total', 'invoiced', 'invoices', 'last_invoice'],
+		'payment': ['amount', 'paid', 'payments', 'last_payment']
+	}
+	"""The amount field of each source, and the ledger fields it's added to"""
+
 	@classmethod
-	def by_client(cls, client, custom={}):
-		"""Range
+	def _actual(cls, custom={}):
+		"""Actual
 
-		Returns all invoices associated with a specific client
+		Returns the SQL to select the totals of every client calculated from
+		the invoices and payments themselves
 
 		Arguments:
-			client (str): ID of the client
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			str
+		"""
+
+		# Fetch the record structures
+		dStruct = cls.struct(custom)
+
+		# Generate and return the SQL
+		return "SELECT\n" \
+				"	`c`.`_id` as `client`,\n" \
+				"	IFNULL(`i`.`total`, 0) as `invoiced`,\n" \
+				"	IFNULL(`i`.`count`, 0) as `invoices`,\n" \
+				"	`i`.`last` as `last_invoice`,\n" \
+				"	IFNULL(`p`.`total`, 0) as `paid`,\n" \
+				"	IFNULL(`p`.`count`, 0) as `payments`,\n" \
+				"	`p`.`last` as `last_payment`\n" \
+				"FROM `%(db)s`.`%(client)s` as `c`\n" \
+				"LEFT JOIN (\n" \
+				"	SELECT `client`, SUM(`total`) as `total`, COUNT(*) as `count`, MAX(`_created`) as `last`\n" \
+				"	FROM `%(db)s`.`%(invoice)s`\n" \
+				"	GROUP BY `client`\n" \
+				") as `i` ON `i`.`client` = `c`.`_id`\n" \
+				"LEFT JOIN (\n" \
+				"	SELECT `client`, SUM(`amount`) as `total`, COUNT(*) as `count`, MAX(`_created`) as `last`\n" \
+				"	FROM `%(db)s`.`%(payment)s`\n" \
+				"	GROUP BY `client`\n" \
+				") as `p` ON `p`.`client` = `c`.`_id`" % {
+			"db": dStruct['db'],
+			"client": Client.struct(custom)['table'],
+			"invoice": Invoice.struct(custom)['table'],
+			"payment": Payment.struct(custom)['table']
+		}
+
+	@classmethod
+	def _source(cls, type_, custom={}):
+		"""Source
+
+		Returns the structure and the fields of an invoice or payment
+
+		Arguments:
+			type_ (str): 'invoice' or 'payment'
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			tuple
+		"""
+		return (
+			(type_ == 'invoice' and Invoice or Payment).struct(custom),
+			cls._fields[type_]
+		)
+
+	@classmethod
+	def add(cls, type_, ids, custom={}):
+		"""Add
+
+		Adds one or more invoices or payments to the totals of their clients.
+		The values are taken from the source table so this must be called
+		after the records have been created
+
+		Arguments:
+			type_ (str): 'invoice' or 'payment'
+			ids (str|str[]): The ID or IDs of the records
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the record structures and fields
+		dStruct = cls.struct(custom)
+		dSource, lFields = cls._source(type_, custom)
+
+		# Generate SQL
+		sSQL = "INSERT INTO `%(db)s`.`%(table)s` (`client`, `%(sum)s`, `%(count)s`, `%(last)s`)\n" \
+				"SELECT `client`, SUM(`%(amount)s`), COUNT(*), MAX(`_created`)\n" \
+				"FROM `%(db)s`.`%(source)s`\n" \
+				"WHERE `_id` %(ids)s\n" \
+				"GROUP BY `client`\n" \
+				"ON DUPLICATE KEY UPDATE\n" \
+				"	`%(sum)s` = `%(sum)s` + VALUES(`%(sum)s`),\n" \
+				"	`%(count)s` = `%(count)s` + VALUES(`%(count)s`),\n" \
+				"	`%(last)s` = GREATEST(IFNULL(`%(last)s`, VALUES(`%(last)s`)), VALUES(`%(last)s`))" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"source": dSource['table'],
+			"amount": lFields[0],
+			"sum": lFields[1],
+			"count": lFields[2],
+			"last": lFields[3],
+			"ids": cls.process_value(dSource, '_id', ids)
+		}
+
+		# Execute and return the result
+		return Record_MySQL.Commands.execute(dStruct['host'], sSQL)
+
+	@classmethod
+	def balances(cls, custom={}):
+		"""Balances
+
+		Returns the balance of every client in the ledger, ordered by the name
+		of the client
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
 		"""
 
 		# Fetch the record structure
@@ -466,19 +1127,21 @@ class Payment(Record_MySQL.Record):
 
 		# Generate SQL
 		sSQL = "SELECT\n" \
-				"	`i`.`_id` as `_id`,\n" \
-				"	`i`.`_created` as `_created`,\n" \
-				"	`i`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`i`.`transaction` as `transaction`,\n" \
-				"	`i`.`amount` as `amount`\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
-				"WHERE `client` %(client)s\n" \
-				"ORDER BY `i`.`_created` DESC" % {
+				"	`b`.`client`,\n" \
+				"	`c`.`name`,\n" \
+				"	`b`.`invoiced`,\n" \
+				"	`b`.`invoices`,\n" \
+				"	`b`.`last_invoice`,\n" \
+				"	`b`.`paid`,\n" \
+				"	`b`.`payments`,\n" \
+				"	`b`.`last_payment`,\n" \
+				"	`b`.`invoiced` - `b`.`paid` as `owes`\n" \
+				"FROM `%(db)s`.`%(table)s` as `b`\n" \
+				"JOIN `%(db)s`.`%(client)s` as `c` ON `b`.`client` = `c`.`_id`\n" \
+				"ORDER BY `c`.`name`" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"client": cls.process_value(dStruct, 'client', client)
+			"client": Client.struct(custom)['table']
 		}
 
 		# Execute and return the select
@@ -498,65 +1161,54 @@ class Payment(Record_MySQL.Record):
 			dict
 		"""
 
-		# If we haven loaded the config yet
+		# If we haven't loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/payment.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('client_balance')
 
 		# Return the config
 		return cls._conf
 
 	@classmethod
-	def range(cls, range, clients, custom={}):
-		"""Range
+	def drift(cls, custom={}):
+		"""Drift
 
-		Returns all payments in a timeframe that are optionally associated with
-		specific clients
+		Returns every client whose totals in the ledger don't match the totals
+		of their invoices and payments, with both sets of values
 
 		Arguments:
-			range (uint[]): The start and end date of the payments
-			clients (str): Optional ID or IDs of clients
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			dict[]
 		"""
 
 		# Fetch the record structure
 		dStruct = cls.struct(custom)
 
-		# Init the where
-		lWhere = ['`i`.`_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
-			int(range[0]), int(range[1])
-		)]
-
-		# If we have clients
-		if clients:
-			lWhere.append('`i`.`client` %s' % cls.process_value(dStruct, 'client', clients))
-
 		# Generate SQL
 		sSQL = "SELECT\n" \
-				"	`i`.`_id` as `_id`,\n" \
-				"	`i`.`_created` as `_created`,\n" \
-				"	`i`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`i`.`transaction` as `transaction`,\n" \
-				"	`i`.`amount` as `amount`\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
-				"WHERE %(where)s\n" \
-				"ORDER BY `i`.`_created` DESC" % {
+				"	`a`.`client`,\n" \
+				"	IFNULL(`b`.`invoiced`, 0) as `invoiced`,\n" \
+				"	`a`.`invoiced` as `invoiced_actual`,\n" \
+				"	IFNULL(`b`.`invoices`, 0) as `invoices`,\n" \
+				"	`a`.`invoices` as `invoices_actual`,\n" \
+				"	IFNULL(`b`.`paid`, 0) as `paid`,\n" \
+				"	`a`.`paid` as `paid_actual`,\n" \
+				"	IFNULL(`b`.`payments`, 0) as `payments`,\n" \
+				"	`a`.`payments` as `payments_actual`\n" \
+				"FROM (\n%(actual)s\n) as `a`\n" \
+				"LEFT JOIN `%(db)s`.`%(table)s` as `b` ON `b`.`client` = `a`.`client`\n" \
+				"WHERE IFNULL(`b`.`invoiced`, 0) != `a`.`invoiced`\n" \
+				"OR IFNULL(`b`.`invoices`, 0) != `a`.`invoices`\n" \
+				"OR IFNULL(`b`.`paid`, 0) != `a`.`paid`\n" \
+				"OR IFNULL(`b`.`payments`, 0) != `a`.`payments`" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"where": '\nAND'.join(lWhere)
+			"actual": cls._actual(custom)
 		}
 
-		print(sSQL)
-
 		# Execute and return the select
 		return Record_MySQL.Commands.select(
 			dStruct['host'],
@@ -565,10 +1217,11 @@ class Payment(Record_MySQL.Record):
 		)
 
 	@classmethod
-	def total(cls, clients, custom={}):
-		"""Total
+	def owes(cls, clients, custom={}):
+		"""Owes
 
-		Returns the total payments amount for one or multiple clients
+		Returns the total invoiced minus the total paid for one or multiple
+		clients
 
 		Arguments:
 			clients (str|str[]): The ID(s) of the client(s)
@@ -577,70 +1230,125 @@ class Payment(Record_MySQL.Record):
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			str
+			Decimal
 		"""
 
 		# Fetch the record structure
 		dStruct = cls.struct(custom)
 
 		# Generate SQL
-		sSQL = "SELECT SUM(`amount`)\n" \
-				"FROM `%(db)s`.`%(table)s` as `i`\n" \
-				"WHERE `client` %(client)s\n" % {
+		sSQL = "SELECT SUM(`invoiced` - `paid`)\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE `client` %(client)s" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
 			"client": cls.process_value(dStruct, 'client', clients)
 		}
 
 		# Get the total
-		sTotal = Record_MySQL.Commands.select(
+		deTotal = Record_MySQL.Commands.select(
 			dStruct['host'],
 			sSQL,
 			Record_MySQL.ESelect.CELL
 		)
 
-		# If it's None
-		if sTotal == None:
-			return '0.00'
+		# Return the total, or zero if the clients have no history
+		return deTotal is None and Decimal('0.00') or deTotal
 
-		# Return the total
-		return sTotal
+	@classmethod
+	def rebuild(cls, custom={}):
+		"""Rebuild
 
-# Project class
-class Project(Record_MySQL.Record):
-	"""Project
+		Sets the totals of every client from their invoices and payments, in
+		place so that the ledger is never missing or empty
 
-	Represents a single project in a specific company
-	"""
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
 
-	_conf = None
-	"""Configuration"""
+		Returns:
+			uint
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "INSERT INTO `%(db)s`.`%(table)s` (\n" \
+				"	`client`, `invoiced`, `invoices`, `last_invoice`,\n" \
+				"	`paid`, `payments`, `last_payment`\n" \
+				")\n" \
+				"%(actual)s\n" \
+				"ON DUPLICATE KEY UPDATE\n" \
+				"	`invoiced` = VALUES(`invoiced`),\n" \
+				"	`invoices` = VALUES(`invoices`),\n" \
+				"	`last_invoice` = VALUES(`last_invoice`),\n" \
+				"	`paid` = VALUES(`paid`),\n" \
+				"	`payments` = VALUES(`payments`),\n" \
+				"	`last_payment` = VALUES(`last_payment`)" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"actual": cls._actual(custom)
+		}
+
+		# Execute and return the result
+		return Record_MySQL.Commands.execute(dStruct['host'], sSQL)
 
 	@classmethod
-	def config(cls):
-		"""Config
+	def subtract(cls, type_, _id, custom={}):
+		"""Subtract
 
-		Returns the configuration data associated with the record type
+		Removes an invoice or payment from the totals of its client. The
+		values are taken from the source table so this must be called before
+		the record is deleted
+
+		Arguments:
+			type_ (str): 'invoice' or 'payment'
+			_id (str): The ID of the record
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
 
 		Returns:
-			dict
+			uint
 		"""
 
-		# If we haven loaded the config yet
-		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/project.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+		# Fetch the record structures and fields
+		dStruct = cls.struct(custom)
+		dSource, lFields = cls._source(type_, custom)
+
+		# Generate SQL, the last activity is looked up again from the client's
+		#	remaining records
+		sSQL = "UPDATE `%(db)s`.`%(table)s` as `b`\n" \
+				"JOIN `%(db)s`.`%(source)s` as `s` ON `b`.`client` = `s`.`client`\n" \
+				"SET `b`.`%(sum)s` = `b`.`%(sum)s` - `s`.`%(amount)s`,\n" \
+				"	`b`.`%(count)s` = `b`.`%(count)s` - 1,\n" \
+				"	`b`.`%(last)s` = (\n" \
+				"		SELECT MAX(`_created`)\n" \
+				"		FROM `%(db)s`.`%(source)s`\n" \
+				"		WHERE `client` = `s`.`client`\n" \
+				"		AND `_id` != %(_id)s\n" \
+				"	)\n" \
+				"WHERE `s`.`_id` = %(_id)s" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"source": dSource['table'],
+			"amount": lFields[0],
+			"sum": lFields[1],
+			"count": lFields[2],
+			"last": lFields[3],
+			"_id": cls.escape(dSource['host'], dSource['tree']['_id'], _id)
+		}
 
-		# Return the config
-		return cls._conf
+		# Execute and return the result
+		return Record_MySQL.Commands.execute(dStruct['host'], sSQL)
 
-# Task class
-class Task(Record_MySQL.Record):
-	"""Task
+# Company class
+class Company(Identity, Cache, Record_MySQL.Record):
+	"""Company
 
-	Represents a single task in a project in a specific company
+	Represents the company doing the tasks that will invoice the client
 	"""
 
 	_conf = None
@@ -658,98 +1366,120 @@ class Task(Record_MySQL.Record):
 
 		# If we haven loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/task.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('company')
 
 		# Return the config
 		return cls._conf
 
-# User class
-class User(Record_MySQL.Record):
-	"""User
+# Invoice class
+class Invoice(Identity, Bulk, Record_MySQL.Record):
+	"""Invoice
 
-	Represents a person who can login to the system
+	Represents a client invoice
 	"""
 
 	_conf = None
 	"""Configuration"""
 
 	@classmethod
-	def clear(cls, _id):
-		"""Clear
+	def _list(cls, where, limit, cursor, count, custom):
+		"""List
 
-		Removes a user from the cache
+		Returns the invoices matching the conditions, newest first, or just the
+		count of them, shared by by_client and range
 
 		Arguments:
-			_id (str): The ID of the user we want to clear
-
-		Returns:
-			None
-		"""
-
-		# Delete the key in Redis
-		cls._redis.delete('user:%s' % _id)
-
-	@classmethod
-	def cache_get(cls, _id):
-		"""Cache Get
-
-		Gets a user from the cache, if they can't be found, defaults to fetching
-		from the DB and filling the cache
+			where (str[]): The conditions
+			limit (uint): The maximum number of invoices to return
+			cursor (str): Return the invoices after this cursor
+			count (bool): Return the total matching instead of the records
+			custom (dict): Custom Host and DB info
 
-		Arguments:
-			_id (str): The ID of the user to fetch
+		Raises:
+			ValueError
 
 		Returns:
-			dict
+			list|uint
 		"""
 
-		# Fetch a single key
-		sUser = cls._redis.get('user:%s' % _id)
-
-		# If we have a record
-		if sUser:
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
 
-			# Decode it
-			dUser = JSON.decode(sUser)
+		# If we only want the count
+		if count:
+			return Record_MySQL.Commands.select(
+				dStruct['host'],
+				"SELECT COUNT(*)\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"WHERE %(where)s" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"where": '\nAND '.join(where)
+				},
+				Record_MySQL.ESelect.CELL
+			)
 
-		# Else
-		else:
+		# If we have a cursor, start after it
+		if cursor:
+			where = where + [_keyset('`i`.`_created`', cursor)]
 
-			# Fetch the user from the DB
-			dUser = cls.get(_id, raw=True)
+		# Generate SQL
+		sSQL = "SELECT\n" \
+				"	`i`.`_id` as `_id`,\n" \
+				"	`i`.`_created` as `_created`,\n" \
+				"	`i`.`client` as `client`,\n" \
+				"	`c`.`name` as `clientName`,\n" \
+				"	`i`.`identifier` as `identifier`,\n" \
+				"	`i`.`start` as `start`,\n" \
+				"	`i`.`end` as `end`,\n" \
+				"	`i`.`total` as `total`\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
+				"WHERE %(where)s\n" \
+				"ORDER BY `i`.`_created` DESC, `i`.`_id` DESC%(limit)s" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"where": '\nAND '.join(where),
+			"limit": limit and ('\nLIMIT %d' % int(limit)) or ''
+		}
 
-			# If there's no user
-			if not dUser:
-				return None
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
 
-			# Remove the password
-			del dUser['passwd']
+	@classmethod
+	def by_client(cls, client, limit=None, cursor=None, count=False, custom={}):
+		"""By Client
 
-			# If the user is not an admin
-			if dUser['type'] != 'admin':
+		Returns all invoices associated with a specific client, newest first
 
-				# Look for access values
-				lAccess = Access.filter({
-					"user": _id
-				}, raw=['client'])
+		Arguments:
+			client (str): ID of the client
+			limit (uint): Optional, the maximum number of invoices to return
+			cursor (str): Optional, return the invoices after this cursor
+			count (bool): Optional, return the total instead of the records
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
 
-				# Store them in the user
-				dUser['access'] = lAccess and \
-									[d['client'] for d in lAccess] or \
-									None
+		Raises:
+			ValueError
 
-			# Else, admin user
-			else:
-				dUser['access'] = None
+		Returns:
+			list|uint
+		"""
 
-			# Store the user in the cache
-			cls._redis.set('user:%s' % _id, JSON.encode(dUser))
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
 
-		# Return the user
-		return dUser
+		# Fetch and return the invoices
+		return cls._list(
+			['`i`.`client` %s' % cls.process_value(dStruct, 'client', client)],
+			limit, cursor, count, custom
+		)
 
 	@classmethod
 	def config(cls):
@@ -763,88 +1493,1619 @@ class User(Record_MySQL.Record):
 
 		# If we haven loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/user.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('invoice')
 
 		# Return the config
 		return cls._conf
 
-	@staticmethod
-	def password_hash(passwd):
-		"""Password Hash
+	@classmethod
+	def range(cls, range, clients, limit=None, cursor=None, count=False, custom={}):
+		"""Range
 
-		Returns a hashed password with a unique salt
+		Returns all invoices in a timeframe that are optionally associated with
+		specific clients, newest first
 
 		Arguments:
-			passwd (str): The password to hash
+			range (uint[]): The start and end date of the invoices
+			clients (str): Optional ID or IDs of clients
+			limit (uint): Optional, the maximum number of invoices to return
+			cursor (str): Optional, return the invoices after this cursor
+			count (bool): Optional, return the total instead of the records
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Raises:
+			ValueError
 
 		Returns:
-			str
+			list|uint
 		"""
 
-		# Generate the salt
-		sSalt = StrHelper.random(32, '_0x')
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
 
-		# Generate the hash
-		sHash = sha1(sSalt.encode('utf-8') + passwd.encode('utf-8')).hexdigest()
+		# Init the where
+		lWhere = ['`i`.`_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
+			int(range[0]), int(range[1])
+		)]
 
-		# Combine the salt and hash and return the new value
-		return sSalt[:20] + sHash + sSalt[20:]
+		# If we have clients
+		if clients:
+			lWhere.append('`i`.`client` %s' % cls.process_value(dStruct, 'client', clients))
+
+		# Fetch and return the invoices
+		return cls._list(lWhere, limit, cursor, count, custom)
 
 	@classmethod
-	def password_strength(cls, passwd):
-		"""Password Strength
+	def total(cls, clients, custom={}):
+		"""Total
 
-		Returns true if a password is secure enough
+		Returns the total invoices amount for one or multiple clients
 
 		Arguments:
-			passwd (str): The password to check
+			clients (str|str[]): The ID(s) of the client(s)
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
 
 		Returns:
-			bool
+			str
 		"""
 
-		# If we don't have enough or the right chars
-		if 8 > len(passwd) or \
-			re.search('[A-Z]+', passwd) == None or \
-			re.search('[a-z]+', passwd) == None or \
-			re.search('[0-9]+', passwd) == None:
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
 
-			# Invalid password
-			return False
+		# Generate SQL
+		sSQL = "SELECT SUM(`total`)\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"WHERE `client` %(client)s\n" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"client": cls.process_value(dStruct, 'client', clients)
+		}
 
-		# Return OK
-		return True
+		# Get the total
+		sTotal = Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.CELL
+		)
 
-	def password_validate(self, passwd):
-		"""Password Validate
+		# If it's None
+		if sTotal == None:
+			return '0.00'
 
-		Validates the given password against the current instance
+		# Return the total
+		return sTotal
 
-		Arguments:
-			passwd (str): The password to validate
+# InvoiceAdditional class
+class InvoiceAdditional(Bulk, Record_MySQL.Record):
+	"""Invoice Additional
+
+	Represents a client invoice item that is not associated with time
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('invoice_additional')
+
+		# Return the config
+		return cls._conf
+
+# InvoiceItem class
+class InvoiceItem(Bulk, Record_MySQL.Record):
+	"""Invoice Item
+
+	Represents a client invoice item associated with a project / time
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def by_invoice(cls, invoice, custom={}):
+		"""By Invoice
+
+		Returns all items associated with a specific invoice, including the
+		names of the projects
+
+		Arguments:
+			invoice (str): The ID of the invoice
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT\n" \
+				"	`i`.`project` as `project`,\n" \
+				"	`p`.`name` as `projectName`,\n" \
+				"	`i`.`minutes` as `minutes`,\n" \
+				"	`i`.`amount` as `amount`" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"JOIN `%(db)s`.`project` as `p` ON `i`.`project` = `p`.`_id`\n" \
+				"WHERE `invoice` = '%(invoice)s'\n" \
+				"ORDER BY `p`.`name`" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"invoice": invoice
+		}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('invoice_item')
+
+		# Return the config
+		return cls._conf
+
+# Key class
+class Key(Record_MySQL.Record):
+	"""Key
+
+	Represents a key for email verification, forgotten password, etc.
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('key')
+
+		# Return the config
+		return cls._conf
+
+# Payment class
+class Payment(Record_MySQL.Record):
+	"""Payment
+
+	Represents a single payment by a client
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def _list(cls, where, limit, cursor, count, custom):
+		"""List
+
+		Returns the payments matching the conditions, newest first, or just the
+		count of them, shared by by_client and range
+
+		Arguments:
+			where (str[]): The conditions
+			limit (uint): The maximum number of payments to return
+			cursor (str): Return the payments after this cursor
+			count (bool): Return the total matching instead of the records
+			custom (dict): Custom Host and DB info
+
+		Raises:
+			ValueError
+
+		Returns:
+			list|uint
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# If we only want the count
+		if count:
+			return Record_MySQL.Commands.select(
+				dStruct['host'],
+				"SELECT COUNT(*)\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"WHERE %(where)s" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"where": '\nAND '.join(where)
+				},
+				Record_MySQL.ESelect.CELL
+			)
+
+		# If we have a cursor, start after it
+		if cursor:
+			where = where + [_keyset('`i`.`_created`', cursor)]
+
+		# Generate SQL
+		sSQL = "SELECT\n" \
+				"	`i`.`_id` as `_id`,\n" \
+				"	`i`.`_created` as `_created`,\n" \
+				"	`i`.`client` as `client`,\n" \
+				"	`c`.`name` as `clientName`,\n" \
+				"	`i`.`transaction` as `transaction`,\n" \
+				"	`i`.`amount` as `amount`\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"JOIN `%(db)s`.`client` as `c` ON `i`.`client` = `c`.`_id`\n" \
+				"WHERE %(where)s\n" \
+				"ORDER BY `i`.`_created` DESC, `i`.`_id` DESC%(limit)s" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"where": '\nAND '.join(where),
+			"limit": limit and ('\nLIMIT %d' % int(limit)) or ''
+		}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def by_client(cls, client, limit=None, cursor=None, count=False, custom={}):
+		"""By Client
+
+		Returns all payments associated with a specific client, newest first
+
+		Arguments:
+			client (str): ID of the client
+			limit (uint): Optional, the maximum number of payments to return
+			cursor (str): Optional, return the payments after this cursor
+			count (bool): Optional, return the total instead of the records
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Raises:
+			ValueError
+
+		Returns:
+			list|uint
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Fetch and return the payments
+		return cls._list(
+			['`i`.`client` %s' % cls.process_value(dStruct, 'client', client)],
+			limit, cursor, count, custom
+		)
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('payment')
+
+		# Return the config
+		return cls._conf
+
+	@classmethod
+	def range(cls, range, clients, limit=None, cursor=None, count=False, custom={}):
+		"""Range
+
+		Returns all payments in a timeframe that are optionally associated with
+		specific clients, newest first
+
+		Arguments:
+			range (uint[]): The start and end date of the payments
+			clients (str): Optional ID or IDs of clients
+			limit (uint): Optional, the maximum number of payments to return
+			cursor (str): Optional, return the payments after this cursor
+			count (bool): Optional, return the total instead of the records
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Raises:
+			ValueError
+
+		Returns:
+			list|uint
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Init the where
+		lWhere = ['`i`.`_created` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
+			int(range[0]), int(range[1])
+		)]
+
+		# If we have clients
+		if clients:
+			lWhere.append('`i`.`client` %s' % cls.process_value(dStruct, 'client', clients))
+
+		# Fetch and return the payments
+		return cls._list(lWhere, limit, cursor, count, custom)
+
+	@classmethod
+	def total(cls, clients, custom={}):
+		"""Total
+
+		Returns the total payments amount for one or multiple clients
+
+		Arguments:
+			clients (str|str[]): The ID(s) of the client(s)
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			str
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT SUM(`amount`)\n" \
+				"FROM `%(db)s`.`%(table)s` as `i`\n" \
+				"WHERE `client` %(client)s\n" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"client": cls.process_value(dStruct, 'client', clients)
+		}
+
+		# Get the total
+		sTotal = Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.CELL
+		)
+
+		# If it's None
+		if sTotal == None:
+			return '0.00'
+
+		# Return the total
+		return sTotal
+
+# Project class
+class Project(Identity, Cache, Record_MySQL.Record):
+	"""Project
+
+	Represents a single project in a specific company
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('project')
+
+		# Return the config
+		return cls._conf
+
+# Task class
+class Task(Identity, Cache, Record_MySQL.Record):
+	"""Task
+
+	Represents a single task in a project in a specific company
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('task')
+
+		# Return the config
+		return cls._conf
+
+# User class
+class User(Record_MySQL.Record):
+	"""User
+
+	Represents a person who can login to the system
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	_lru = OrderedDict()
+	"""The users most recently fetched by this process, with their expiry"""
+
+	_lru_lock = threading.Lock()
+	"""Lock used to access the LRU from multiple threads"""
+
+	_lru_size = 1024
+	"""The maximum number of users kept in the LRU"""
+
+	_lru_ttl = 5
+	"""The number of seconds a user is kept in the LRU"""
+
+	_subscriber = None
+	"""The thread listening for users cleared by other processes"""
+
+	_subscriber_pid = None
+	"""The process the subscriber was started in"""
+
+	@classmethod
+	def _lru_cleared(cls, message):
+		"""LRU Cleared
+
+		Called by the subscriber when any process clears a user
+
+		Arguments:
+			message (dict): The message published
+
+		Returns:
+			None
+		"""
+
+		# Remove the user from the LRU
+		with cls._lru_lock:
+			cls._lru.pop(message['data'].decode(), None)
+
+	@classmethod
+	def _lru_subscribe(cls):
+		"""LRU Subscribe
+
+		Makes sure the subscriber is running in the current process. Started
+		on first use rather than in redis() as the server forks its workers
+		after the service is initialised, and threads don't survive a fork
+
+		Returns:
+			None
+		"""
+
+		# If it's already running in this process, do nothing
+		if cls._subscriber_pid == os.getpid() and cls._subscriber.is_alive():
+			return
+
+		# Empty the LRU as we may have missed messages
+		with cls._lru_lock:
+			cls._lru.clear()
+
+		# Subscribe to the channel and start listening in a thread
+		oPubSub = cls._redis.pubsub(ignore_subscribe_messages=True)
+		oPubSub.subscribe(**{'user:clear': cls._lru_cleared})
+		cls._subscriber = oPubSub.run_in_thread(sleep_time=1, daemon=True)
+		cls._subscriber_pid = os.getpid()
+
+	@classmethod
+	def clear(cls, _id):
+		"""Clear
+
+		Removes a user from the cache, and lets every process know to remove
+		it from their LRU
+
+		Arguments:
+			_id (str): The ID of the user we want to clear
+
+		Returns:
+			None
+		"""
+
+		# Delete the key in Redis and notify the other processes
+		oPipe = cls._redis.pipeline()
+		oPipe.delete('user:%s' % _id)
+		oPipe.publish('user:clear', _id)
+		oPipe.execute()
+
+		# Remove it from the LRU and the request
+		with cls._lru_lock:
+			cls._lru.pop(_id, None)
+		if getattr(_request, 'users', None):
+			_request.users.pop(_id, None)
+
+	@classmethod
+	def cache_get(cls, _id):
+		"""Cache Get
+
+		Gets a user from the cache, if they can't be found, defaults to fetching
+		from the DB and filling the cache. Users already fetched in the current
+		request, or recently by the current process, are returned without
+		going to Redis
+
+		Arguments:
+			_id (str): The ID of the user to fetch
+
+		Returns:
+			dict
+		"""
+
+		# Get the users of the current request, if we're in one
+		dRequest = getattr(_request, 'users', None)
+
+		# If we already fetched the user in this request
+		if dRequest and _id in dRequest:
+			return dRequest[_id]
+
+		# Make sure we're listening for users being cleared
+		cls._lru_subscribe()
+
+		# If the user is in the LRU and hasn't expired, mark it as recently
+		#	used
+		with cls._lru_lock:
+			try:
+				iExpires, dUser = cls._lru[_id]
+				if iExpires > time():
+					cls._lru.move_to_end(_id)
+				else:
+					del cls._lru[_id]
+					dUser = None
+			except KeyError:
+				dUser = None
+
+		# If we got it, store it for the request and return it
+		if dUser:
+			if dRequest is not None:
+				dRequest[_id] = dUser
+			return dUser
+
+		# Fetch a single key
+		sUser = cls._redis.get('user:%s' % _id)
+
+		# If we have a record
+		if sUser:
+
+			# Decode it
+			dUser = JSON.decode(sUser)
+
+		# Else
+		else:
+
+			# Fetch the user from the DB
+			dUser = cls.get(_id, raw=True)
+
+			# If there's no user
+			if not dUser:
+				return None
+
+			# Remove the password
+			del dUser['passwd']
+
+			# If the user is not an admin
+			if dUser['type'] != 'admin':
+
+				# Look for access values
+				lAccess = Access.filter({
+					"user": _id
+				}, raw=['client'])
+
+				# Store them in the user
+				dUser['access'] = lAccess and \
+									[d['client'] for d in lAccess] or \
+									None
+
+			# Else, admin user
+			else:
+				dUser['access'] = None
+
+			# Store the user in the cache
+			cls._redis.set('user:%s' % _id, JSON.encode(dUser))
+
+		# Add the user to the LRU, removing the least recently used if we have
+		#	too many
+		with cls._lru_lock:
+			cls._lru[_id] = (time() + cls._lru_ttl, dUser)
+			cls._lru.move_to_end(_id)
+			while len(cls._lru) > cls._lru_size:
+				cls._lru.popitem(last=False)
+
+		# Store it for the request
+		if dRequest is not None:
+			dRequest[_id] = dUser
+
+		# Return the user
+		return dUser
+
+	@classmethod
+	def cache_get_many(cls, ids):
+		"""Cache Get Many
+
+		Gets several users at once. Those not already in the request or the
+		LRU are fetched from Redis in a single trip, and any still missing
+		are fetched one by one as cache_get would
+
+		Arguments:
+			ids (str[]): The IDs of the users to fetch
+
+		Returns:
+			dict: Users by ID, missing any that don't exist
+		"""
+
+		# Get the users of the current request, if we're in one
+		dRequest = getattr(_request, 'users', None)
+
+		# Make sure we're listening for users being cleared
+		cls._lru_subscribe()
+
+		# Use any already in the request or the LRU
+		dRet = {}
+		lFetch = []
+		iNow = time()
+		with cls._lru_lock:
+			for _id in ids:
+				if dRequest and _id in dRequest:
+					dRet[_id] = dRequest[_id]
+				elif _id in cls._lru and cls._lru[_id][0] > iNow:
+					dRet[_id] = cls._lru[_id][1]
+				else:
+					lFetch.append(_id)
+
+		# If there's nothing left, return what we have
+		if not lFetch:
+			return dRet
+
+		# Fetch the rest from Redis
+		lUsers = cls._redis.mget(['user:%s' % s for s in lFetch])
+
+		# Go through each one, falling back to cache_get for any not in Redis
+		dFound = {}
+		for i in range(len(lFetch)):
+			if lUsers[i]:
+				dFound[lFetch[i]] = JSON.decode(lUsers[i])
+			else:
+				dUser = cls.cache_get(lFetch[i])
+				if dUser:
+					dRet[lFetch[i]] = dUser
+
+		# Add the ones found in Redis to the LRU and the request
+		if dFound:
+			with cls._lru_lock:
+				for _id, dUser in dFound.items():
+					cls._lru[_id] = (iNow + cls._lru_ttl, dUser)
+					cls._lru.move_to_end(_id)
+				while len(cls._lru) > cls._lru_size:
+					cls._lru.popitem(last=False)
+			if dRequest is not None:
+				dRequest.update(dFound)
+			dRet.update(dFound)
+
+		# Return the users
+		return dRet
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('user')
+
+		# Return the config
+		return cls._conf
+
+	@staticmethod
+	def password_hash(passwd):
+		"""Password Hash
+
+		Returns a hashed password with a unique salt
+
+		Arguments:
+			passwd (str): The password to hash
+
+		Returns:
+			str
+		"""
+
+		# Generate the salt
+		sSalt = StrHelper.random(32, '_0x')
+
+		# Generate the hash
+		sHash = sha1(sSalt.encode('utf-8') + passwd.encode('utf-8')).hexdigest()
+
+		# Combine the salt and hash and return the new value
+		return sSalt[:20] + sHash + sSalt[20:]
+
+	@classmethod
+	def password_strength(cls, passwd):
+		"""Password Strength
+
+		Returns true if a password is secure enough
+
+		Arguments:
+			passwd (str): The password to check
+
+		Returns:
+			bool
+		"""
+
+		# If we don't have enough or the right chars
+		if 8 > len(passwd) or \
+			re.search('[A-Z]+', passwd) == None or \
+			re.search('[a-z]+', passwd) == None or \
+			re.search('[0-9]+', passwd) == None:
+
+			# Invalid password
+			return False
+
+		# Return OK
+		return True
+
+	def password_validate(self, passwd):
+		"""Password Validate
+
+		Validates the given password against the current instance
+
+		Arguments:
+			passwd (str): The password to validate
+
+		Returns:
+			bool
+		"""
+
+		# Get the password from the record
+		sPasswd = self.field_get('passwd')
+
+		# Split the password
+		sSalt = sPasswd[:20] + sPasswd[60:]
+		sHash = sPasswd[20:60]
+
+		# Return OK if the rehashed password matches
+		return sHash == sha1(sSalt.encode('utf-8') + passwd.encode('utf-8')).hexdigest()
+
+	@classmethod
+	def redis(cls, redis, lru_size=1024, lru_ttl=5):
+		"""Redis
+
+		Stores the Redis connection to be used to fetch and store Users
+
+		Arguments:
+			redis (StrictRedis): A Redis instance
+			lru_size (uint): Optional, the maximum users kept in the process
+			lru_ttl (uint): Optional, the seconds users are kept in the process
+
+		Returns:
+			None
+		"""
+		cls._redis = redis
+		cls._lru_size = lru_size
+		cls._lru_ttl = lru_ttl
+
+# Work class
+class Work(Identity, Record_MySQL.Record):
+	"""Work
+
+	Represents a single work period on a specific task
+	"""
+
+	_conf = None
+	"""Configuration"""
+
+	_redis = None
+	"""Redis instance used to keep track of open work"""
+
+	@classmethod
+	def by_user(cls, user, start, end, client=None, compact=False, custom={}):
+		"""By User
+
+		Returns all work in a timeframe that are assigned to a specific user
+
+		Arguments:
+			user (str): The ID of the user
+			start (uint): The minimum time the task can end in
+			end (uint): The maximum time the task can end in
+			client (str): Optional, single client to fetch
+			compact (bool): Optional, return only the IDs of the client,
+				project, and task, without their names
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+		dClient = Client.struct(custom)
+
+		# Init where with user and range
+		lWhere = [
+			"`w`.`user` = '%s'" % user,
+			"`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)" % (
+				start, end
+			)
+		]
+
+		# If we have a client
+		if client is not None:
+			lWhere.append("`p`.`client` %s" % cls.process_value(
+				dClient, '_id', client
+			))
+
+		# If we only want the IDs, skip the joins for the names
+		if compact:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`,\n" \
+					"	`w`.`description` as `description`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `start`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\nAND '.join(lWhere)
+			}
+
+		# Else, generate the full SQL
+		else:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`c`.`name` as `clientName`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`p`.`name` as `projectName`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`t`.`name` as `taskName`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`,\n" \
+					"	`w`.`description` as `description`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `start`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\nAND '.join(lWhere)
+			}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def config(cls):
+		"""Config
+
+		Returns the configuration data associated with the record type
+
+		Returns:
+			dict
+		"""
+
+		# If we haven loaded the config yet
+		if not cls._conf:
+			cls._conf = _config('work')
+
+		# Return the config
+		return cls._conf
+
+	@classmethod
+	def for_invoice(cls, start, end, client, custom={}):
+		"""For Invoice
+
+		Pulls out data needed to generate an invoice
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str): Optional ID or IDs of clients
+			compact (bool): Optional, return only the IDs of the client,
+				project, and task, without their names or the description of
+				the task, ordered by the IDs
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT `w`.`project`, `w`.`task`, `w`.`start`, `w`.`end`\n" \
+				"FROM `%(db)s`.`%(table)s` as `w`\n" \
+				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+				"WHERE `p`.`client` = '%(client)s'\n" \
+				"AND `w`.`end` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"client": client,
+			"start": start,
+			"end": end
+		}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def for_invoices(cls, start, end, clients, custom={}):
+		"""For Invoices
+
+		Pulls out the data needed to generate invoices for many clients with a
+		single query
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str[]): The IDs of the clients
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# If there's no clients, there's no work
+		if not clients:
+			return []
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT `p`.`client`, `w`.`project`, `w`.`task`, `w`.`start`, `w`.`end`\n" \
+				"FROM `%(db)s`.`%(table)s` as `w`\n" \
+				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+				"WHERE `p`.`client` IN ('%(clients)s')\n" \
+				"AND `w`.`end` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"clients": "','".join(clients),
+			"start": start,
+			"end": end
+		}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def _open_named(cls, work):
+		"""Open Named
+
+		Adds the names of the client, project, and task to an open work
+		record stored in the cache
+
+		Arguments:
+			work (dict): The open work
+
+		Returns:
+			dict
+		"""
+
+		# Add each name, from the cache, in case any were renamed since the
+		#	work was started
+		for k, o in [('client', Client), ('project', Project), ('task', Task)]:
+			dRecord = o.cache_get(work[k])
+			work['%sName' % k] = dRecord and dRecord['name'] or None
+
+		# Return the work
+		return work
+
+	@classmethod
+	def open(cls, user, custom={}):
+		"""Open
+
+		Returns unfinished work by user if any exists, from the cache of open
+		work, which is rebuilt from the DB if it doesn't exist
+
+		Arguments:
+			user (str): The ID of the user
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict | None
+		"""
+
+		# Fetch the user's work and the flag marking the cache as built
+		sWork, sBuilt = cls._redis.hmget(_WORK_OPEN, user, '_built')
+
+		# If the cache isn't built, build it and try again
+		if sBuilt is None:
+			cls.open_rebuild(custom)
+			sWork = cls._redis.hget(_WORK_OPEN, user)
+
+		# If there's no open work
+		if sWork is None:
+			return None
+
+		# Decode it, add the names, and return it
+		return cls._open_named(JSON.decode(sWork))
+
+	@classmethod
+	def open_clear(cls, user, _id):
+		"""Open Clear
+
+		Removes a user's open work from the cache, only if it's the given
+		work, so that ending an old record can't clear the current one
+
+		Arguments:
+			user (str): The ID of the user
+			_id (str): The ID of the work that's no longer open
+
+		Returns:
+			bool
+		"""
+		return cls._redis.eval(_WORK_OPEN_CLEAR, 1, _WORK_OPEN, user, _id) == 1
+
+	@classmethod
+	def open_all(cls, custom={}):
+		"""Open All
+
+		Returns the open work of every user from the DB, oldest first
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+		dProject = Project.struct(custom)
+
+		# Generate SQL
+		sSQL = "SELECT\n" \
+				"	`w`.`_id` as `_id`,\n" \
+				"	`p`.`client` as `client`,\n" \
+				"	`w`.`project` as `project`,\n" \
+				"	`w`.`task` as `task`,\n" \
+				"	`w`.`user` as `user`,\n" \
+				"	`w`.`start` as `start`,\n" \
+				"	`w`.`description` as `description`\n" \
+				"FROM `%(db)s`.`%(table)s` as `w`\n" \
+				"JOIN `%(db)s`.`%(project)s` as `p` ON `w`.`project` = `p`.`_id`\n" \
+				"WHERE `w`.`end` IS NULL\n" \
+				"ORDER BY `w`.`start`" % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"project": dProject['table']
+		}
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def open_rebuild(cls, custom={}):
+		"""Open Rebuild
+
+		Replaces the cache of open work with the open work in the DB. If the
+		cache is changed while the DB is being read, it's read again
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Loop until the cache is replaced without anything else changing it
+		with cls._redis.pipeline() as oPipe:
+			while True:
+				try:
+
+					# Watch for anything starting or ending work
+					oPipe.watch(_WORK_OPEN)
+
+					# Fetch the open work, the latest for each user
+					dOpen = {
+						d['user']: JSON.encode(d) for d in cls.open_all(custom)
+					}
+
+					# Replace the cache and mark it as built
+					oPipe.multi()
+					oPipe.delete(_WORK_OPEN)
+					oPipe.hset(_WORK_OPEN, mapping=dict(dOpen, _built=int(time())))
+					oPipe.execute()
+
+					# Return the count
+					return len(dOpen)
+
+				# If the cache changed, try again
+				except WatchError:
+					continue
+
+	@classmethod
+	def open_set(cls, work, client, new=False):
+		"""Open Set
+
+		Stores a user's open work in the cache
+
+		Arguments:
+			work (dict): The work record
+			client (str): The ID of the client the work's project belongs to
+			new (bool): Optional, if true, only store it if the user has no
+				other open work
+
+		Returns:
+			bool
+		"""
+
+		# Generate the value
+		sWork = JSON.encode({
+			'_id': work['_id'],
+			'client': client,
+			'project': work['project'],
+			'task': work['task'],
+			'user': work['user'],
+			'start': work['start'],
+			'description': work['description']
+		})
+
+		# If it's new, only set it if nothing else is there
+		if new:
+			return cls._redis.hsetnx(_WORK_OPEN, work['user'], sWork) == 1
+
+		# Else, overwrite whatever's there
+		cls._redis.hset(_WORK_OPEN, work['user'], sWork)
+		return True
+
+	@classmethod
+	def _range_sql(cls, start, end, clients, custom, limit=None, cursor=None, count=False, compact=False):
+		"""Range SQL
+
+		Generates the SQL used to fetch all work in a timeframe, shared by
+		range and range_iter
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str): Optional ID or IDs of clients
+			custom (dict): Custom Host and DB info
+			limit (uint): Optional, the maximum number of records
+			cursor (str): Optional, start after the record at this cursor
+			count (bool): Optional, select the total instead of the records
+			compact (bool): Optional, select only the IDs of the client,
+				project, task, and user, without their names
+
+		Raises:
+			ValueError
+
+		Returns:
+			tuple
+		"""
+
+		# Init the where
+		lWhere = ['`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
+			start, end
+		)]
+
+		# If we have clients
+		if clients:
+			lWhere.append('`p`.`client` %s' % (isinstance(clients, list) and \
+							("IN ('%s')" % "','".join(clients)) or \
+							("= '%s'" % clients))
+			)
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# If we only want the count
+		if count:
+			return dStruct['host'], \
+				"SELECT COUNT(*)\n" \
+				"FROM `%(db)s`.`%(table)s` as `w`\n" \
+				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+				"WHERE %(where)s" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"where": '\nAND '.join(lWhere)
+				}
+
+		# If we have a cursor, start after it
+		if cursor:
+			lWhere.append(_keyset('`w`.`end`', cursor, False))
+
+		# If we only want the IDs, skip the joins for the names
+		if compact:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`w`.`user` as `user`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`,\n" \
+					"	`w`.`description` as `description`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `w`.`end`, `w`.`_id`%(limit)s"
+
+		# Else, generate the full SQL
+		else:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`c`.`name` as `clientName`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`p`.`name` as `projectName`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`t`.`name` as `taskName`,\n" \
+					"	`w`.`user` as `user`,\n" \
+					"	`u`.`name` as `userName`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`,\n" \
+					"	`w`.`description` as `description`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
+					"JOIN `%(db)s`.`user` as `u` ON `w`.`user` = `u`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `w`.`end`, `w`.`_id`%(limit)s"
+
+		# Fill in the names and conditions
+		sSQL = sSQL % {
+			"db": dStruct['db'],
+			"table": dStruct['table'],
+			"where": '\nAND '.join(lWhere),
+			"limit": limit and ('\nLIMIT %d' % int(limit)) or ''
+		}
+
+		# Return the host and the SQL
+		return dStruct['host'], sSQL
+
+	@classmethod
+	def range(cls, start, end, clients=None, limit=None, cursor=None, count=False, compact=False, custom={}):
+		"""Range
+
+		Returns all work in a timeframe that are, optionally, associated with
+		specific clients, ordered by when the work ended, the order of the
+		end_id index, so that any page of it is read straight from the index
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str): Optional ID or IDs of clients
+			limit (uint): Optional, the maximum number of records to return
+			cursor (str): Optional, return the records after this cursor
+			count (bool): Optional, return the total instead of the records
+			compact (bool): Optional, return only the IDs of the client,
+				project, task, and user, without their names
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Raises:
+			ValueError
+
+		Returns:
+			list|uint
+		"""
+
+		# Generate the SQL
+		sHost, sSQL = cls._range_sql(
+			start, end, clients, custom, limit, cursor, count, compact
+		)
+
+		# Execute and return the select
+		return Record_MySQL.Commands.select(
+			sHost,
+			sSQL,
+			count and Record_MySQL.ESelect.CELL or Record_MySQL.ESelect.ALL
+		)
+
+	@classmethod
+	def range_iter(cls, start, end, clients=None, custom={}):
+		"""Range Iter
+
+		Same as range, but returns a generator that yields the records one at
+		a time as they are read from the server instead of storing the entire
+		result set in memory first. Uses its own connection, from stream, so
+		that the shared one is free for any other queries while the records
+		are being consumed. The select is run before returning, so any error
+		is raised here, and not once the records are being sent
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str): Optional ID or IDs of clients
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			generator
+		"""
+
+		# Generate the SQL
+		sHost, sSQL = cls._range_sql(start, end, clients, custom)
+
+		# Run the select and return the generator of the records
+		return stream(sHost, sSQL)
+
+	@classmethod
+	def range_grouped(cls, start, end, clients, aggregate=True, compact=False, custom={}):
+		"""Range Grouped
+
+		Returns all work in a timeframe that are associated with specific
+		clients and grouped by unique task
+
+		When aggregate is set the grouping and the sum of the elapsed time are
+		done by the DB and only one row per task is returned from it, in which
+		case `_id`, `user` and `start` are the lowest values of the task, and
+		`end` the highest
+
+		Arguments:
+			start (uint): The minimum time the work can end in
+			end (uint): The maximum time the work can end in
+			clients (str): ID or IDs of clients
+			aggregate (bool): Optional, set to False to group the raw records
+				in Python instead of the DB
+			compact (bool): Optional, return only the IDs of the client,
+				project, task, and user, without their names or the
+				description of the task, ordered by the IDs
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			list
+		"""
+
+		# Init the where
+		lWhere = ['`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
+			start, end
+		)]
+
+		# If we have clients
+		if clients:
+			lWhere.append('`p`.`client` %s' % (isinstance(clients, list) and \
+							("IN ('%s')" % "','".join(clients)) or \
+							("= '%s'" % clients))
+			)
+
+		# Fetch the record structure
+		dStruct = cls.struct(custom)
+
+		# If we want the DB to do the grouping and only the IDs, skip the
+		#	joins for the names
+		if aggregate and compact:
+
+			# Generate SQL
+			sSQL = "SELECT\n" \
+					"	MIN(`w`.`_id`) as `_id`,\n" \
+					"	MIN(`p`.`client`) as `client`,\n" \
+					"	MIN(`w`.`project`) as `project`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	MIN(`w`.`user`) as `user`,\n" \
+					"	MIN(`w`.`start`) as `start`,\n" \
+					"	MAX(`w`.`end`) as `end`,\n" \
+					"	CAST(SUM(TIMESTAMPDIFF(SECOND, `w`.`start`, `w`.`end`)) AS UNSIGNED) as `elapsed`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"GROUP BY `w`.`task`\n" \
+					"ORDER BY `client`, `project`, `task`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\nAND '.join(lWhere)
+			}
+
+			# Execute and return the select
+			return Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			)
+
+		# If we want the DB to do the grouping
+		if aggregate:
+
+			# Generate SQL
+			sSQL = "SELECT\n" \
+					"	`g`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`c`.`name` as `clientName`,\n" \
+					"	`g`.`project` as `project`,\n" \
+					"	`p`.`name` as `projectName`,\n" \
+					"	`g`.`task` as `task`,\n" \
+					"	`t`.`name` as `taskName`,\n" \
+					"	`g`.`user` as `user`,\n" \
+					"	`u`.`name` as `userName`,\n" \
+					"	`g`.`start` as `start`,\n" \
+					"	`g`.`end` as `end`,\n" \
+					"	`t`.`description` as `description`,\n" \
+					"	`g`.`elapsed` as `elapsed`\n" \
+					"FROM (\n" \
+					"	SELECT\n" \
+					"		`w`.`task` as `task`,\n" \
+					"		MIN(`w`.`_id`) as `_id`,\n" \
+					"		MIN(`w`.`project`) as `project`,\n" \
+					"		MIN(`w`.`user`) as `user`,\n" \
+					"		MIN(`w`.`start`) as `start`,\n" \
+					"		MAX(`w`.`end`) as `end`,\n" \
+					"		CAST(SUM(TIMESTAMPDIFF(SECOND, `w`.`start`, `w`.`end`)) AS UNSIGNED) as `elapsed`\n" \
+					"	FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"	JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"	WHERE %(where)s\n" \
+					"	GROUP BY `w`.`task`\n" \
+					") as `g`\n" \
+					"JOIN `%(db)s`.`task` as `t` ON `g`.`task` = `t`.`_id`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `g`.`project` = `p`.`_id`\n" \
+					"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
+					"JOIN `%(db)s`.`user` as `u` ON `g`.`user` = `u`.`_id`\n" \
+					"ORDER BY `clientName`, `projectName`, `taskName`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\n	AND '.join(lWhere)
+			}
+
+			# Execute and return the select
+			return Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			)
+
+		# If we only want the IDs, skip the joins for the names
+		if compact:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`w`.`user` as `user`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `client`, `project`, `task`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\nAND '.join(lWhere)
+			}
+
+		# Else, generate the full SQL
+		else:
+			sSQL = "SELECT\n" \
+					"	`w`.`_id` as `_id`,\n" \
+					"	`p`.`client` as `client`,\n" \
+					"	`c`.`name` as `clientName`,\n" \
+					"	`w`.`project` as `project`,\n" \
+					"	`p`.`name` as `projectName`,\n" \
+					"	`w`.`task` as `task`,\n" \
+					"	`t`.`name` as `taskName`,\n" \
+					"	`w`.`user` as `user`,\n" \
+					"	`u`.`name` as `userName`,\n" \
+					"	`w`.`start` as `start`,\n" \
+					"	`w`.`end` as `end`,\n" \
+					"	`t`.`description` as `description`\n" \
+					"FROM `%(db)s`.`%(table)s` as `w`\n" \
+					"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
+					"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+					"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
+					"JOIN `%(db)s`.`user` as `u` ON `w`.`user` = `u`.`_id`\n" \
+					"WHERE %(where)s\n" \
+					"ORDER BY `clientName`, `projectName`, `taskName`" % {
+				"db": dStruct['db'],
+				"table": dStruct['table'],
+				"where": '\nAND'.join(lWhere)
+			}
+
+		# Execute and store the select
+		lRecords = Record_MySQL.Commands.select(
+			dStruct['host'],
+			sSQL,
+			Record_MySQL.ESelect.ALL
+		)
 
-		Returns:
-			bool
-		"""
+		# Calculate the total elapsed per unique task
+		dTasks = {}
+		for d in lRecords:
 
-		# Get the password from the record
-		sPasswd = self.field_get('passwd')
+			# Get the total seconds
+			iElapsed = d['end'] - d['start']
 
-		# Split the password
-		sSalt = sPasswd[:20] + sPasswd[60:]
-		sHash = sPasswd[20:60]
+			# Add it to the existing, or init the task
+			try:
+				dTasks[d['task']]['elapsed'] += iElapsed
+			except KeyError:
+				dTasks[d['task']] = d
+				dTasks[d['task']]['elapsed'] = iElapsed
 
-		# Return OK if the rehashed password matches
-		return sHash == sha1(sSalt.encode('utf-8') + passwd.encode('utf-8')).hexdigest()
+		# Return the unique tasks with the total elapsed time
+		return list(dTasks.values())
 
 	@classmethod
 	def redis(cls, redis):
 		"""Redis
 
-		Stores the Redis connection to be used to fetch and store Users
+		Stores the Redis connection used to keep track of open work
 
 		Arguments:
 			redis (StrictRedis): A Redis instance
@@ -854,82 +3115,102 @@ class User(Record_MySQL.Record):
 		"""
 		cls._redis = redis
 
-# Work class
-class Work(Record_MySQL.Record):
-	"""Work
+	@classmethod
+	def working(cls, custom={}):
+		"""Working
 
-	Represents a single work period on a specific task
+		Returns the open work of every user currently working, from the cache
+		of open work, oldest first
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			dict[]
+		"""
+
+		# Fetch all the open work, building the cache if it isn't
+		dOpen = cls._redis.hgetall(_WORK_OPEN)
+		if b'_built' not in dOpen:
+			cls.open_rebuild(custom)
+			dOpen = cls._redis.hgetall(_WORK_OPEN)
+
+		# Decode each one and add the names, including the user's
+		lRet = []
+		for sUser, sWork in dOpen.items():
+			if sUser == b'_built':
+				continue
+			dWork = cls._open_named(JSON.decode(sWork))
+			dUser = User.cache_get(dWork['user'])
+			dWork['userName'] = dUser and dUser['name'] or None
+			dWork['elapsed'] = int(time()) - dWork['start']
+			lRet.append(dWork)
+
+		# Return the work, oldest first
+		return sorted(lRet, key=lambda d: d['start'])
+
+# Work Daily class
+class WorkDaily(Record_MySQL.Record):
+	"""Work Daily
+
+	Represents the total seconds and number of work records that ended on a
+	specific day for a unique user, client, project, and task
 	"""
 
 	_conf = None
 	"""Configuration"""
 
 	@classmethod
-	def by_user(cls, user, start, end, client=None, custom={}):
-		"""By User
+	def add(cls, work, custom={}):
+		"""Add
 
-		Returns all work in a timeframe that are assigned to a specific user
+		Adds the seconds of a work record to the day it ended on. The values
+		are taken from the work table so this must be called after the record
+		has been saved
 
 		Arguments:
-			user (str): The ID of the user
-			start (uint): The minimum time the task can end in
-			end (uint): The maximum time the task can end in
-			client (str): Optional, single client to fetch
+			work (str): The ID of the work record
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			uint
 		"""
 
-		# Fetch the record structure
+		# Fetch the record structures
 		dStruct = cls.struct(custom)
-		dClient = Client.struct(custom)
-
-		# Init where with user and range
-		lWhere = [
-			"`w`.`user` = '%s'" % user,
-			"`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)" % (
-				start, end
-			)
-		]
-
-		# If we have a client
-		if client is not None:
-			lWhere.append("`p`.`client` %s" % cls.process_value(
-				dClient, '_id', client
-			))
+		dWork = Work.struct(custom)
 
 		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`w`.`_id` as `_id`,\n" \
-				"	`p`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`w`.`project` as `project`,\n" \
-				"	`p`.`name` as `projectName`,\n" \
-				"	`w`.`task` as `task`,\n" \
-				"	`t`.`name` as `taskName`,\n" \
-				"	`w`.`start` as `start`,\n" \
-				"	`w`.`end` as `end`,\n" \
-				"	`w`.`description` as `description`\n" \
-				"FROM `%(db)s`.`%(table)s` as `w`\n" \
-				"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
+		sSQL = "INSERT INTO `%(db)s`.`%(table)s` (\n" \
+				"	`day`, `user`, `client`, `project`, `task`, `seconds`, `count`\n" \
+				")\n" \
+				"SELECT\n" \
+				"	DATE(`w`.`end`),\n" \
+				"	`w`.`user`,\n" \
+				"	`p`.`client`,\n" \
+				"	`w`.`project`,\n" \
+				"	`w`.`task`,\n" \
+				"	TIMESTAMPDIFF(SECOND, `w`.`start`, `w`.`end`),\n" \
+				"	1\n" \
+				"FROM `%(db)s`.`%(work)s` as `w`\n" \
 				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
-				"WHERE %(where)s\n" \
-				"ORDER BY `start`" % {
+				"WHERE `w`.`_id` = '%(_id)s'\n" \
+				"AND `w`.`end` IS NOT NULL\n" \
+				"ON DUPLICATE KEY UPDATE\n" \
+				"	`seconds` = `seconds` + VALUES(`seconds`),\n" \
+				"	`count` = `count` + VALUES(`count`)" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"where": '\nAND '.join(lWhere)
+			"work": dWork['table'],
+			"_id": work
 		}
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
-			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
-		)
+		# Execute and return the result
+		return Record_MySQL.Commands.execute(dStruct['host'], sSQL)
 
 	@classmethod
 	def config(cls):
@@ -941,71 +3222,120 @@ class Work(Record_MySQL.Record):
 			dict
 		"""
 
-		# If we haven loaded the config yet
+		# If we haven't loaded the config yet
 		if not cls._conf:
-			cls._conf = Record_MySQL.Record.generate_config(
-				Tree.fromFile('definitions/work.json'),
-				override={'db': Conf.get(('mysql', 'db'), 'tims-oc')}
-			)
+			cls._conf = _config('work_daily')
 
 		# Return the config
 		return cls._conf
 
 	@classmethod
-	def for_invoice(cls, start, end, client, custom={}):
-		"""For Invoice
+	def elapsed(cls, user, start, end, custom={}):
+		"""Elapsed
 
-		Pulls out data needed to generate an invoice
+		Returns the total seconds of work done by a user in a timeframe, using
+		the totals for each full day in the timeframe and the raw work records
+		for the partial days at either end of it
 
 		Arguments:
+			user (str): The ID of the user
 			start (uint): The minimum time the work can end in
 			end (uint): The maximum time the work can end in
-			clients (str): Optional ID or IDs of clients
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			int
 		"""
 
+		# Get the full days in the timeframe
+		dDays = cls.full_days(start, end, custom)
+
+		# If there aren't any, use the raw records for the entire timeframe
+		if not dDays:
+			return sum([
+				d['end'] - d['start'] \
+				for d in Work.by_user(user, start, end, None, custom=custom)
+			])
+
 		# Fetch the record structure
 		dStruct = cls.struct(custom)
 
 		# Generate SQL
-		sSQL = "SELECT `w`.`project`, `w`.`task`, `w`.`start`, `w`.`end`\n" \
-				"FROM `%(db)s`.`%(table)s` as `w`\n" \
-				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
-				"WHERE `p`.`client` = '%(client)s'\n" \
-				"AND `w`.`end` BETWEEN FROM_UNIXTIME(%(start)d) AND FROM_UNIXTIME(%(end)d)" % {
+		sSQL = "SELECT CAST(IFNULL(SUM(`seconds`), 0) AS SIGNED)\n" \
+				"FROM `%(db)s`.`%(table)s`\n" \
+				"WHERE `user` = '%(user)s'\n" \
+				"AND `day` BETWEEN '%(first)s' AND '%(last)s'" % {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"client": client,
-			"start": start,
-			"end": end
+			"user": user,
+			"first": dDays['first'],
+			"last": dDays['last']
 		}
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
+		# Fetch the total of the full days
+		iElapsed = Record_MySQL.Commands.select(
 			dStruct['host'],
 			sSQL,
-			Record_MySQL.ESelect.ALL
+			Record_MySQL.ESelect.CELL
 		)
 
+		# Add the partial days
+		for iStart, iEnd in cls.edges(start, end, dDays):
+			for d in Work.by_user(user, iStart, iEnd, None, custom=custom):
+				iElapsed += d['end'] - d['start']
+
+		# Return the total
+		return iElapsed
+
+	@staticmethod
+	def edges(start, end, days):
+		"""Edges
+
+		Returns the timeframes, if any, before and after the full days
+
+		Arguments:
+			start (uint): The start of the entire timeframe
+			end (uint): The end of the entire timeframe
+			days (dict): The full days returned by full_days
+
+		Returns:
+			list
+		"""
+
+		# Init the list
+		lRet = []
+
+		# If there's time before the first day
+		if start < days['first_ts']:
+			lRet.append([start, days['first_ts'] - 1])
+
+		# If there's time after the last day
+		if end >= days['last_ts']:
+			lRet.append([days['last_ts'], end])
+
+		# Return the timeframes
+		return lRet
+
 	@classmethod
-	def open(cls, user, custom={}):
-		"""Open
+	def full_days(cls, start, end, custom={}):
+		"""Full Days
 
-		Returns unfinished work by user if any exists
+		Returns the first and last days entirely contained in the timeframe,
+		as well as the timestamps at the start of the first day and the end of
+		the last day. The days are calculated by the DB so that they match the
+		days the totals are stored under
 
 		Arguments:
-			user (str): The ID of the user
+			start (uint): The start of the timeframe
+			end (uint): The end of the timeframe, inclusive
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			dict | None
+			dict|None
 		"""
 
 		# Fetch the record structure
@@ -1013,39 +3343,48 @@ class Work(Record_MySQL.Record):
 
 		# Generate SQL
 		sSQL = "SELECT\n" \
-				"	`w`.`_id`,\n" \
-				"	`p`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`w`.`project` as `project`,\n" \
-				"	`p`.`name` as `projectName`,\n" \
-				"	`w`.`task` as `task`,\n" \
-				"	`t`.`name` as `taskName`,\n" \
-				"	`w`.`start` as `start`,\n" \
-				"	`w`.`description` as `description`\n" \
-				"FROM `%(db)s`.`%(table)s` as `w`\n" \
-				"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
-				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
-				"WHERE `w`.`user` = '%(user)s'\n" \
-				"AND `w`.`end` IS NULL" % {
-			"db": dStruct['db'],
-			"table": dStruct['table'],
-			"user": user
+				"	`first`,\n" \
+				"	`last`,\n" \
+				"	UNIX_TIMESTAMP(`first`) as `first_ts`,\n" \
+				"	UNIX_TIMESTAMP(`last` + INTERVAL 1 DAY) as `last_ts`\n" \
+				"FROM (\n" \
+				"	SELECT\n" \
+				"		IF(TIME(FROM_UNIXTIME(%(start)d)) = '00:00:00',\n" \
+				"			DATE(FROM_UNIXTIME(%(start)d)),\n" \
+				"			DATE(FROM_UNIXTIME(%(start)d)) + INTERVAL 1 DAY\n" \
+				"		) as `first`,\n" \
+				"		IF(TIME(FROM_UNIXTIME(%(end)d)) = '23:59:59',\n" \
+				"			DATE(FROM_UNIXTIME(%(end)d)),\n" \
+				"			DATE(FROM_UNIXTIME(%(end)d)) - INTERVAL 1 DAY\n" \
+				"		) as `last`\n" \
+				") as `d`" % {
+			"start": start,
+			"end": end
 		}
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
+		# Fetch the days
+		dDays = Record_MySQL.Commands.select(
 			dStruct['host'],
 			sSQL,
 			Record_MySQL.ESelect.ROW
 		)
 
+		# If the last day is before the first, there are no full days
+		if dDays['last'] < dDays['first']:
+			return None
+
+		# Return the days
+		return dDays
+
 	@classmethod
-	def range(cls, start, end, clients=None, custom={}):
-		"""Range
+	def range_grouped(cls, start, end, clients, compact=False, custom={}):
+		"""Range Grouped
 
-		Returns all work in a timeframe that are, optionally, associated with
-		specific clients
+		Returns the total seconds of work, grouped by unique task, that ended
+		in a timeframe, optionally for specific clients. Uses the totals for
+		each full day in the timeframe and the raw work records for the partial
+		days at either end of it. Each record uses the ID of the task as its
+		`_id`
 
 		Arguments:
 			start (uint): The minimum time the work can end in
@@ -1059,134 +3398,277 @@ class Work(Record_MySQL.Record):
 			list
 		"""
 
-		# Init the where
-		lWhere = ['`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
-			start, end
-		)]
+		# Get the full days in the timeframe
+		dDays = cls.full_days(start, end, custom)
 
-		# If we have clients
-		if clients:
-			lWhere.append('`p`.`client` %s' % (isinstance(clients, list) and \
-							("IN ('%s')" % "','".join(clients)) or \
-							("= '%s'" % clients))
-			)
+		# Init the tasks
+		dTasks = {}
 
-		# Fetch the record structure
+		# If there are full days
+		if dDays:
+
+			# Init the where
+			lWhere = ["`d`.`day` BETWEEN '%s' AND '%s'" % (
+				dDays['first'], dDays['last']
+			)]
+
+			# If we have clients
+			if clients:
+				lWhere.append('`d`.`client` %s' % (isinstance(clients, list) and \
+								("IN ('%s')" % "','".join(clients)) or \
+								("= '%s'" % clients))
+				)
+
+			# Fetch the record structure
+			dStruct = cls.struct(custom)
+
+			# If we only want the IDs, skip the joins for the names
+			if compact:
+				sSQL = "SELECT\n" \
+						"	`d`.`task` as `_id`,\n" \
+						"	MIN(`d`.`client`) as `client`,\n" \
+						"	MIN(`d`.`project`) as `project`,\n" \
+						"	`d`.`task` as `task`,\n" \
+						"	CAST(SUM(`d`.`seconds`) AS SIGNED) as `elapsed`\n" \
+						"FROM `%(db)s`.`%(table)s` as `d`\n" \
+						"WHERE %(where)s\n" \
+						"GROUP BY `d`.`task`" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"where": '\nAND '.join(lWhere)
+				}
+
+			# Else, generate the full SQL
+			else:
+				sSQL = "SELECT\n" \
+						"	`g`.`task` as `_id`,\n" \
+						"	`p`.`client` as `client`,\n" \
+						"	`c`.`name` as `clientName`,\n" \
+						"	`g`.`project` as `project`,\n" \
+						"	`p`.`name` as `projectName`,\n" \
+						"	`g`.`task` as `task`,\n" \
+						"	`t`.`name` as `taskName`,\n" \
+						"	`t`.`description` as `description`,\n" \
+						"	`g`.`elapsed` as `elapsed`\n" \
+						"FROM (\n" \
+						"	SELECT\n" \
+						"		`d`.`task` as `task`,\n" \
+						"		MIN(`d`.`project`) as `project`,\n" \
+						"		CAST(SUM(`d`.`seconds`) AS SIGNED) as `elapsed`\n" \
+						"	FROM `%(db)s`.`%(table)s` as `d`\n" \
+						"	WHERE %(where)s\n" \
+						"	GROUP BY `d`.`task`\n" \
+						") as `g`\n" \
+						"JOIN `%(db)s`.`task` as `t` ON `g`.`task` = `t`.`_id`\n" \
+						"JOIN `%(db)s`.`project` as `p` ON `g`.`project` = `p`.`_id`\n" \
+						"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`" % {
+					"db": dStruct['db'],
+					"table": dStruct['table'],
+					"where": '\n	AND '.join(lWhere)
+				}
+
+			# Fetch the totals of the full days
+			for d in Record_MySQL.Commands.select(
+				dStruct['host'],
+				sSQL,
+				Record_MySQL.ESelect.ALL
+			):
+				dTasks[d['task']] = d
+
+			# Get the partial days
+			lEdges = cls.edges(start, end, dDays)
+
+		# Else, the entire timeframe is partial
+		else:
+			lEdges = [[start, end]]
+
+		# Go through each partial timeframe
+		for iStart, iEnd in lEdges:
+
+			# Go through each task worked on in the timeframe
+			for d in Work.range_grouped(
+				iStart, iEnd, clients, True, compact, custom
+			):
+
+				# Add it to the existing, or init the task
+				try:
+					dTasks[d['task']]['elapsed'] += d['elapsed']
+				except KeyError:
+					dTasks[d['task']] = {
+						'_id': d['task'],
+						'client': d['client'],
+						'project': d['project'],
+						'task': d['task'],
+						'elapsed': d['elapsed']
+					}
+
+					# If we want the names, add them
+					if not compact:
+						dTasks[d['task']].update({
+							'clientName': d['clientName'],
+							'projectName': d['projectName'],
+							'taskName': d['taskName'],
+							'description': d['description']
+						})
+
+		# Return the unique tasks in order
+		return sorted(dTasks.values(), key=lambda d: compact and \
+			(d['client'], d['project'], d['task']) or \
+			(d['clientName'], d['projectName'], d['taskName'])
+		)
+
+	@classmethod
+	def rebuild(cls, custom={}):
+		"""Rebuild
+
+		Generates all the daily totals from scratch in a new table and then
+		swaps it with the existing one, including any archived work
+
+		Arguments:
+			custom (dict): Custom Host and DB info
+				'host' the name of the host to get/set data on
+				'append' optional postfix for dynamic DBs
+
+		Returns:
+			uint
+		"""
+
+		# Fetch the record structures
 		dStruct = cls.struct(custom)
+		dWork = Work.struct(custom)
 
-		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`w`.`_id` as `_id`,\n" \
-				"	`p`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`w`.`project` as `project`,\n" \
-				"	`p`.`name` as `projectName`,\n" \
-				"	`w`.`task` as `task`,\n" \
-				"	`t`.`name` as `taskName`,\n" \
-				"	`w`.`user` as `user`,\n" \
-				"	`u`.`name` as `userName`,\n" \
-				"	`w`.`start` as `start`,\n" \
-				"	`w`.`end` as `end`,\n" \
-				"	`w`.`description` as `description`\n" \
-				"FROM `%(db)s`.`%(table)s` as `w`\n" \
-				"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
-				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
-				"JOIN `%(db)s`.`user` as `u` ON `w`.`user` = `u`.`_id`\n" \
-				"WHERE %(where)s\n" \
-				"ORDER BY `start`" % {
+		# The names used in every statement
+		dNames = {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"where": '\nAND'.join(lWhere)
+			"work": dWork['table']
 		}
 
-		# Execute and return the select
-		return Record_MySQL.Commands.select(
+		# If old work has been moved to the archive, include it, skipping
+		#	anything that's also still in the work table so it's not counted
+		#	twice
+		if Record_MySQL.Commands.select(
 			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
+			"SELECT COUNT(*)\n" \
+			"FROM `information_schema`.`TABLES`\n" \
+			"WHERE `TABLE_SCHEMA` = '%(db)s'\n" \
+			"AND `TABLE_NAME` = '%(work)s_archive'" % dNames,
+			Record_MySQL.ESelect.CELL
+		):
+			dNames['source'] = "(\n" \
+				"	SELECT `project`, `task`, `user`, `start`, `end`\n" \
+				"	FROM `%(db)s`.`%(work)s`\n" \
+				"	UNION ALL\n" \
+				"	SELECT `a`.`project`, `a`.`task`, `a`.`user`, `a`.`start`, `a`.`end`\n" \
+				"	FROM `%(db)s`.`%(work)s_archive` as `a`\n" \
+				"	WHERE NOT EXISTS (\n" \
+				"		SELECT 1 FROM `%(db)s`.`%(work)s` as `aw`\n" \
+				"		WHERE `aw`.`_id` = `a`.`_id`\n" \
+				"	)\n" \
+				")" % dNames
+		else:
+			dNames['source'] = "`%(db)s`.`%(work)s`" % dNames
+
+		# Create an empty copy of the table
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"DROP TABLE IF EXISTS `%(db)s`.`%(table)s_rebuild`" % dNames
+		)
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"CREATE TABLE `%(db)s`.`%(table)s_rebuild` " \
+			"LIKE `%(db)s`.`%(table)s`" % dNames
+		)
+
+		# Fill it with the totals of all the ended work
+		iCount = Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"INSERT INTO `%(db)s`.`%(table)s_rebuild` (\n" \
+			"	`day`, `user`, `client`, `project`, `task`, `seconds`, `count`\n" \
+			")\n" \
+			"SELECT\n" \
+			"	DATE(`w`.`end`),\n" \
+			"	`w`.`user`,\n" \
+			"	`p`.`client`,\n" \
+			"	`w`.`project`,\n" \
+			"	`w`.`task`,\n" \
+			"	SUM(TIMESTAMPDIFF(SECOND, `w`.`start`, `w`.`end`)),\n" \
+			"	COUNT(*)\n" \
+			"FROM %(source)s as `w`\n" \
+			"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
+			"WHERE `w`.`end` IS NOT NULL\n" \
+			"GROUP BY 1, 2, 3, 4, 5" % dNames
+		)
+
+		# Swap the tables and drop the old one
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"RENAME TABLE `%(db)s`.`%(table)s` TO `%(db)s`.`%(table)s_old`, " \
+			"`%(db)s`.`%(table)s_rebuild` TO `%(db)s`.`%(table)s`" % dNames
+		)
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"DROP TABLE `%(db)s`.`%(table)s_old`" % dNames
 		)
 
+		# Return the number of totals created
+		return iCount
+
 	@classmethod
-	def range_grouped(cls, start, end, clients, custom={}):
-		"""Range Grouped
+	def subtract(cls, work, custom={}):
+		"""Subtract
 
-		Returns all work in a timeframe that are associated with specific
-		clients and grouped by unique task
+		Removes the seconds of a work record from the day it ended on. The
+		values are taken from the work table so this must be called before the
+		record is changed or deleted
 
 		Arguments:
-			start (uint): The minimum time the work can end in
-			end (uint): The maximum time the work can end in
-			clients (str): ID or IDs of clients
+			work (str): The ID of the work record
 			custom (dict): Custom Host and DB info
 				'host' the name of the host to get/set data on
 				'append' optional postfix for dynamic DBs
 
 		Returns:
-			list
+			uint
 		"""
 
-		# Init the where
-		lWhere = ['`w`.`end` BETWEEN FROM_UNIXTIME(%d) AND FROM_UNIXTIME(%d)' % (
-			start, end
-		)]
-
-		# If we have clients
-		if clients:
-			lWhere.append('`p`.`client` %s' % (isinstance(clients, list) and \
-							("IN ('%s')" % "','".join(clients)) or \
-							("= '%s'" % clients))
-			)
-
-		# Fetch the record structure
+		# Fetch the record structures
 		dStruct = cls.struct(custom)
+		dWork = Work.struct(custom)
 
-		# Generate SQL
-		sSQL = "SELECT\n" \
-				"	`w`.`_id` as `_id`,\n" \
-				"	`p`.`client` as `client`,\n" \
-				"	`c`.`name` as `clientName`,\n" \
-				"	`w`.`project` as `project`,\n" \
-				"	`p`.`name` as `projectName`,\n" \
-				"	`w`.`task` as `task`,\n" \
-				"	`t`.`name` as `taskName`,\n" \
-				"	`w`.`user` as `user`,\n" \
-				"	`u`.`name` as `userName`,\n" \
-				"	`w`.`start` as `start`,\n" \
-				"	`w`.`end` as `end`,\n" \
-				"	`t`.`description` as `description`\n" \
-				"FROM `%(db)s`.`%(table)s` as `w`\n" \
-				"JOIN `%(db)s`.`task` as `t` ON `w`.`task` = `t`.`_id`\n" \
-				"JOIN `%(db)s`.`project` as `p` ON `w`.`project` = `p`.`_id`\n" \
-				"JOIN `%(db)s`.`client` as `c` ON `p`.`client` = `c`.`_id`\n" \
-				"JOIN `%(db)s`.`user` as `u` ON `w`.`user` = `u`.`_id`\n" \
-				"WHERE %(where)s\n" \
-				"ORDER BY `clientName`, `projectName`, `taskName`" % {
+		# The tables and where shared by the update and delete
+		dNames = {
 			"db": dStruct['db'],
 			"table": dStruct['table'],
-			"where": '\nAND'.join(lWhere)
+			"work": dWork['table'],
+			"_id": work
 		}
-
-		# Execute and store the select
-		lRecords = Record_MySQL.Commands.select(
+		sTables = "`%(db)s`.`%(table)s` as `d`\n" \
+				"JOIN `%(db)s`.`%(work)s` as `w` ON\n" \
+				"	`d`.`day` = DATE(`w`.`end`) AND\n" \
+				"	`d`.`user` = `w`.`user` AND\n" \
+				"	`d`.`project` = `w`.`project` AND\n" \
+				"	`d`.`task` = `w`.`task`\n" \
+				"JOIN `%(db)s`.`project` as `p` ON\n" \
+				"	`w`.`project` = `p`.`_id` AND\n" \
+				"	`d`.`client` = `p`.`client`" % dNames
+		sWhere = "WHERE `w`.`_id` = '%(_id)s'\n" \
+				"AND `w`.`end` IS NOT NULL" % dNames
+
+		# Subtract the seconds and count
+		iCount = Record_MySQL.Commands.execute(
 			dStruct['host'],
-			sSQL,
-			Record_MySQL.ESelect.ALL
+			"UPDATE %s\n" \
+			"SET `d`.`seconds` = `d`.`seconds` - TIMESTAMPDIFF(SECOND, `w`.`start`, `w`.`end`),\n" \
+			"	`d`.`count` = `d`.`count` - 1\n" \
+			"%s" % (sTables, sWhere)
 		)
 
-		# Calculate the total elapsed per unique task
-		dTasks = {}
-		for d in lRecords:
-
-			# Get the total seconds
-			iElapsed = d['end'] - d['start']
-
-			# Add it to the existing, or init the task
-			try:
-				dTasks[d['task']]['elapsed'] += iElapsed
-			except KeyError:
-				dTasks[d['task']] = d
-				dTasks[d['task']]['elapsed'] = iElapsed
+		# Delete the day if there's no longer any work in it
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"DELETE `d`\nFROM %s\n%s\nAND `d`.`count` = 0" % (sTables, sWhere)
+		)
 
-		# Return the unique tasks with the total elapsed time
-		return list(dTasks.values())
\ No newline at end of file
+		# Return the number of days changed
+		return iCount
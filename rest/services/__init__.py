@@ -15,4 +15,7 @@ class errors:
 	INVALID_CREDENTIALS = 2100
 
 	PASSWORD_STRENGTH = 2102
-	TASK_ALREADY_STARTED = 2103
\ No newline at end of file
+	TASK_ALREADY_STARTED = 2103
+	INVOICE_PDF_PENDING = 2104
+	INVOICE_PDF_FAILED = 2105
+	WORK_ALREADY_ENDED = 2106
\ No newline at end of file
@@ -13,31 +13,59 @@ __created__		= "2021-04-06"
 
 # Python imports
 from base64 import b64decode, b64encode
-from decimal import Decimal, ROUND_UP
+import csv
+from functools import partial
+from io import StringIO
 from pprint import pprint
 from time import time
+import uuid
 
 # Pip imports
 import arrow
 import body
 from redis import StrictRedis
-from RestOC import Conf, DateTimeHelper, DictHelper, EMail, Services, Session, \
-					StrHelper, Templates
+from RestOC import Conf, DateTimeHelper, DictHelper, EMail, JSON, Services, \
+					Session, StrHelper, Templates
 from RestOC.Record_MySQL import DuplicateException
 
 # Record imports
-from records import Access, Client, Company, Invoice, InvoiceAdditional, \
-					InvoiceItem, Key, Payment, Project, Task, User, Work
+from records import Access, Cache, Client, ClientBalance, Company, \
+					Invoice, InvoiceAdditional, InvoiceItem, Key, Payment, Project, \
+					Task, User, Work, WorkDaily, cursor_decode, cursor_encode, \
+					transaction
 
 # Shared imports
-from shared import Rights
+from shared import Billing, Jobs, MySQLPool, Parallel, PDF, QueryLog, \
+					Replica, ResultCache, Rights, Versions
 from shared.SSS import SSSBucket, SSSException
 
 # Service imports
 from . import errors
 
 # Defines
+_COMPACT_ENTITIES = {
+	'client': Client,
+	'project': Project,
+	'task': Task,
+	'user': User
+}
+_INVOICE_BATCH_QUEUE = 'invoice_batch'
+_INVOICE_PDF_QUEUE = 'invoice_pdf'
 _INVOICE_S3_KEY = '%(client)s/%(invoice)s.pdf'
+_PAGE_MAXIMUM = 1000
+_TABLES_WRITTEN = {
+	'account/setup': ['user'],
+	'account/verify': ['user'],
+	'client': ['client'],
+	'project': ['project'],
+	'task': ['task'],
+	'user': ['user'],
+	'user/access': ['access']
+}
+_WORKS_CSV_FIELDS = ['_id', 'client', 'clientName', 'project', 'projectName',
+					'task', 'taskName', 'user', 'userName', 'start', 'end',
+					'elapsed', 'description']
+_WORKS_FORMATS = ['csv', 'ndjson']
 
 class Primary(Services.Service):
 	"""Primary Service class
@@ -45,6 +73,65 @@ class Primary(Services.Service):
 	Service for main requests
 	"""
 
+	def _compact(self, records, entities, fields):
+		"""Compact
+
+		Dictionary encodes records so that each one is a list of its ID, the
+		index of each of its entities in the lookup for that entity, and the
+		rest of the fields. The lookups are lists of the ID and name of each
+		entity, the names taken from the records if they have them, else from
+		the cache
+
+		Arguments:
+			records (dict[]): The records to encode
+			entities (str[]): The entity fields of each record, any of
+				'client', 'project', 'task', or 'user'
+			fields (str[]): The rest of the fields of each record, in order
+
+		Returns:
+			dict
+		"""
+
+		# Init the return, the lookups, and the index of each ID in them
+		dRet = {'fields': ['_id'] + entities + fields, 'rows': []}
+		dIndexes = {s: {} for s in entities}
+
+		# Go through each record
+		for d in records:
+
+			# Add each entity the first time it's seen
+			lRow = [d['_id']]
+			for s in entities:
+				try:
+					lRow.append(dIndexes[s][d[s]])
+				except KeyError:
+					lRow.append(len(dIndexes[s]))
+					dIndexes[s][d[s]] = lRow[-1]
+
+			# Add the rest of the fields
+			lRow.extend([d[f] for f in fields])
+			dRet['rows'].append(lRow)
+
+		# Go through each entity
+		for s in entities:
+
+			# If the records have the names, use them, else fetch them all
+			#	from the cache at once
+			sName = '%sName' % s
+			if records and sName in records[0]:
+				dNames = {d[s]: d[sName] for d in records}
+			else:
+				dNames = {
+					k: v['name'] for k, v in
+					_COMPACT_ENTITIES[s].cache_get_many(list(dIndexes[s])).items()
+				}
+
+			# Create the lookup in the order of the indexes
+			dRet['%ss' % s] = [[k, dNames.get(k)] for k in dIndexes[s]]
+
+		# Return the encoded records
+		return dRet
+
 	def _create_key(self, user, type):
 		"""Create Key
 
@@ -104,134 +191,34 @@ class Primary(Services.Service):
 		"""
 
 		# Fetch the client info
-		dClient = Client.get(client, raw=True)
+		dClient = Client.cache_get(client)
 		if not dClient:
 			raise Services.ResponseException(error=(body.errors.DATA_FIELDS, [client, 'client']))
 
-		# Init the time and prices per project
-		dProjects = {}
-
 		# Fetch all the tasks for the client in the given timeframe
 		lWorks = Work.for_invoice(range[0], range[1], client)
 
-		# Calculate the total elapsed per unique task
-		dTasks = {}
-		for d in lWorks:
-
-			# Get the total seconds
-			iElapsed = d['end'] - d['start']
-
-			# Add it to the existing, or init the task
-			try:
-				dTasks[d['task']]['elapsed'] += iElapsed
-			except KeyError:
-				dTasks[d['task']] = {
-					'project': d['project'],
-					'elapsed': iElapsed
-				}
-
-		# Go through each unique task
-		for d in dTasks.values():
-
-			# Round to the nearest minute
-			iMinutes, iRemainder = divmod(d['elapsed'], 60)
-
-			# If the remaining seconds are anything over 15, round up
-			if iRemainder > 15:
-				iMinutes += 1
-
-			# If the task minimum is 1
-			if dClient['task_minimum'] == 1:
-
-				# Store the total minutes as is
-				iTotalMinutes = iMinutes
-
-			# Else
-			else:
-
-				# Figure out the total blocks
-				iBlocks, iRemainder = divmod(iMinutes, dClient['task_minimum'])
-
-				# If the remainder is greater than the overflow
-				if dClient['task_overflow'] == 0 or iRemainder > dClient['task_overflow']:
-					iBlocks += 1
-
-				# Multiply the blocks by the minimum
-				iTotalMinutes = dClient['task_minimum'] * iBlocks
-
-			# Increase the project or init it
-			try:
-				dProjects[d['project']]['minutes'] += iTotalMinutes
-			except KeyError:
-				dProjects[d['project']] = {
-					'_id': d['project'],
-					'minutes': iTotalMinutes,
-					'price': Decimal('0.00')
-				}
-
-		# Init the subtotal
-		deSubTotal = Decimal('0.00')
-
-		# Go through each project and calculate the amount
-		for sProject in dProjects:
-
-			# Divide the minutes by 60 to get hours
-			deHours = Decimal(dProjects[sProject]['minutes']) / Decimal(60)
-
-			# Get the price
-			dePrice = Decimal(dClient['rate']) * deHours
-
-			# Round up to closest cent
-			dProjects[sProject]['amount'] = dePrice.quantize(Decimal('1.00'), rounding=ROUND_UP)
-
-			# Update the sub-total
-			deSubTotal += dProjects[sProject]['amount']
-
-		# Go through each additional and add/subtract from the subtotal
-		for d in additional:
-			if d['type'] == 'cost':
-				deSubTotal += Decimal(d['amount'])
-			else:
-				deSubTotal -= Decimal(d['amount'])
-
 		# Get the company info
-		dCompany = Company.get(raw=True, limit=1)
-
-		# Init the taxes and total
-		deTotal = Decimal(deSubTotal)
-		lTaxes = []
-
-		# If we collect taxes for this client
-		if dClient['taxes']:
-
-			# Go through any taxes we have for the company
-			for d in dCompany['taxes']:
-
-				# Generate the percentage as a divisor
-				dePercentage = Decimal(d['percentage']) / Decimal('100')
-
-				# Generate from the subtotal
-				deAmount = (deSubTotal * dePercentage).quantize(Decimal('1.00'))
-
-				# Add the tax to the list
-				lTaxes.append({
-					'name': d['name'],
-					'amount': deAmount
-				})
-
-				# Update the total
-				deTotal += deAmount
+		dCompany = Company.cache_get()
+
+		# Calculate the invoice
+		dInvoice = Billing.invoice(
+			Billing.columns(lWorks),
+			dClient,
+			dCompany['taxes'],
+			additional
+		)
 
 		# Return the generated data
 		return {
 			'client': client,
 			'start': range[0],
 			'end': range[1],
-			'subtotal': deSubTotal,
-			'taxes': lTaxes,
-			'total': deTotal,
-			'additional': additional,
-			'items': list(dProjects.values())
+			'subtotal': dInvoice['subtotal'],
+			'taxes': dInvoice['taxes'],
+			'total': dInvoice['total'],
+			'additional': dInvoice['additional'],
+			'items': dInvoice['items']
 		}
 
 	def _generate_invoice_pdf(self, _id):
@@ -251,8 +238,8 @@ class Primary(Services.Service):
 
 		# Generate the template data
 		dTpl = {
-			'company': Company.get(raw = True, limit = 1),
-			'client': Client.get(dInvoice['client'], raw = True),
+			'company': Company.cache_get(),
+			'client': Client.cache_get(dInvoice['client']),
 			'invoice': dInvoice,
 			'additional': InvoiceAdditional.filter({
 				'invoice': _id
@@ -276,8 +263,8 @@ class Primary(Services.Service):
 		else:
 			dTpl['currency'] = '$'
 
-		# Generate the PDF
-		sPDF = Templates.generate('pdf/invoice.html', dTpl, 'en-US', pdf=True)
+		# Generate the HTML and send it to the renderer
+		sPDF = PDF.generate(Templates.generate('pdf/invoice.html', dTpl, 'en-US'))
 
 		# Create the Key for S3
 		sKey = _INVOICE_S3_KEY % {
@@ -297,6 +284,106 @@ class Primary(Services.Service):
 		# Return the result
 		return mResult
 
+	def _paged(self, data, fetch, field):
+		"""Paged
+
+		Fetches a single page of records using the limit, cursor, and total
+		passed in the request data, and returns the records along with the
+		cursor of the next page, or None if it's the last one
+
+		Arguments:
+			data (dict): The request data
+			fetch (callable): Called with limit, cursor, and count to fetch
+				the records or their total
+			field (str): The timestamp field the records are ordered by
+
+		Raises:
+			Services.ResponseException
+
+		Returns:
+			dict
+		"""
+
+		# Check the limit
+		try:
+			iLimit = int(data['limit'])
+			if iLimit < 1 or iLimit > _PAGE_MAXIMUM:
+				raise ValueError('limit')
+		except (TypeError, ValueError):
+			raise Services.ResponseException(error=(
+				body.errors.DATA_FIELDS, [['limit', 'invalid']]
+			))
+
+		# Check the cursor
+		sCursor = 'cursor' in data and data['cursor'] or None
+		if sCursor:
+			try:
+				cursor_decode(sCursor)
+			except ValueError:
+				raise Services.ResponseException(error=(
+					body.errors.DATA_FIELDS, [['cursor', 'invalid']]
+				))
+
+		# Fetch one more record than requested to know if there's another page
+		lRecords = fetch(limit=iLimit + 1, cursor=sCursor)
+
+		# Init the page
+		dRet = {'records': lRecords[:iLimit], 'next': None}
+
+		# If there's more, generate the cursor from the last record returned
+		if len(lRecords) > iLimit:
+			d = lRecords[iLimit - 1]
+			dRet['next'] = cursor_encode(d[field], d['_id'])
+
+		# If the total was requested
+		if 'total' in data and data['total']:
+			dRet['total'] = fetch(count=True)
+
+		# Return the page
+		return dRet
+
+	def _works_stream(self, format, works):
+		"""Works Stream
+
+		Converts the work records, as they are read, into lines of NDJSON or
+		CSV, adding the elapsed seconds to each
+
+		Arguments:
+			format (str): 'ndjson' or 'csv'
+			works (iterable): The work records
+
+		Returns:
+			generator
+		"""
+
+		# If we're generating CSV, start with the header, sent right away so
+		#	that even an empty range gets it
+		if format == 'csv':
+			oBuffer = StringIO()
+			oCSV = csv.writer(oBuffer)
+			oCSV.writerow(_WORKS_CSV_FIELDS)
+			yield oBuffer.getvalue()
+			oBuffer.seek(0)
+			oBuffer.truncate()
+
+		# Go through each record
+		for d in works:
+
+			# Calculate the elapsed seconds
+			d['elapsed'] = d['end'] - d['start']
+
+			# If we want NDJSON, yield the record as a single line
+			if format == 'ndjson':
+				yield '%s\n' % JSON.encode(d)
+
+			# Else, write the row to the buffer, yield its contents, and clear
+			#	it
+			else:
+				oCSV.writerow([d[s] for s in _WORKS_CSV_FIELDS])
+				yield oBuffer.getvalue()
+				oBuffer.seek(0)
+				oBuffer.truncate()
+
 	def initialise(self):
 		"""Initialise
 
@@ -313,8 +400,34 @@ class Primary(Services.Service):
 			'db': 0
 		}))
 
-		# Pass the Redis connection to records that need it
-		User.redis(self._redis)
+		# Pass the Redis connection to records that need it, along with the
+		#	size and lifetime of the in process user cache
+		User.redis(self._redis, **Conf.get(('cache', 'user_lru'), {}))
+		Work.redis(self._redis)
+
+		# Init the job queues
+		Jobs.init(self._redis)
+
+		# Init the routing of reports to the read replica
+		Replica.init(self._redis, Conf.get(('mysql', 'replica'), {}))
+
+		# Init the recording of every statement sent to the DB
+		QueryLog.init(self._redis, Conf.get(('mysql', 'query_log'), {}))
+
+		# Init the threads used to run independent queries at the same time
+		Parallel.init(Conf.get(('mysql', 'parallel'), {}))
+
+		# Init the client of the PDF renderer
+		PDF.init(Conf.get('pdf', {}))
+
+		# Init the data versions and the report results cached by them
+		Versions.init(self._redis)
+		ResultCache.init(self._redis, Conf.get(('cache', 'results'), {}))
+
+		# Pass it to the reference records along with how long to keep them
+		iTTL = Conf.get(('cache', 'ttl'), body.constants.SECONDS_DAY)
+		for o in [Client, Company, Project, Task]:
+			o.redis(self._redis, iTTL)
 
 		# Get the S3 config
 		dS3 = Conf.get('s3', {
@@ -337,6 +450,77 @@ class Primary(Services.Service):
 		# Return self for chaining
 		return self
 
+	def _wrote(self, path, req):
+		"""Wrote
+
+		Marks that the user making a request that writes changed something, so
+		that their reports are read from the primary until the replica has
+		caught up, and bumps the versions of any tables the request can change
+		so that lists of them are sent again
+
+		Arguments:
+			path (str): The path passed to the request
+			req (dict): The request details
+
+		Returns:
+			None
+		"""
+		if 'session' in req and req['session']:
+			Replica.wrote(req['session']['user_id'])
+		if path in _TABLES_WRITTEN:
+			Versions.bump_tables(_TABLES_WRITTEN[path])
+
+	def create(self, path, req):
+		"""Create
+
+		Overrides Services.Service.create to mark the user as having written
+
+		Arguments:
+			path (str): The path passed to the request
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+		oResponse = super().create(path, req)
+		self._wrote(path, req)
+		return oResponse
+
+	def delete(self, path, req):
+		"""Delete
+
+		Overrides Services.Service.delete to mark the user as having written
+
+		Arguments:
+			path (str): The path passed to the request
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+		oResponse = super().delete(path, req)
+		self._wrote(path, req)
+		return oResponse
+
+	def update(self, path, req):
+		"""Update
+
+		Overrides Services.Service.update to mark the user as having written
+
+		Arguments:
+			path (str): The path passed to the request
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+		oResponse = super().update(path, req)
+		self._wrote(path, req)
+		return oResponse
+
 	def account_clients_read(self, req):
 		"""Account Clients read
 
@@ -388,26 +572,16 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
-		# Fetch the tasks by the signed in user
-		lWorks = Work.by_user(
+		# Fetch the total seconds worked by the signed in user
+		iElapsed = WorkDaily.elapsed(
 			req['session']['user_id'],
 			req['data']['start'],
 			req['data']['end'],
-			None
+			Replica.custom(req['session']['user_id'])
 		)
 
-		# Init the total seconds
-		iElapsed = 0
-
-		# Go through each task and calculate the elpased seconds
-		for d in lWorks:
-			iElapsed += d['end'] - d['start']
-
 		# Check for an open task
-		dTask = Work.filter({
-			'user': req['session']['user_id'],
-			'end': None
-		}, raw = [ 'start' ], limit = 1)
+		dTask = Work.open(req['session']['user_id'])
 
 		# If we got anything
 		if dTask:
@@ -750,21 +924,256 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
+		# Is the compact format requested
+		bCompact = req['data'].get('format') == 'compact'
+
 		# Fetch the tasks by the signed in user
 		lWorks = Work.by_user(
 			req['session']['user_id'],
 			req['data']['start'],
 			req['data']['end'],
-			'client' in req['data'] and req['data']['client'] or None
+			'client' in req['data'] and req['data']['client'] or None,
+			bCompact
 		)
 
 		# Go through each task and calculate the elpased seconds
 		for d in lWorks:
 			d['elapsed'] = d['end'] - d['start']
 
+		# If the compact format was requested, encode the tasks
+		if bCompact:
+			return Services.Response(self._compact(
+				lWorks,
+				['client', 'project', 'task'],
+				['start', 'end', 'elapsed', 'description']
+			))
+
 		# Return all the tasks
 		return Services.Response(lWorks)
 
+	def admin_balances_read(self, req):
+		"""Admin Balances read
+
+		Returns the totals invoiced and paid, and what is owed, by every client
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Return the balances
+		return Services.Response(
+			ClientBalance.balances(Replica.custom(req['session']['user_id']))
+		)
+
+	def admin_cache_read(self, req):
+		"""Admin Cache read
+
+		Returns the hits and misses of the record cache by table
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Return the stats
+		return Services.Response(
+			Cache.cache_stats(self._redis)
+		)
+
+	def admin_invoices_create(self, req):
+		"""Admin Invoices create
+
+		Queues the generation of the invoices of every client, or the ones
+		passed, for a period, and returns the ID of the batch. The invoices are
+		generated by the crons.invoice_batch_worker worker
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Verify the minimum fields
+		try: DictHelper.eval(req['data'], ['start', 'end'])
+		except ValueError as e: return Services.Error(body.errors.DATA_FIELDS, [[f, 'missing'] for f in e.args])
+
+		# Make sure the period is valid
+		lErrors = []
+		dPeriod = {}
+		for k in ['start', 'end']:
+			try:
+				dPeriod[k] = int(req['data'][k])
+			except (TypeError, ValueError):
+				lErrors.append([k, 'invalid'])
+
+		# Make sure the clients, if passed, are a list of IDs
+		lClients = 'clients' in req['data'] and req['data']['clients'] or None
+		if lClients is not None and (
+			not isinstance(lClients, list) or \
+			not all(isinstance(s, str) for s in lClients)
+		):
+			lErrors.append(['clients', 'invalid'])
+
+		# If there's any errors
+		if lErrors:
+			return Services.Error(body.errors.DATA_FIELDS, lErrors)
+
+		# Add the batch to the queue
+		sID = str(uuid.uuid4())
+		Jobs.push(_INVOICE_BATCH_QUEUE, sID, {
+			'start': dPeriod['start'],
+			'end': dPeriod['end'],
+			'clients': lClients
+		})
+
+		# Return the ID of the batch
+		return Services.Response(sID)
+
+	def admin_invoices_read(self, req):
+		"""Admin Invoices read
+
+		Returns the status of a batch of invoices queued by
+		admin_invoices_create, or None if it finished without any client
+		failing
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# If the ID is missing
+		if '_id' not in req['data']:
+			return Services.Error(body.errors.DATA_FIELDS, [['_id', 'missing']])
+
+		# Return the status
+		return Services.Response(
+			Jobs.status(_INVOICE_BATCH_QUEUE, req['data']['_id'])
+		)
+
+	def admin_mysql_read(self, req):
+		"""Admin MySQL read
+
+		Returns the state of the DB connection pools of the process that
+		handles the request, including how long requests waited for a
+		connection
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Return the stats
+		return Services.Response(
+			MySQLPool.stats()
+		)
+
+	def admin_queries_delete(self, req):
+		"""Admin Queries delete
+
+		Clears the totals of every statement fingerprint so that they can be
+		measured again from scratch
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Clear the totals
+		QueryLog.reset()
+
+		# Return OK
+		return Services.Response(True)
+
+	def admin_queries_read(self, req):
+		"""Admin Queries read
+
+		Returns the count, rows, and time of every statement fingerprint, and
+		the endpoints that ran them, the ones that took the most time first
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# If a limit was passed, make sure it's valid
+		iLimit = None
+		if 'limit' in req['data']:
+			try:
+				iLimit = int(req['data']['limit'])
+				if iLimit < 1:
+					raise ValueError(iLimit)
+			except (TypeError, ValueError):
+				return Services.Error(body.errors.DATA_FIELDS, [['limit', 'invalid']])
+
+		# Return the stats
+		return Services.Response(
+			QueryLog.stats(iLimit)
+		)
+
+	def admin_working_read(self, req):
+		"""Admin Working read
+
+		Returns the open work of everyone currently working, with how long
+		they've been at it
+
+		Arguments:
+			req (dict): The request details, which can include 'data',
+						'environment', and 'session'
+
+		Returns:
+			Services.Response
+		"""
+
+		# Check rights
+		Rights.verify_or_raise(req['session']['user_id'], 'admin')
+
+		# Return the open work
+		return Services.Response(
+			Work.working()
+		)
+
 	def client_create(self, req):
 		"""Client create
 
@@ -824,10 +1233,13 @@ class Primary(Services.Service):
 		# Mark the client as archived
 		oClient['_archived'] = True
 
-		# Save the client and return the result
-		return Services.Response(
-			oClient.save()
-		)
+		# Save the client, and if it worked, mark the client's data as changed
+		bRes = oClient.save()
+		if bRes:
+			Versions.bump(oClient['_id'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def client_read(self, req):
 		"""Client read
@@ -850,7 +1262,7 @@ class Primary(Services.Service):
 		Rights.verify_or_raise(req['session']['user_id'], None, req['data']['_id'])
 
 		# Fetch the record
-		dClient = Client.get(req['data']['_id'], raw=True)
+		dClient = Client.cache_get(req['data']['_id'])
 		if not dClient:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'client'])
 
@@ -908,10 +1320,13 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
-		# Save the record and return the result
-		return Services.Response(
-			oClient.save()
-		)
+		# Save the record, and if it worked, mark the client's data as changed
+		bRes = oClient.save()
+		if bRes:
+			Versions.bump(oClient['_id'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def client_owes_read(self, req):
 		"""Client Owes
@@ -935,15 +1350,11 @@ class Primary(Services.Service):
 		if dUser['type'] != 'client' or dUser['access'] == None:
 			return Services.Error(body.errors.RIGHTS)
 
-		# Get the total for all invoices
-		deInvoices = Decimal(Invoice.total(dUser['access']))
-
-		# Get the total for all payments
-		dePayments = Decimal(Payment.total(dUser['access']))
-
-		# Return the difference
+		# Return the difference between the invoices and payments
 		return Services.Response(
-			deInvoices - dePayments
+			ClientBalance.owes(
+				dUser['access'], Replica.custom(req['session']['user_id'])
+			)
 		)
 
 	def clients_read(self, req):
@@ -1027,11 +1438,44 @@ class Primary(Services.Service):
 			else:
 				lClients = dUser['access']
 
-		# Get all records that end in the given timeframe
-		lWorks = Work.range_grouped(req['data']['start'], req['data']['end'], lClients)
+		# If the result is cached, return it
+		sKey, mResult = ResultCache.get('client_works', {
+			'start': req['data']['start'],
+			'end': req['data']['end'],
+			'format': req['data'].get('format')
+		}, lClients)
+		if mResult is not None:
+			return Services.Response(mResult)
+
+		# Is the compact format requested
+		bCompact = req['data'].get('format') == 'compact'
+
+		# Get the totals of all records that end in the given timeframe
+		dCustom = Replica.custom(req['session']['user_id'])
+		lWorks = WorkDaily.range_grouped(
+			req['data']['start'],
+			req['data']['end'],
+			lClients,
+			compact=bCompact,
+			custom=dCustom
+		)
 
-		# Return the records
-		return Services.Response(lWorks)
+		# If the compact format was requested, add the name and description
+		#	of each task from the cache, and encode the totals
+		if bCompact:
+			dTasks = Task.cache_get_many(list({d['task'] for d in lWorks}))
+			for d in lWorks:
+				dTask = dTasks.get(d['task']) or {}
+				d['taskName'] = dTask.get('name')
+				d['description'] = dTask.get('description')
+			lWorks = self._compact(
+				lWorks,
+				['client', 'project', 'task'],
+				['description', 'elapsed']
+			)
+
+		# Store and return the records
+		return Services.Response(ResultCache.set(sKey, lWorks, dCustom))
 
 	def company_read(self, req):
 		"""Company read
@@ -1047,7 +1491,7 @@ class Primary(Services.Service):
 		"""
 
 		# Fetch the record
-		dCompany = Company.get(raw=True, limit=1)
+		dCompany = Company.cache_get()
 		if not dCompany:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'company'])
 
@@ -1127,17 +1571,11 @@ class Primary(Services.Service):
 		)
 
 		# If we have any additional lines
-		lAdditionals = None
+		lAddRecords = []
 		if 'additional' in dInvoice:
 
-			# Pop off the data
-			lAdditionals = dInvoice.pop('additional')
-
-			# Init the list of instances
-			lAddRecords = []
-
 			# Go through each additional
-			for d in lAdditionals:
+			for d in dInvoice.pop('additional'):
 
 				# Add an empty invoice ID to the additional
 				d['invoice'] = body.constants.EMPTY_UUID
@@ -1149,57 +1587,59 @@ class Primary(Services.Service):
 				except ValueError as e:
 					return Services.Error(body.errors.DATA_FIELDS, [['additional.%s' % l[0], l[1]] for l in e.args[0]])
 
+		# Go through each project
+		lItemRecords = []
+		for d in dInvoice.pop('items'):
+
+			# Create an instance of the invoice item to check for problems
+			try:
+				lItemRecords.append(InvoiceItem({
+					'invoice': body.constants.EMPTY_UUID,
+					'project': d['_id'],
+					'minutes': d['minutes'],
+					'amount': d['amount']
+				}))
+			except ValueError as e:
+				return Services.Error(body.errors.DATA_FIELDS, e.args[0])
+
 		# Add the identifier
 		dInvoice['identifier'] = StrHelper.random(6, 'ABCDEFGHJKLMNPQRSTUVWXYZ123456789', False)
 
-		# Pop off the projects
-		lProjects = dInvoice.pop('items')
-
 		# Create an instance of the invoice to check for problems
 		try:
 			oInvoice = Invoice(dInvoice)
 		except ValueError as e:
 			return Services.Error(body.errors.DATA_FIELDS, e.args[0])
 
-		# Create the invoice and store the ID
-		while True:
-			try:
-				sID = oInvoice.create()
-				break
-			except DuplicateException:
-				oInvoice['identifier'] = StrHelper.random(6, 'ABCDEFGHJKLMNPQRSTUVWXYZ123456789', False)
+		# Write the invoice, its items, and its additionals all or nothing
+		with transaction(Invoice.struct()['host']):
 
-		# Go through each project
-		for d in lProjects:
+			# Create the invoice and store the ID
+			while True:
+				try:
+					sID = oInvoice.create()
+					break
+				except DuplicateException:
+					oInvoice['identifier'] = StrHelper.random(6, 'ABCDEFGHJKLMNPQRSTUVWXYZ123456789', False)
 
-			# Create an instance of the invoice item to check for problems
-			try:
-				oItem = InvoiceItem({
-					'invoice': sID,
-					'project': d['_id'],
-					'minutes': d['minutes'],
-					'amount': d['amount']
-				})
-			except ValueError as e:
-				return Services.Error(body.errors.DATA_FIELDS, e.args[0])
+			# Set the invoice ID on the items and additionals and create them
+			for o in lItemRecords + lAddRecords:
+				o['invoice'] = sID
+			InvoiceItem.create_bulk(lItemRecords)
+			InvoiceAdditional.create_bulk(lAddRecords)
 
-			# Create the item
-			oItem.create()
+			# Add the invoice to the client's balance
+			ClientBalance.add('invoice', sID)
 
-		# If we have any additionals, go through each one, set the invoice ID,
-		#	then create the record
-		if lAddRecords:
-			for o in lAddRecords:
-				o['invoice'] = sID
-				o.create()
+		# Mark the client's data as changed
+		Versions.bump(req['data']['client'])
 
-		# Generate the PDF
-		mWarning = self._generate_invoice_pdf(sID)
+		# Add the PDF to the queue to be generated
+		Jobs.push(_INVOICE_PDF_QUEUE, sID)
 
 		# Return the new invoice as raw data
 		return Services.Response(
-			oInvoice.record(),
-			warning=mWarning
+			oInvoice.record()
 		)
 
 	def invoice_delete(self, req):
@@ -1227,13 +1667,18 @@ class Primary(Services.Service):
 		# Check rights
 		Rights.verify_or_raise(req['session']['user_id'], 'accounting', req['data']['client'])
 
-		# Delete the items
-		InvoiceItem.delete_get(req['data']['_id'], 'invoice')
+		# Remove the invoice from the client's balance, then delete the items
+		#	and the invoice, all or nothing
+		with transaction(Invoice.struct()['host']):
+			ClientBalance.subtract('invoice', oInvoice['_id'])
+			InvoiceItem.delete_get(oInvoice['_id'], 'invoice')
+			bRes = oInvoice.delete()
 
-		# Delete the invoice and return the result
-		return Services.Response(
-			oInvoice.delete()
-		)
+		# Mark the client's data as changed
+		Versions.bump(oInvoice['client'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def invoice_read(self, req):
 		"""Invoice read
@@ -1252,21 +1697,33 @@ class Primary(Services.Service):
 		if '_id' not in req['data']:
 			return Services.Error(body.errors.DATA_FIELDS, [['_id', 'missing']])
 
-		# Find the invoice
-		dInvoice = Invoice.get(req['data']['_id'], raw=True)
+		# Do we need details
+		bDetails = 'details' in req['data'] and req['data']['details']
+
+		# Find the invoice, its items, its additional lines, and the company
+		#	if we need details, all at once
+		lCalls = [
+			partial(Invoice.get, req['data']['_id'], raw=True),
+			partial(InvoiceItem.by_invoice, req['data']['_id']),
+			partial(InvoiceAdditional.filter, {
+				'invoice': req['data']['_id']
+			}, raw=['_id', 'text', 'type', 'amount'])
+		]
+		if bDetails:
+			lCalls.append(Company.cache_get)
+		lResults = Parallel.run(*lCalls)
+
+		# If the invoice doesn't exist
+		dInvoice = lResults[0]
 		if not dInvoice:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'invoice'])
 
 		# Check rights
 		Rights.verify_or_raise(req['session']['user_id'], ['client', 'accounting'], dInvoice['client'])
 
-		# Find all the items associated and add them to the invoice
-		dInvoice['items'] = InvoiceItem.by_invoice(req['data']['_id'])
-
-		# Find all the additional lines associated and add them to the invoice
-		dInvoice['additional'] = InvoiceAdditional.filter({
-			'invoice': req['data']['_id']
-		}, raw=['_id', 'text', 'type', 'amount'])
+		# Add the items and additional lines to the invoice
+		dInvoice['items'] = lResults[1]
+		dInvoice['additional'] = lResults[2]
 
 		# Generate the total
 		dInvoice['minutes'] = 0
@@ -1274,16 +1731,16 @@ class Primary(Services.Service):
 			dInvoice['minutes'] += d['minutes']
 
 		# If we need details
-		if 'details' in req['data'] and req['data']['details']:
+		if bDetails:
 
 			# Add the details section to the invoice
 			dInvoice['details'] = {
 
 				# Fetch the client
-				"client": Client.get(dInvoice['client'], raw=True),
+				"client": Client.cache_get(dInvoice['client']),
 
-				# Fetch the company
-				"company": Company.get(raw=True, limit=1)
+				# Add the company
+				"company": lResults[3]
 			}
 
 		# Return the invoice
@@ -1292,7 +1749,8 @@ class Primary(Services.Service):
 	def invoice_pdf_read(self, req):
 		"""Invoice PDF read
 
-		Returns the temporary URL for an invoices PDF
+		Returns the temporary URL for an invoices PDF, or an error if the PDF
+		hasn't been generated yet, or failed to generate
 
 		Arguments:
 			req (dict): The request details, which can include 'data',
@@ -1314,6 +1772,14 @@ class Primary(Services.Service):
 		# Check rights
 		Rights.verify_or_raise(req['session']['user_id'], ['client', 'accounting'], dInvoice['client'])
 
+		# If the PDF is still in the queue, or failed to generate
+		dStatus = Jobs.status(_INVOICE_PDF_QUEUE, req['data']['_id'])
+		if dStatus:
+			if dStatus['status'] == Jobs.PENDING:
+				return Services.Error(errors.INVOICE_PDF_PENDING)
+			else:
+				return Services.Error(errors.INVOICE_PDF_FAILED, dStatus['error'])
+
 		# Generate the temporary URL
 		sURL = self.s3.presigned_url(
 			_INVOICE_S3_KEY % {
@@ -1382,10 +1848,10 @@ class Primary(Services.Service):
 		dInvoice['details'] = {
 
 			# Fetch the client
-			'client': Client.get(req['data']['client'], raw=True),
+			'client': Client.cache_get(req['data']['client']),
 
 			# Fetch the company
-			'company': Company.get(raw=True, limit=1)
+			'company': Company.cache_get()
 		}
 
 		# Return the invoice data
@@ -1439,20 +1905,39 @@ class Primary(Services.Service):
 			else:
 				lClients = dUser['access']
 
+		# If the result is cached, return it
+		sKey, mResult = ResultCache.get('invoices', req['data'], lClients)
+		if mResult is not None:
+			return Services.Response(mResult)
+
+		# Find where to read from
+		dCustom = Replica.custom(req['session']['user_id'])
+
 		# If a range was specified
 		if 'range' in req['data'] and isinstance(req['data']['range'], list):
 
 			# Get all invoices in the given timeframe
-			lInvoices = Invoice.range(req['data']['range'], lClients)
+			fFetch = partial(
+				Invoice.range, req['data']['range'], lClients,
+				custom=dCustom
+			)
 
 		# Else
 		else:
 
 			# Just get by client
-			lInvoices = Invoice.by_client(lClients)
+			fFetch = partial(
+				Invoice.by_client, lClients, custom=dCustom
+			)
+
+		# If a page was requested, return just that page
+		if 'limit' in req['data']:
+			return Services.Response(ResultCache.set(
+				sKey, self._paged(req['data'], fFetch, '_created'), dCustom
+			))
 
 		# Return the records
-		return Services.Response(lInvoices)
+		return Services.Response(ResultCache.set(sKey, fFetch(), dCustom))
 
 	def payment_create(self, req):
 		"""Payment create
@@ -1480,12 +1965,17 @@ class Primary(Services.Service):
 		except ValueError as e:
 			return Services.Error(body.errors.DATA_FIELDS, e.args[0])
 
-		# Create the record
+		# Create the record and add it to the client's balance
 		try:
-			sID = oPayment.create()
+			with transaction(Payment.struct()['host']):
+				sID = oPayment.create()
+				ClientBalance.add('payment', sID)
 		except DuplicateException as e:
 			return Services.Error(body.errors.DB_DUPLICATE)
 
+		# Mark the client's data as changed
+		Versions.bump(req['data']['client'])
+
 		# Return the new ID
 		return Services.Response(sID)
 
@@ -1537,20 +2027,39 @@ class Primary(Services.Service):
 			else:
 				lClients = dUser['access']
 
+		# If the result is cached, return it
+		sKey, mResult = ResultCache.get('payments', req['data'], lClients)
+		if mResult is not None:
+			return Services.Response(mResult)
+
+		# Find where to read from
+		dCustom = Replica.custom(req['session']['user_id'])
+
 		# If a range was specified
 		if 'range' in req['data'] and isinstance(req['data']['range'], list):
 
-			# Get all invoices in the given timeframe
-			lPayments = Payment.range(req['data']['range'], lClients)
+			# Get all payments in the given timeframe
+			fFetch = partial(
+				Payment.range, req['data']['range'], lClients,
+				custom=dCustom
+			)
 
 		# Else
 		else:
 
 			# Just get by client
-			lPayments = Payment.by_client(lClients)
+			fFetch = partial(
+				Payment.by_client, lClients, custom=dCustom
+			)
+
+		# If a page was requested, return just that page
+		if 'limit' in req['data']:
+			return Services.Response(ResultCache.set(
+				sKey, self._paged(req['data'], fFetch, '_created'), dCustom
+			))
 
 		# Return the records
-		return Services.Response(lPayments)
+		return Services.Response(ResultCache.set(sKey, fFetch(), dCustom))
 
 	def project_create(self, req):
 		"""Project create
@@ -1615,10 +2124,13 @@ class Primary(Services.Service):
 		# Mark the project as archived
 		oProject['_archived'] = True
 
-		# Save the project and return the result
-		return Services.Response(
-			oProject.save()
-		)
+		# Save the project, and if it worked, mark the client's data as changed
+		bRes = oProject.save()
+		if bRes:
+			Versions.bump(oProject['client'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def project_read(self, req):
 		"""Project read
@@ -1638,7 +2150,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DATA_FIELDS, [['_id', 'missing']])
 
 		# Fetch the record
-		dProject = Project.get(req['data']['_id'], raw=True)
+		dProject = Project.cache_get(req['data']['_id'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'project'])
 
@@ -1688,10 +2200,13 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
-		# Save the record and return the result
-		return Services.Response(
-			oProject.save()
-		)
+		# Save the record, and if it worked, mark the client's data as changed
+		bRes = oProject.save()
+		if bRes:
+			Versions.bump(oProject['client'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def projects_read(self, req):
 		"""Projects read
@@ -1796,7 +2311,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DATA_FIELDS, [['project', 'missing']])
 
 		# Fetch the project
-		dProject = Project.get(req['data']['project'], raw=['client'])
+		dProject = Project.cache_get(req['data']['project'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['project'], 'project'])
 
@@ -1841,7 +2356,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'task'])
 
 		# Find the associated project
-		dProject = Project.get(oTask['project'], raw=['client'])
+		dProject = Project.cache_get(oTask['project'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [oTask['project'], 'project'])
 
@@ -1851,10 +2366,13 @@ class Primary(Services.Service):
 		# Mark the task as archived
 		oTask['_archived'] = True
 
-		# Save the task and return the result
-		return Services.Response(
-			oTask.save()
-		)
+		# Save the task, and if it worked, mark the client's data as changed
+		bRes = oTask.save()
+		if bRes:
+			Versions.bump(dProject['client'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def task_read(self, req):
 		"""Task read
@@ -1874,7 +2392,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DATA_FIELDS, [['_id', 'missing']])
 
 		# Fetch the record
-		dTask = Task.get(req['data']['_id'], raw=True)
+		dTask = Task.cache_get(req['data']['_id'])
 		if not dTask:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'task'])
 
@@ -1907,7 +2425,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'task'])
 
 		# Find the project
-		dProject = Project.get(oTask['project'], raw=['client'])
+		dProject = Project.cache_get(oTask['project'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [oTask['project'], 'project'])
 
@@ -1929,9 +2447,12 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
-		# Save the record and return the result
+		# Save the record, and if it worked, mark the client's data as changed
 		try:
-			return Services.Response(oTask.save())
+			bRes = oTask.save()
+			if bRes:
+				Versions.bump(dProject['client'])
+			return Services.Response(bRes)
 
 		# Name is a duplicate
 		except DuplicateException:
@@ -1955,7 +2476,7 @@ class Primary(Services.Service):
 			return Services.Error(body.errors.DATA_FIELDS, [['project', 'missing']])
 
 		# Find the project
-		dProject = Project.get(req['data']['project'], raw=['client'])
+		dProject = Project.cache_get(req['data']['project'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['project'], 'project'])
 
@@ -2037,7 +2558,7 @@ class Primary(Services.Service):
 		sKey = self._create_key(sID, 'setup')
 
 		# Fetch the company name
-		dCompany = Company.get(raw=True, limit=1)
+		dCompany = Company.cache_get()
 
 		# Create the setup template data
 		dTpl = {
@@ -2095,10 +2616,14 @@ class Primary(Services.Service):
 		# Mark the user as archived
 		oUser['_archived'] = True
 
-		# Save the user and return the result
-		return Services.Response(
-			oUser.save()
-		)
+		# Save the user, and if it worked, mark everyone's data as changed as
+		#	the user's work can be on any client
+		bRes = oUser.save()
+		if bRes:
+			Versions.bump_all()
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def user_read(self, req):
 		"""User read
@@ -2240,6 +2765,11 @@ class Primary(Services.Service):
 			# Clear the cache
 			User.clear(oUser['_id'])
 
+			# If the name changed, mark everyone's data as changed, as it's
+			#	shown with the user's work on any client
+			if 'name' in req['data']:
+				Versions.bump_all()
+
 		# Return the result
 		return Services.Response(bRes)
 
@@ -2460,7 +2990,7 @@ class Primary(Services.Service):
 		except ValueError as e: return Services.Error(body.errors.DATA_FIELDS, [(f, 'missing') for f in e.args])
 
 		# Find the project
-		dProject = Project.get(req['data']['project'], raw=['client'])
+		dProject = Project.cache_get(req['data']['project'])
 		if not dProject:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['project'], 'project'])
 
@@ -2468,7 +2998,7 @@ class Primary(Services.Service):
 		Rights.verify_or_raise(req['session']['user_id'], 'worker', dProject['client'])
 
 		# Find the task
-		dTask = Task.get(req['data']['task'])
+		dTask = Task.cache_get(req['data']['task'])
 		if not dTask:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['task'], 'task'])
 
@@ -2494,6 +3024,15 @@ class Primary(Services.Service):
 		except DuplicateException:
 			return Services.Error(body.errors.DB_DUPLICATE)
 
+		# Mark it as the user's open work, and if another one was started at
+		#	the same time, remove this one
+		if not Work.open_set(oWork.record(), dProject['client'], new=True):
+			oWork.delete()
+			return Services.Error(errors.TASK_ALREADY_STARTED)
+
+		# Mark the client's data as changed
+		Versions.bump(dProject['client'])
+
 		# Return the new ID and start time
 		return Services.Response({
 			'_id': sID,
@@ -2526,6 +3065,11 @@ class Primary(Services.Service):
 		if req['session']['user_id'] != oWork['user']:
 			return Services.Error(body.errors.RIGHTS)
 
+		# If the work was already ended, by a retried request or a second
+		#	click, don't end it, or add it to the daily totals, again
+		if oWork['end'] is not None:
+			return Services.Error(errors.WORK_ALREADY_ENDED, oWork['end'])
+
 		# If the description was passed
 		if 'description' in req['data']:
 			oWork['description'] = req['data']['description']
@@ -2537,6 +3081,13 @@ class Primary(Services.Service):
 		if not oWork.save():
 			return Services.Response(False)
 
+		# It's no longer open
+		Work.open_clear(oWork['user'], oWork['_id'])
+
+		# Add it to the daily totals, and mark the client's data as changed
+		WorkDaily.add(oWork['_id'])
+		Versions.bump(Project.cache_get(oWork['project'])['client'])
+
 		# Return the end time
 		return Services.Response(oWork['end'])
 
@@ -2565,10 +3116,25 @@ class Primary(Services.Service):
 		if not oWork:
 			return Services.Error(body.errors.DB_NO_RECORD, [req['data']['_id'], 'work'])
 
-		# Delete the record and return the result
-		return Services.Response(
-			oWork.delete()
-		)
+		# Remove it from the daily totals
+		WorkDaily.subtract(oWork['_id'])
+
+		# Delete the record
+		bRes = oWork.delete()
+
+		# If it failed, put it back in the daily totals
+		if not bRes:
+			WorkDaily.add(oWork['_id'])
+
+		# Else, mark the client's data as changed, and if it was open, it no
+		#	longer is
+		else:
+			Versions.bump(Project.cache_get(oWork['project'])['client'])
+			if oWork['end'] is None:
+				Work.open_clear(oWork['user'], oWork['_id'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def work_update(self, req):
 		"""Work update
@@ -2612,16 +3178,38 @@ class Primary(Services.Service):
 		if lErrors:
 			return Services.Error(body.errors.DATA_FIELDS, lErrors)
 
-		# Save the record and return the result
-		return Services.Response(
-			oWork.save()
-		)
+		# Remove the existing values from the daily totals, save the record,
+		#	then add whatever values it now has
+		WorkDaily.subtract(oWork['_id'])
+		bRes = oWork.save()
+		WorkDaily.add(oWork['_id'])
+
+		# If it was saved
+		if bRes:
+
+			# Mark the client's data as changed
+			sClient = Project.cache_get(oWork['project'])['client']
+			Versions.bump(sClient)
+
+			# If it's still open, update the open work, else make sure it isn't
+			#	marked as open anymore
+			if oWork['end'] is None:
+				Work.open_set(oWork.record(), sClient)
+			else:
+				Work.open_clear(oWork['user'], oWork['_id'])
+
+		# Return the result
+		return Services.Response(bRes)
 
 	def works_read(self, req):
 		"""Works read
 
 		Fetches and returns data on work for a specific client in a range
 
+		If 'format' is passed as 'ndjson' or 'csv' the data returned is a
+		generator of lines instead of a list, which the REST node streams back
+		as is. If it's passed as 'compact' the records are dictionary encoded
+
 		Arguments:
 			req (dict): The request details, which can include 'data',
 						'environment', and 'session'
@@ -2634,6 +3222,17 @@ class Primary(Services.Service):
 		try: DictHelper.eval(req['data'], ['start', 'end'])
 		except ValueError as e: return Services.Error(body.errors.DATA_FIELDS, [(f, 'missing') for f in e.args])
 
+		# Make sure the range is valid, as a streamed response can't report an
+		#	error once it has started
+		lErrors = []
+		for k in ['start', 'end']:
+			try:
+				req['data'][k] = int(req['data'][k])
+			except (TypeError, ValueError):
+				lErrors.append([k, 'invalid'])
+		if lErrors:
+			return Services.Error(body.errors.DATA_FIELDS, lErrors)
+
 		# Get the signed in user
 		dUser = User.cache_get(req['session']['user_id'])
 		if not dUser:
@@ -2671,12 +3270,69 @@ class Primary(Services.Service):
 			else:
 				lClients = dUser['access']
 
+		# Is the compact format requested
+		bCompact = req['data'].get('format') == 'compact'
+
+		# If a streamed format was requested
+		if 'format' in req['data'] and not bCompact:
+
+			# If it's not one we know
+			if req['data']['format'] not in _WORKS_FORMATS:
+				return Services.Error(body.errors.DATA_FIELDS, [['format', 'invalid']])
+
+			# Return the generator that will produce the lines as the records
+			#	are read from the DB
+			return Services.Response(
+				self._works_stream(
+					req['data']['format'],
+					Work.range_iter(
+						req['data']['start'],
+						req['data']['end'],
+						lClients,
+						Replica.custom(req['session']['user_id'])
+					)
+				)
+			)
+
+		# If the result is cached, return it
+		sKey, mResult = ResultCache.get('works', req['data'], lClients)
+		if mResult is not None:
+			return Services.Response(mResult)
+
 		# Get all records that end in the given timeframe
-		lWorks = Work.range(req['data']['start'], req['data']['end'], lClients)
+		dCustom = Replica.custom(req['session']['user_id'])
+		fFetch = partial(
+			Work.range, req['data']['start'], req['data']['end'], lClients,
+			compact=bCompact,
+			custom=dCustom
+		)
+
+		# If a page was requested, fetch just that page
+		if 'limit' in req['data']:
+			dPage = self._paged(req['data'], fFetch, 'end')
+			lWorks = dPage['records']
+
+		# Else, fetch everything
+		else:
+			dPage = None
+			lWorks = fFetch()
 
 		# Go through each record and calculate the elpased seconds
 		for d in lWorks:
 			d['elapsed'] = d['end'] - d['start']
 
-		# Return the records
-		return Services.Response(lWorks)
\ No newline at end of file
+		# If the compact format was requested, encode the records, keeping
+		#	the details of the page
+		if bCompact:
+			lWorks = self._compact(
+				lWorks,
+				['client', 'project', 'task', 'user'],
+				['start', 'end', 'elapsed', 'description']
+			)
+			if dPage:
+				del dPage['records']
+				lWorks.update(dPage)
+				dPage = None
+
+		# Store and return the page or the records
+		return Services.Response(ResultCache.set(sKey, dPage or lWorks, dCustom))
\ No newline at end of file
@@ -0,0 +1,181 @@
+# coding=utf8
+""" Billing
+
+Calculates invoices from columns of work data. Each column is a plain list and
+the work is reduced to a single total per task in one pass, after which all
+the rounding is done with integers and Decimal is only used once per project
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from decimal import Decimal, ROUND_UP
+
+# Defines
+_CENTS = Decimal('1.00')
+_SIXTY = Decimal(60)
+_HUNDRED = Decimal('100')
+_ZERO = Decimal('0.00')
+
+def columns(rows):
+	"""Columns
+
+	Converts a list of work records, with at least project, task, start, and
+	end, into columns
+
+	Arguments:
+		rows (dict[]): The work records
+
+	Returns:
+		dict
+	"""
+	return {
+		'project': [d['project'] for d in rows],
+		'task': [d['task'] for d in rows],
+		'start': [d['start'] for d in rows],
+		'end': [d['end'] for d in rows]
+	}
+
+def invoice(works, client, taxes, additional):
+	"""Invoice
+
+	Calculates the minutes and amount of each project, the subtotal, taxes,
+	and total of an invoice
+
+	Arguments:
+		works (dict): The columns of work, see columns()
+		client (dict): The client, with rate, task_minimum, task_overflow, and
+			taxes
+		taxes (list): The company taxes, each with name and percentage
+		additional (list): Additional lines, each with type and amount
+
+	Returns:
+		dict
+	"""
+
+	# Get the minutes per project
+	lItems = projects(works, client['task_minimum'], client['task_overflow'])
+
+	# Calculate the amount of each project and the subtotal
+	deRate = Decimal(client['rate'])
+	deSubTotal = _ZERO
+	for d in lItems:
+		d['price'] = _ZERO
+		d['amount'] = (deRate * (Decimal(d['minutes']) / _SIXTY)).quantize(
+			_CENTS, rounding=ROUND_UP
+		)
+		deSubTotal += d['amount']
+
+	# Add or subtract each additional line
+	for d in additional:
+		if d['type'] == 'cost':
+			deSubTotal += Decimal(d['amount'])
+		else:
+			deSubTotal -= Decimal(d['amount'])
+
+	# Init the taxes and total
+	deTotal = Decimal(deSubTotal)
+	lTaxes = []
+
+	# If we collect taxes for this client
+	if client['taxes']:
+
+		# Go through each tax and add it to the total
+		for d in taxes:
+			deAmount = (
+				deSubTotal * (Decimal(d['percentage']) / _HUNDRED)
+			).quantize(_CENTS)
+			lTaxes.append({
+				'name': d['name'],
+				'amount': deAmount
+			})
+			deTotal += deAmount
+
+	# Return the results
+	return {
+		'subtotal': deSubTotal,
+		'taxes': lTaxes,
+		'total': deTotal,
+		'additional': additional,
+		'items': lItems
+	}
+
+def minutes(elapsed, task_minimum, task_overflow):
+	"""Minutes
+
+	Returns the billable minutes for the total seconds of a task
+
+	Arguments:
+		elapsed (int): The total seconds worked on the task
+		task_minimum (uint): The minutes in each block billed
+		task_overflow (uint): The minutes over a block allowed before another
+			block is billed, 0 to always bill partial blocks
+
+	Returns:
+		int
+	"""
+
+	# Round to the nearest minute, anything over 15 seconds rounds up
+	iMinutes, iRemainder = divmod(elapsed, 60)
+	if iRemainder > 15:
+		iMinutes += 1
+
+	# If the task minimum is 1, return the minutes as is
+	if task_minimum == 1:
+		return iMinutes
+
+	# Figure out the total blocks, adding one if the remainder is greater than
+	#	the overflow
+	iBlocks, iRemainder = divmod(iMinutes, task_minimum)
+	if task_overflow == 0 or iRemainder > task_overflow:
+		iBlocks += 1
+
+	# Return the minutes of the blocks
+	return task_minimum * iBlocks
+
+def projects(works, task_minimum, task_overflow):
+	"""Projects
+
+	Returns the billable minutes for each project, in the order the projects
+	were first seen
+
+	Arguments:
+		works (dict): The columns of work, see columns()
+		task_minimum (uint): The minutes in each block billed
+		task_overflow (uint): The minutes over a block allowed before another
+			block is billed
+
+	Returns:
+		dict[]
+	"""
+
+	# Sum the seconds per task, and keep the project of the first record of
+	#	each task
+	dElapsed = {}
+	dProject = {}
+	for sTask, sProject, iStart, iEnd in zip(
+		works['task'], works['project'], works['start'], works['end']
+	):
+		try:
+			dElapsed[sTask] += iEnd - iStart
+		except KeyError:
+			dElapsed[sTask] = iEnd - iStart
+			dProject[sTask] = sProject
+
+	# Round each task and add it to its project
+	dMinutes = {}
+	for sTask, iElapsed in dElapsed.items():
+		iMinutes = minutes(iElapsed, task_minimum, task_overflow)
+		sProject = dProject[sTask]
+		try:
+			dMinutes[sProject] += iMinutes
+		except KeyError:
+			dMinutes[sProject] = iMinutes
+
+	# Return the projects
+	return [{'_id': k, 'minutes': v} for k, v in dMinutes.items()]
@@ -0,0 +1,121 @@
+# coding=utf8
+""" Compress
+
+Compresses response bodies with gzip, or brotli if it's installed, either all
+at once or chunk by chunk for responses that are streamed. Each chunk is
+flushed so the client can start decoding before the response is finished
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import zlib
+
+# Brotli is optional
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+ENCODINGS = brotli and ['br', 'gzip'] or ['gzip']
+"""The encodings available, in order of preference"""
+
+def compress(data, encoding, level):
+	"""Compress
+
+	Compresses the entire data at once
+
+	Arguments:
+		data (bytes): The data to compress
+		encoding (str): 'br' or 'gzip'
+		level (uint): The level, 1 to 9 for gzip, 0 to 11 for brotli
+
+	Returns:
+		bytes
+	"""
+	if encoding == 'br':
+		return brotli.compress(data, quality=level)
+	oZ = zlib.compressobj(level, zlib.DEFLATED, 31)
+	return oZ.compress(data) + oZ.flush()
+
+def negotiate(accept, encodings=None):
+	"""Negotiate
+
+	Returns the encoding to use based on the Accept-Encoding header sent by
+	the client, or None if it doesn't accept any available
+
+	Arguments:
+		accept (str): The value of the Accept-Encoding header
+		encodings (str[]): Optional, the encodings allowed, in order of
+			preference, defaults to all available
+
+	Returns:
+		str|None
+	"""
+
+	# Get the weight of each encoding accepted
+	dAccept = {}
+	for sPart in (accept or '').lower().split(','):
+		lPart = sPart.strip().split(';')
+		fQ = 1.0
+		for s in lPart[1:]:
+			s = s.strip()
+			if s.startswith('q='):
+				try: fQ = float(s[2:])
+				except ValueError: fQ = 0.0
+		dAccept[lPart[0].strip()] = fQ
+
+	# Find the best one we have, in our order of preference
+	sRet = None
+	fBest = 0.0
+	for s in (encodings or ENCODINGS):
+		if s not in ENCODINGS:
+			continue
+		fQ = dAccept.get(s, dAccept.get('*', 0.0))
+		if fQ > fBest:
+			sRet = s
+			fBest = fQ
+
+	# Return the encoding, if any
+	return sRet
+
+def stream(chunks, encoding, level):
+	"""Stream
+
+	Compresses each chunk as it's generated, flushing after each one so that
+	the client gets everything sent so far
+
+	Arguments:
+		chunks (iterable): The chunks of bytes or strings to compress
+		encoding (str): 'br' or 'gzip'
+		level (uint): The level, 1 to 9 for gzip, 0 to 11 for brotli
+
+	Returns:
+		generator
+	"""
+
+	# Create the compressor
+	if encoding == 'br':
+		oC = brotli.Compressor(quality=level)
+		fCompress = oC.process
+		fFlush = oC.flush
+		fFinish = oC.finish
+	else:
+		oC = zlib.compressobj(level, zlib.DEFLATED, 31)
+		fCompress = oC.compress
+		fFlush = lambda: oC.flush(zlib.Z_SYNC_FLUSH)
+		fFinish = oC.flush
+
+	# Compress and flush each chunk
+	for m in chunks:
+		if isinstance(m, str):
+			m = m.encode('utf-8')
+		yield fCompress(m) + fFlush()
+
+	# Send the end of the stream
+	yield fFinish()
@@ -0,0 +1,59 @@
+# coding=utf8
+""" Headers
+
+Extra headers services want sent with the response to the current request.
+They're kept per thread and added to the response by the REST node once the
+request has been handled
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import threading
+
+__local = threading.local()
+"""The headers of the current thread"""
+
+def clear():
+	"""Clear
+
+	Removes any headers set, called before each request
+
+	Returns:
+		None
+	"""
+	__local.headers = {}
+
+def pop():
+	"""Pop
+
+	Returns the headers set for the current request and clears them
+
+	Returns:
+		dict
+	"""
+	dRet = getattr(__local, 'headers', None) or {}
+	__local.headers = {}
+	return dRet
+
+def set(name, value):
+	"""Set
+
+	Sets a header to send with the response to the current request
+
+	Arguments:
+		name (str): The name of the header
+		value (str): The value of the header
+
+	Returns:
+		None
+	"""
+	try:
+		__local.headers[name] = value
+	except AttributeError:
+		__local.headers = {name: value}
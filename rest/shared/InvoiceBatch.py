@@ -0,0 +1,335 @@
+# coding=utf8
+""" Invoice Batch
+
+Generates the invoices of many clients for the same period in one run. All the
+work is fetched with a single query, the invoices are calculated in a pool of
+processes, everything is inserted in one transaction, and the PDFs are added to
+the queue so that the workers can render them in parallel
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from time import time
+
+# Pip imports
+import body
+from RestOC import Conf, JSON, StrHelper
+from RestOC.Record_MySQL import DuplicateException
+
+# Record imports
+from records import Client, ClientBalance, Company, Invoice, InvoiceItem, Work, transaction
+
+# Shared imports
+from shared import Billing, Jobs, Versions
+
+# Defines
+_IDENTIFIER = 'ABCDEFGHJKLMNPQRSTUVWXYZ123456789'
+_PDF_QUEUE = 'invoice_pdf'
+_RETRIES = 5
+
+CREATED = 'created'
+"""Status of a client whose invoice was created"""
+
+EMPTY = 'empty'
+"""Status of a client with no work in the period"""
+
+EXISTS = 'exists'
+"""Status of a client that already has an invoice for the period"""
+
+FAILED = 'failed'
+"""Status of a client whose invoice could not be created"""
+
+def _columns(works):
+	"""Columns
+
+	Splits the work of all clients into columns per client, see Billing.columns
+
+	Arguments:
+		works (dict[]): The work records, each with client, project, task,
+			start, and end
+
+	Returns:
+		dict
+	"""
+
+	# Go through each record and add it to the columns of its client
+	dRet = {}
+	for d in works:
+		try:
+			dColumns = dRet[d['client']]
+		except KeyError:
+			dColumns = dRet[d['client']] = {
+				'project': [], 'task': [], 'start': [], 'end': []
+			}
+		dColumns['project'].append(d['project'])
+		dColumns['task'].append(d['task'])
+		dColumns['start'].append(d['start'])
+		dColumns['end'].append(d['end'])
+
+	# Return the columns
+	return dRet
+
+def _calculate(columns, clients, taxes, workers):
+	"""Calculate
+
+	Runs Billing.invoice for each client, in a pool of processes if there's
+	more than one client and more than one worker
+
+	Arguments:
+		columns (dict[]): The columns of work of each client
+		clients (dict[]): The clients, in the same order as the columns
+		taxes (list): The company taxes
+		workers (uint): The maximum number of processes to use
+
+	Returns:
+		dict[]
+	"""
+
+	# If there's no point in starting processes, calculate in this one
+	if workers < 2 or len(clients) < 2:
+		return [
+			Billing.invoice(columns[i], clients[i], taxes, []) \
+			for i in range(len(clients))
+		]
+
+	# Fork the processes, the calculations need nothing more than what's passed
+	#	to them, and spread the clients over them
+	with ProcessPoolExecutor(
+		max_workers=min(workers, len(clients)),
+		mp_context=multiprocessing.get_context('fork')
+	) as oPool:
+		return list(oPool.map(
+			Billing.invoice,
+			columns,
+			clients,
+			[taxes] * len(clients),
+			[[]] * len(clients),
+			chunksize=max(1, len(clients) // (workers * 4))
+		))
+
+def _identifiers(count):
+	"""Identifiers
+
+	Returns the requested number of random invoice identifiers, none of which
+	are the same
+
+	Arguments:
+		count (uint): The number of identifiers
+
+	Returns:
+		str[]
+	"""
+	lRet = set()
+	while len(lRet) < count:
+		lRet.add(StrHelper.random(6, _IDENTIFIER, False))
+	return list(lRet)
+
+def report(start, end, results):
+	"""Report
+
+	Writes the results of a run to a JSON file in the reports directory and
+	returns the path to the file
+
+	Arguments:
+		start (uint): The start of the period
+		end (uint): The end of the period
+		results (dict): The results returned by run
+
+	Returns:
+		str
+	"""
+
+	# Generate the name of the file
+	sDir = Conf.get(('invoice_batch', 'reports'), '/tmp')
+	sFile = os.path.join(sDir, 'invoice_batch_%d_%d_%d.json' % (
+		start, end, int(time())
+	))
+
+	# Write the results to it
+	with open(sFile, 'w') as oF:
+		JSON.encodef(results, oF, 2)
+
+	# Return the path
+	return sFile
+
+def run(start, end, clients=None, workers=None):
+	"""Run
+
+	Generates the invoices of the period for each client and returns the
+	result of each one
+
+	Arguments:
+		start (uint): The minimum time the work can end in
+		end (uint): The maximum time the work can end in
+		clients (str[]): Optional, the IDs of the clients, defaults to all the
+			clients not archived
+		workers (uint): Optional, the maximum number of processes used to
+			calculate, defaults to the number of CPUs
+
+	Returns:
+		dict
+	"""
+
+	# Get the number of workers
+	if workers is None:
+		workers = Conf.get(('invoice_batch', 'workers'), os.cpu_count() or 1)
+
+	# Fetch the clients
+	if clients:
+		lClients = Client.get(clients, raw=True)
+	else:
+		lClients = Client.get(filter={'_archived': False}, raw=True)
+
+	# Init the results of each client
+	dResults = {d['_id']: {
+		'name': d['name'],
+		'status': None
+	} for d in lClients}
+
+	# Note any of the requested clients that don't exist
+	if clients:
+		for s in clients:
+			if s not in dResults:
+				dResults[s] = {
+					'name': None,
+					'status': FAILED,
+					'error': 'client not found'
+				}
+
+	# Skip any client that already has an invoice for the same period, so
+	#	that running the same period twice doesn't bill anyone twice
+	if lClients:
+		for d in Invoice.filter({
+			'client': [d['_id'] for d in lClients],
+			'start': start,
+			'end': end
+		}, raw=['_id', 'client', 'identifier']):
+			dResults[d['client']]['status'] = EXISTS
+			dResults[d['client']]['invoice'] = d['_id']
+			dResults[d['client']]['identifier'] = d['identifier']
+
+	# Fetch all the work for the remaining clients at once, and split it by
+	#	client
+	lClients = [d for d in lClients if dResults[d['_id']]['status'] is None]
+	dColumns = _columns(Work.for_invoices(
+		start, end, [d['_id'] for d in lClients]
+	))
+
+	# Skip any client with no work
+	for d in lClients:
+		if d['_id'] not in dColumns:
+			dResults[d['_id']]['status'] = EMPTY
+	lClients = [d for d in lClients if d['_id'] in dColumns]
+
+	# Calculate the invoices
+	lInvoices = _calculate(
+		[dColumns[d['_id']] for d in lClients],
+		lClients,
+		Company.cache_get()['taxes'],
+		workers
+	)
+
+	# Create the records of each invoice and its items, any client with
+	#	invalid data is marked as failed and left out
+	lIdentifiers = _identifiers(len(lInvoices))
+	lRecords = []
+	for i, dInvoice in enumerate(lInvoices):
+		sClient = lClients[i]['_id']
+		try:
+			oInvoice = Invoice({
+				'client': sClient,
+				'identifier': lIdentifiers[i],
+				'start': start,
+				'end': end,
+				'subtotal': dInvoice['subtotal'],
+				'taxes': dInvoice['taxes'],
+				'total': dInvoice['total']
+			})
+			lItems = [InvoiceItem({
+				'invoice': body.constants.EMPTY_UUID,
+				'project': d['_id'],
+				'minutes': d['minutes'],
+				'amount': d['amount']
+			}) for d in dInvoice['items']]
+		except ValueError as e:
+			dResults[sClient]['status'] = FAILED
+			dResults[sClient]['error'] = e.args[0]
+			continue
+		lRecords.append([sClient, oInvoice, lItems])
+
+	# If we have anything to create
+	if lRecords:
+
+		# Write all the invoices and items, all or nothing
+		try:
+			with transaction(Invoice.struct()['host']):
+
+				# Create the invoices, trying new identifiers if any of them are
+				#	already used
+				iTry = 0
+				while True:
+					try:
+						lIDs = Invoice.create_bulk([l[1] for l in lRecords])
+						break
+					except DuplicateException:
+						iTry += 1
+						if iTry == _RETRIES:
+							raise
+						for o, s in zip(
+							[l[1] for l in lRecords],
+							_identifiers(len(lRecords))
+						):
+							o['identifier'] = s
+
+				# Set the invoice ID on the items and create them all
+				lItems = []
+				for i, l in enumerate(lRecords):
+					for o in l[2]:
+						o['invoice'] = lIDs[i]
+					lItems.extend(l[2])
+				InvoiceItem.create_bulk(lItems)
+
+				# Add the invoices to the clients' balances
+				ClientBalance.add('invoice', lIDs)
+
+		# If anything failed, none of the invoices were created
+		except Exception as e:
+			for l in lRecords:
+				dResults[l[0]]['status'] = FAILED
+				dResults[l[0]]['error'] = str(e.args)
+			lRecords = []
+
+		# Mark each client as created and add the PDF of each invoice to the
+		#	queue
+		for i, l in enumerate(lRecords):
+			dResults[l[0]]['status'] = CREATED
+			dResults[l[0]]['invoice'] = lIDs[i]
+			dResults[l[0]]['identifier'] = l[1]['identifier']
+			dResults[l[0]]['total'] = l[1]['total']
+			Jobs.push(_PDF_QUEUE, lIDs[i])
+
+		# Mark the clients' data as changed
+		if lRecords:
+			Versions.bump([l[0] for l in lRecords])
+
+	# Count each status
+	dCounts = {s: 0 for s in [CREATED, EMPTY, EXISTS, FAILED]}
+	for d in dResults.values():
+		dCounts[d['status']] += 1
+
+	# Return the results
+	return {
+		'start': start,
+		'end': end,
+		'counts': dCounts,
+		'clients': dResults
+	}
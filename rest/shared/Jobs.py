@@ -0,0 +1,197 @@
+# coding=utf8
+""" Jobs
+
+Simple job queues stored in Redis lists. Jobs are moved to a processing list
+while being worked on so that they can be recovered if the worker dies, and the
+status of each job is kept until it succeeds. Several workers can share a queue
+as long as each one uses its own name, and so its own processing list
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Pip imports
+from RestOC import JSON
+
+PENDING = 'pending'
+"""Status of a job waiting to be, or being, worked on"""
+
+FAILED = 'failed'
+"""Status of a job that could not be completed"""
+
+__redis = None
+"""The Redis instance"""
+
+def _keys(queue, worker=None):
+	"""Keys
+
+	Returns the names of the queue, processing, and status keys
+
+	Arguments:
+		queue (str): The name of the queue
+		worker (str): Optional, the name of the worker
+
+	Returns:
+		tuple
+	"""
+	return (
+		'jobs:%s' % queue,
+		worker is None and \
+			'jobs:%s:processing' % queue or \
+			'jobs:%s:processing:%s' % (queue, worker),
+		'jobs:%s:status' % queue
+	)
+
+def done(queue, job, error=None):
+	"""Done
+
+	Marks a job returned by pop as finished, successfully if no error is passed
+
+	Arguments:
+		queue (str): The name of the queue
+		job (dict): The job returned by pop
+		error (str): Optional, the reason the job failed
+
+	Returns:
+		None
+	"""
+
+	# Get the keys
+	sQueue, sProcessing, sStatus = _keys(queue, job['worker'])
+
+	# Remove the job from processing and set or clear the status
+	oPipe = __redis.pipeline()
+	oPipe.lrem(sProcessing, 1, job['raw'])
+	if error:
+		oPipe.hset(sStatus, job['_id'], JSON.encode({
+			'status': FAILED,
+			'error': error
+		}))
+	else:
+		oPipe.hdel(sStatus, job['_id'])
+	oPipe.execute()
+
+def init(redis):
+	"""Init
+
+	Stores the Redis instance used for all queues
+
+	Arguments:
+		redis (StrictRedis): A Redis instance
+
+	Returns:
+		None
+	"""
+	global __redis
+	__redis = redis
+
+def pop(queue, timeout=5, worker=None):
+	"""Pop
+
+	Waits for the next job in the queue and moves it to processing. The job
+	must be passed to done once it's finished
+
+	Arguments:
+		queue (str): The name of the queue
+		timeout (uint): The seconds to wait for a job
+		worker (str): Optional, the name of the worker, required if more than
+			one worker pops from the queue
+
+	Returns:
+		dict|None
+	"""
+
+	# Get the keys
+	sQueue, sProcessing, sStatus = _keys(queue, worker)
+
+	# Wait for a job
+	sJob = __redis.brpoplpush(sQueue, sProcessing, timeout)
+
+	# If we got nothing
+	if sJob is None:
+		return None
+
+	# Decode it and keep the raw value and the worker so it can be removed
+	#	from processing
+	dJob = JSON.decode(sJob)
+	dJob['raw'] = sJob
+	dJob['worker'] = worker
+
+	# Return the job
+	return dJob
+
+def push(queue, _id, data=None):
+	"""Push
+
+	Adds a job to the end of the queue and marks it as pending
+
+	Arguments:
+		queue (str): The name of the queue
+		_id (str): The unique ID of the job
+		data (dict): Optional, any additional data needed by the worker
+
+	Returns:
+		None
+	"""
+
+	# Get the keys
+	sQueue, sProcessing, sStatus = _keys(queue)
+
+	# Set the status and add the job
+	oPipe = __redis.pipeline()
+	oPipe.hset(sStatus, _id, JSON.encode({'status': PENDING}))
+	oPipe.lpush(sQueue, JSON.encode({'_id': _id, 'data': data}))
+	oPipe.execute()
+
+def recover(queue, worker=None):
+	"""Recover
+
+	Moves any jobs left in processing, by a worker that stopped before it
+	finished, back into the queue. Must only be called by the worker itself
+	before it starts, or when no other worker with the same name is running
+
+	Arguments:
+		queue (str): The name of the queue
+		worker (str): Optional, the name of the worker
+
+	Returns:
+		uint
+	"""
+
+	# Get the keys
+	sQueue, sProcessing, sStatus = _keys(queue, worker)
+
+	# Move each job back to the queue
+	iCount = 0
+	while __redis.rpoplpush(sProcessing, sQueue) is not None:
+		iCount += 1
+
+	# Return the count
+	return iCount
+
+def status(queue, _id):
+	"""Status
+
+	Returns the status of a job, or None if the job is unknown or finished
+	successfully
+
+	Arguments:
+		queue (str): The name of the queue
+		_id (str): The unique ID of the job
+
+	Returns:
+		dict|None
+	"""
+
+	# Get the keys
+	sQueue, sProcessing, sStatus = _keys(queue)
+
+	# Fetch the status
+	sRet = __redis.hget(sStatus, _id)
+
+	# Return it decoded, or None
+	return sRet and JSON.decode(sRet) or None
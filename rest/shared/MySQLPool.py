@@ -0,0 +1,564 @@
+# coding=utf8
+""" MySQL Pool
+
+Replaces the single connection per host kept by Record_MySQL with a bounded
+pool of connections per host. Each thread checks out its own connection the
+first time it needs one and keeps it until release is called, so transactions
+and insert IDs work exactly as before. Connections are checked before they
+are handed out and replaced once they get too old, and the time spent waiting
+for one is recorded. A connection lost in the middle of a transaction is never
+replaced, so that statements aren't retried outside of it. Streamed selects,
+records.stream, get their connections from a second, smaller pool per host,
+so that the number of them open at once is limited as well
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import threading
+from time import sleep, time
+
+# Pip imports
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from RestOC import Record_MySQL
+
+# Record imports
+import records
+
+__pools = {}
+"""The pool of each host"""
+
+__streams = {}
+"""The pool of streamed selects of each host"""
+
+__streaming = {}
+"""The connections of the streams in progress, by their ID"""
+
+__pid = None
+"""The process the pools were created in"""
+
+__lock = threading.Lock()
+"""Lock used to create the pools"""
+
+__local = threading.local()
+"""The connections checked out by the current thread"""
+
+__conf = {
+	'size': 5,
+	'streams': 2,
+	'timeout': 10,
+	'recycle': 3600,
+	'ping': 30
+}
+"""The size of each pool, the size of each pool of streams, the seconds to
+wait for a connection, the seconds before a connection is replaced, and the
+seconds idle before one is pinged"""
+
+class Pool(object):
+	"""Pool
+
+	The connections of a single host
+	"""
+
+	def __init__(self, host, conf):
+		"""Constructor (__init__)
+
+		Initialises the pool
+
+		Arguments:
+			host (str): The name of the host
+			conf (dict): The size, timeout, recycle, and ping values
+
+		Returns:
+			Pool
+		"""
+
+		# Store the host and the config
+		self.host = host
+		self.size = conf['size']
+		self.timeout = conf['timeout']
+		self.recycle = conf['recycle']
+		self.ping = conf['ping']
+
+		# Init the idle connections, the count of all connections, and the
+		#	condition used to wait for one
+		self.idle = []
+		self.count = 0
+		self.condition = threading.Condition()
+
+		# Init the stats
+		self.stats = {
+			'checkouts': 0,
+			'waits': 0,
+			'wait_time': 0.0,
+			'wait_max': 0.0,
+			'timeouts': 0,
+			'created': 0,
+			'recycled': 0,
+			'failed_checks': 0
+		}
+
+	def _connect(self, errcnt=0):
+		"""Connect
+
+		Creates a new connection the same way Record_MySQL does
+
+		Arguments:
+			errcnt (uint): The current error count
+
+		Raises:
+			ConnectionError
+
+		Returns:
+			list
+		"""
+
+		# Create the connection
+		try:
+			oCon = pymysql.connect(**Record_MySQL.__dict__['__mdHosts'][self.host])
+
+		# If it failed, try again a couple of times
+		except pymysql.err.OperationalError as e:
+			errcnt += 1
+			if errcnt == Record_MySQL.MAX_RETRIES:
+				raise ConnectionError(*e.args)
+			sleep(1)
+			return self._connect(errcnt)
+
+		# Turn autocommit on
+		oCon.autocommit(True)
+
+		# Change conversions
+		conv = oCon.decoders.copy()
+		for k in conv:
+			if k in [7]: conv[k] = Record_MySQL._converter_timestamp
+			elif k in [10,11,12]: conv[k] = str
+		oCon.decoders = conv
+
+		# Count it and return it with the time it was created and last used
+		self.stats['created'] += 1
+		return [oCon, time(), time()]
+
+	def _usable(self, con, recycle=True):
+		"""Usable
+
+		Returns true if the connection can be used, pinging it if it hasn't
+		been used in a while
+
+		Arguments:
+			con (list): The connection, created, and last used times
+			recycle (bool): Optional, false to keep the connection even if it's
+				old, for connections that might be in a transaction
+
+		Returns:
+			bool
+		"""
+
+		# If it's closed, it has to be replaced
+		if not con[0].open:
+			self.stats['failed_checks'] += 1
+			return False
+
+		# If it's too old, it has to be replaced
+		if recycle and time() - con[1] > self.recycle:
+			self.stats['recycled'] += 1
+			return False
+
+		# If it hasn't been used in a while, make sure the server is still
+		#	there
+		if time() - con[2] > self.ping:
+			try:
+				con[0].ping(reconnect=False)
+			except Exception:
+				self.stats['failed_checks'] += 1
+				return False
+
+		# It's usable
+		return True
+
+	def checkin(self, con):
+		"""Check In
+
+		Puts a connection back in the pool
+
+		Arguments:
+			con (list): The connection, created, and last used times
+
+		Returns:
+			None
+		"""
+		con[2] = time()
+		with self.condition:
+			self.idle.append(con)
+			self.condition.notify()
+
+	def checkout(self):
+		"""Check Out
+
+		Returns a usable connection from the pool, creating one if there's
+		room, or waiting for one to be checked in if there isn't
+
+		Raises:
+			ConnectionError
+
+		Returns:
+			list
+		"""
+
+		# Note the start
+		fStart = time()
+		bWaited = False
+
+		# Loop until we have a connection
+		while True:
+
+			with self.condition:
+
+				# If there's an idle connection, take the last one used
+				if self.idle:
+					lCon = self.idle.pop()
+
+				# Else, if there's room for another one, reserve it
+				elif self.count < self.size:
+					self.count += 1
+					lCon = None
+
+				# Else, wait for one to be checked in
+				else:
+					bWaited = True
+					fLeft = self.timeout - (time() - fStart)
+					if fLeft <= 0 or not self.condition.wait(fLeft):
+						self.stats['timeouts'] += 1
+						raise ConnectionError(
+							'pool', 'no %s connection available after %ds' % (
+								self.host, self.timeout
+							)
+						)
+					continue
+
+			# If we reserved a new one, create it, giving the room back if it
+			#	fails
+			if lCon is None:
+				try:
+					lCon = self._connect()
+				except Exception:
+					self.discard(None)
+					raise
+
+			# Else, if the idle one can't be used, close it and try again
+			elif not self._usable(lCon):
+				self.discard(lCon)
+				continue
+
+			# Record the stats and return the connection
+			fWait = time() - fStart
+			with self.condition:
+				self.stats['checkouts'] += 1
+				if bWaited:
+					self.stats['waits'] += 1
+					self.stats['wait_time'] += fWait
+					if fWait > self.stats['wait_max']:
+						self.stats['wait_max'] = fWait
+			return lCon
+
+	def discard(self, con):
+		"""Discard
+
+		Closes a connection and frees its place in the pool
+
+		Arguments:
+			con (list): The connection, created, and last used times, or None
+				if the connection was never created
+
+		Returns:
+			None
+		"""
+
+		# Close the connection, ignoring any errors as it's likely already
+		#	dead
+		if con:
+			try:
+				con[0].close()
+			except Exception:
+				pass
+
+		# Free its place
+		with self.condition:
+			self.count -= 1
+			self.condition.notify()
+
+def _in_transaction(con):
+	"""In Transaction
+
+	Returns true if the server said the connection was in a transaction the
+	last time it answered
+
+	Arguments:
+		con (list): The connection, created, and last used times
+
+	Returns:
+		bool
+	"""
+	return bool(con[0].server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+def _checked_out():
+	"""Checked Out
+
+	Returns the connections checked out by the current thread, by host,
+	resetting everything if the process was forked since the pools were
+	created
+
+	Returns:
+		dict
+	"""
+
+	global __pid, __pools, __local, __streaming, __streams
+
+	# If we're in a new process, the connections of the parent can't be
+	#	shared, so start over without closing them
+	if __pid != os.getpid():
+		with __lock:
+			if __pid != os.getpid():
+				__pools = {}
+				__streams = {}
+				__streaming = {}
+				__local = threading.local()
+				__pid = os.getpid()
+
+	# Return the thread's connections
+	try:
+		return __local.connections
+	except AttributeError:
+		__local.connections = {}
+		return __local.connections
+
+def _clear_connection(host):
+	"""Clear Connection
+
+	Replaces Record_MySQL._clear_connection, closes the thread's connection to
+	the host so that the next call gets a new one. If the connection was in a
+	transaction, it's closed, but an exception is raised so that the statement
+	isn't retried on a new connection, outside of the transaction
+
+	Arguments:
+		host (str): The host to clear
+
+	Raises:
+		ConnectionError
+
+	Returns:
+		None
+	"""
+
+	# If the thread has a connection to the host, discard it
+	dConnections = _checked_out()
+	if host in dConnections:
+		lCon = dConnections.pop(host)
+		__pools[host].discard(lCon)
+
+		# If it was in a transaction, stop the retry
+		if _in_transaction(lCon):
+			raise ConnectionError(
+				'transaction', 'connection to %s lost during a transaction' % host
+			)
+
+def _connection(host, errcnt=0):
+	"""Connection
+
+	Replaces Record_MySQL._connection, returns the thread's connection to the
+	host, checking one out of the pool if it doesn't have one
+
+	Arguments:
+		host (str): The name of the host to connect to
+		errcnt (uint): Unused, kept for compatibility
+
+	Raises:
+		ConnectionError
+		ValueError
+
+	Returns:
+		pymysql.Connection
+	"""
+
+	# Get the thread's connections
+	dConnections = _checked_out()
+
+	# If it already has one
+	if host in dConnections:
+
+		# If it's still usable, mark it as used and return it. It's never
+		#	recycled here as it could be in the middle of a transaction
+		lCon = dConnections[host]
+		if __pools[host]._usable(lCon, False):
+			lCon[2] = time()
+			return lCon[0]
+
+		# Else, get rid of it, and if it was in a transaction, fail instead of
+		#	continuing on a new connection
+		__pools[host].discard(dConnections.pop(host))
+		if _in_transaction(lCon):
+			raise ConnectionError(
+				'transaction', 'connection to %s lost during a transaction' % host
+			)
+
+	# If no such host has been added
+	if host not in Record_MySQL.__dict__['__mdHosts']:
+		raise ValueError('no such host "%s"' % str(host))
+
+	# Get or create the pool
+	try:
+		oPool = __pools[host]
+	except KeyError:
+		with __lock:
+			if host not in __pools:
+				__pools[host] = Pool(host, __conf)
+			oPool = __pools[host]
+
+	# Check out a connection, store it, and return it
+	lCon = oPool.checkout()
+	dConnections[host] = lCon
+	return lCon[0]
+
+def init(conf={}):
+	"""Init
+
+	Sets the pool config and replaces the connection handling of Record_MySQL
+	and of the streamed selects of records with the pools
+
+	Arguments:
+		conf (dict): Optional, any of size, streams, timeout, recycle, and
+			ping
+
+	Returns:
+		None
+	"""
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
+
+	# Replace the module functions
+	Record_MySQL._connection = _connection
+	Record_MySQL._clear_connection = _clear_connection
+	records.stream_checkin = stream_checkin
+	records.stream_checkout = stream_checkout
+
+def release():
+	"""Release
+
+	Returns every connection checked out by the current thread to their pools.
+	Meant to be called at the end of each request, and by any thread when it's
+	done with the DB
+
+	Returns:
+		None
+	"""
+
+	# Get the thread's connections
+	dConnections = _checked_out()
+
+	# Check each one back in
+	for sHost in list(dConnections.keys()):
+		__pools[sHost].checkin(dConnections.pop(sHost))
+
+def stats():
+	"""Stats
+
+	Returns the size, connections in use and idle, and the counters of each
+	pool by host
+
+	Returns:
+		dict
+	"""
+
+	# Go through each pool, and each pool of streams
+	dRet = {}
+	for sHost, oPool in list(__pools.items()) + [
+		['%s:stream' % k, v] for k, v in list(__streams.items())
+	]:
+		with oPool.condition:
+			dRet[sHost] = dict(oPool.stats,
+				size=oPool.size,
+				open=oPool.count,
+				idle=len(oPool.idle),
+				in_use=oPool.count - len(oPool.idle)
+			)
+		dRet[sHost]['wait_time'] = round(dRet[sHost]['wait_time'], 6)
+		dRet[sHost]['wait_max'] = round(dRet[sHost]['wait_max'], 6)
+
+	# Return the stats
+	return dRet
+
+def stream_checkin(host, con, usable):
+	"""Stream Checkin
+
+	Replaces records.stream_checkin, puts a connection returned by
+	stream_checkout back in the host's pool of streams, or closes it if it
+	can't be used again
+
+	Arguments:
+		host (str): The name of the host
+		con (pymysql.Connection): The connection
+		usable (bool): False if the connection can't be used again
+
+	Returns:
+		None
+	"""
+
+	# Find the connection
+	with __lock:
+		lCon = __streaming.pop(id(con))
+
+	# Give it back, or get rid of it
+	if usable:
+		__streams[host].checkin(lCon)
+	else:
+		__streams[host].discard(lCon)
+
+def stream_checkout(host):
+	"""Stream Checkout
+
+	Replaces records.stream_checkout, returns a connection from the host's
+	pool of streams, waiting for one if as many streams as the pool allows
+	are already in progress
+
+	Arguments:
+		host (str): The name of the host
+
+	Raises:
+		ConnectionError
+		ValueError
+
+	Returns:
+		pymysql.Connection
+	"""
+
+	# Make sure the pools are of this process
+	_checked_out()
+
+	# If no such host has been added
+	if host not in Record_MySQL.__dict__['__mdHosts']:
+		raise ValueError('no such host "%s"' % str(host))
+
+	# Get or create the pool
+	try:
+		oPool = __streams[host]
+	except KeyError:
+		with __lock:
+			if host not in __streams:
+				__streams[host] = Pool(host, dict(__conf, size=__conf['streams']))
+			oPool = __streams[host]
+
+	# Check out a connection, note it, and return it
+	lCon = oPool.checkout()
+	with __lock:
+		__streaming[id(lCon[0])] = lCon
+	return lCon[0]
@@ -0,0 +1,181 @@
+# coding=utf8
+""" PDF
+
+Client of the PDF renderer node, nodes.pdf.renderer, which keeps wkhtmltopdf
+processes running so that each PDF doesn't pay for starting one. Requests are
+sent over a unix socket as length prefixed frames, the HTML in, and a status
+followed by the PDF out. If the renderer can't be connected to the PDF is
+generated by starting wkhtmltopdf as before, unless the fallback is turned off
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import socket
+import struct
+import sys
+
+# Pip imports
+import pdfkit
+from RestOC import JSON
+
+_FRAME = struct.Struct('>I')
+"""The length sent before every frame"""
+
+__conf = {
+	'socket': '/tmp/tims_pdf.sock',
+	'timeout': 30,
+	'wait': 30,
+	'fallback': True
+}
+"""The socket the renderer listens on, the seconds a PDF can take, the seconds
+it can wait for a free renderer, and if PDFs are generated without the
+renderer when it can't be connected to"""
+
+class PDFException(Exception):
+	"""PDF Exception
+
+	Raised when the renderer fails to generate a PDF
+
+	Extends:
+		Exception
+	"""
+	pass
+
+def _recv(sock, length):
+	"""Receive
+
+	Reads exactly the given number of bytes from the socket
+
+	Arguments:
+		sock (socket.socket): The socket to read from
+		length (uint): The number of bytes
+
+	Raises:
+		ConnectionError
+
+	Returns:
+		bytes
+	"""
+	lParts = []
+	while length:
+		b = sock.recv(min(length, 1048576))
+		if not b:
+			raise ConnectionError('socket closed')
+		lParts.append(b)
+		length -= len(b)
+	return b''.join(lParts)
+
+def frame_read(sock):
+	"""Frame Read
+
+	Reads a single frame from the socket
+
+	Arguments:
+		sock (socket.socket): The socket to read from
+
+	Raises:
+		ConnectionError
+
+	Returns:
+		bytes
+	"""
+	return _recv(sock, _FRAME.unpack(_recv(sock, _FRAME.size))[0])
+
+def frame_write(sock, data):
+	"""Frame Write
+
+	Writes a single frame to the socket
+
+	Arguments:
+		sock (socket.socket): The socket to write to
+		data (bytes): The data of the frame
+
+	Returns:
+		None
+	"""
+	sock.sendall(_FRAME.pack(len(data)) + data)
+
+def generate(html, timeout=None):
+	"""Generate
+
+	Generates a PDF from HTML using the renderer, or wkhtmltopdf directly if
+	the renderer can't be reached and the fallback is on
+
+	Arguments:
+		html (str): The HTML to render
+		timeout (uint): Optional, the seconds the PDF can take, defaults to
+			the config
+
+	Raises:
+		PDFException
+
+	Returns:
+		bytes
+	"""
+
+	# Get the timeout
+	iTimeout = timeout or __conf['timeout']
+
+	# Connect to the renderer, giving the socket enough time for the job to
+	#	wait for a free renderer, render, and still be answered
+	oSock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	oSock.settimeout(__conf['wait'] + iTimeout + 5)
+	try:
+		oSock.connect(__conf['socket'])
+
+	# If the renderer can't be reached
+	except (ConnectionError, FileNotFoundError, socket.timeout) as e:
+		oSock.close()
+
+		# If there's no fallback, fail
+		if not __conf['fallback']:
+			raise PDFException('renderer unavailable', str(e.args))
+
+		# Generate it the slow way
+		print('PDF renderer unavailable, using wkhtmltopdf: %s' % str(e.args), file=sys.stderr)
+		return pdfkit.from_string(html, False)
+
+	# Send the HTML to the renderer and wait for the result. If it takes too
+	#	long, or the connection is lost, the renderer may still be working on
+	#	it, so fail instead of rendering it a second time
+	try:
+		with oSock:
+			frame_write(oSock, JSON.encode({
+				'html': html,
+				'timeout': iTimeout,
+				'wait': __conf['wait']
+			}).encode('utf-8'))
+			dStatus = JSON.decode(frame_read(oSock).decode('utf-8'))
+			bPDF = frame_read(oSock)
+	except (ConnectionError, socket.timeout) as e:
+		raise PDFException('renderer failed', str(e.args))
+
+	# If the renderer failed, pass along the reason
+	if dStatus['error']:
+		raise PDFException(dStatus['error'])
+
+	# Return the PDF
+	return bPDF
+
+def init(conf={}):
+	"""Init
+
+	Stores the config
+
+	Arguments:
+		conf (dict): Optional, any of socket, timeout, wait, and fallback
+
+	Returns:
+		None
+	"""
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
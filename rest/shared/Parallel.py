@@ -0,0 +1,146 @@
+# coding=utf8
+""" Parallel
+
+Runs independent record calls at the same time on a bounded pool of threads
+shared by the process, so that a handler waits for its slowest query instead
+of the sum of all of them. Each call checks out its own connection from
+MySQLPool and gives it back when done, so calls must not depend on each other
+or be part of a transaction
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+# Shared imports
+from shared import MySQLPool, QueryLog
+
+__executor = None
+"""The pool of threads"""
+
+__pid = None
+"""The process the pool was created in"""
+
+__lock = threading.Lock()
+"""Lock used to create the pool"""
+
+__local = threading.local()
+"""Marks the threads of the pool"""
+
+__conf = {
+	'workers': 4
+}
+"""The number of threads in the pool, which should be less than the size of
+the MySQLPool so that requests still get a connection"""
+
+def _call(endpoint, f):
+	"""Call
+
+	Runs a single call in one of the threads of the pool, recording its
+	statements for the endpoint of the request that made it, and giving its
+	connections back once done
+
+	Arguments:
+		endpoint (str): The endpoint of the request
+		f (callable): The call
+
+	Returns:
+		mixed
+	"""
+	__local.worker = True
+	QueryLog.request_start(endpoint)
+	try:
+		return f()
+	finally:
+		QueryLog.request_end()
+		MySQLPool.release()
+
+def _executor():
+	"""Executor
+
+	Returns the pool of threads of the current process, creating it on first
+	use, as the server forks its workers after the service is initialised and
+	threads don't survive a fork
+
+	Returns:
+		ThreadPoolExecutor
+	"""
+
+	global __executor, __pid
+
+	# If it's not from this process, create it
+	if __pid != os.getpid():
+		with __lock:
+			if __pid != os.getpid():
+				__executor = ThreadPoolExecutor(
+					max_workers=__conf['workers'],
+					thread_name_prefix='parallel'
+				)
+				__pid = os.getpid()
+
+	# Return the pool
+	return __executor
+
+def init(conf={}):
+	"""Init
+
+	Stores the config
+
+	Arguments:
+		conf (dict): Optional, workers
+
+	Returns:
+		None
+	"""
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
+
+def run(*calls):
+	"""Run
+
+	Runs the calls at the same time and returns their results in the same
+	order. If any raises an exception, the first one is raised once they have
+	all finished. A single call, or calls made from inside the pool, are run
+	one after the other in the current thread
+
+	Arguments:
+		*calls (callable): The calls to run, taking no arguments
+
+	Raises:
+		Exception
+
+	Returns:
+		list
+	"""
+
+	# If there's nothing to gain, or we're already in the pool and could wait
+	#	on ourselves, run them here
+	if len(calls) < 2 or __conf['workers'] < 2 or \
+		getattr(__local, 'worker', False):
+		return [f() for f in calls]
+
+	# Start every call
+	sEndpoint = QueryLog.endpoint()
+	oExecutor = _executor()
+	lFutures = [oExecutor.submit(_call, sEndpoint, f) for f in calls]
+
+	# Wait for all of them before returning or raising so that none are left
+	#	running
+	lErrors = [o.exception() for o in lFutures]
+	for e in lErrors:
+		if e is not None:
+			raise e
+
+	# Return the results
+	return [o.result() for o in lFutures]
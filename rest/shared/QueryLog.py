@@ -0,0 +1,477 @@
+# coding=utf8
+""" Query Log
+
+Wraps the select, insert, and execute commands of Record_MySQL, and the
+streamed selects of records, to time every statement. Each one is reduced to a fingerprint, the statement with all its
+values removed, and the count, time, and rows of each fingerprint are added up
+in Redis along with the endpoints that ran it. Statements slower than the
+threshold are written to the slow query log, SELECTs with their EXPLAIN
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import atexit
+from hashlib import sha1
+import re
+import threading
+from time import time
+
+# Pip imports
+from RestOC import JSON, Record_MySQL
+
+# Record imports
+import records
+
+_FLUSH_AT = 100
+"""The number of statements buffered by a thread before they're added to
+Redis even if the request hasn't ended, for crons and workers"""
+
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_SPACES = re.compile(r'\s+')
+_VALUES = re.compile(
+	r"(`[^`]*`)|'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b"
+)
+
+_MAX = """
+local m = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if tonumber(ARGV[2]) > m then
+	redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+"""Lua script to only store a time if it's more than the one stored"""
+
+__redis = None
+"""The Redis instance"""
+
+__max = None
+"""The registered max script"""
+
+__conf = {
+	'enabled': True,
+	'slow_ms': 500,
+	'slow_log': '/var/log/tims/slow_queries.log',
+	'explain': True
+}
+"""If statements are recorded, the milliseconds after which a statement is
+slow, the file slow statements are appended to, and if slow SELECTs are
+explained"""
+
+__local = threading.local()
+"""The endpoint, buffered statements, and state of the current thread"""
+
+__lock = threading.Lock()
+"""Lock used to write to the slow log"""
+
+__originals = {}
+"""The original Record_MySQL commands, and records.stream, by name"""
+
+def _buffer():
+	"""Buffer
+
+	Returns the statements buffered by the current thread by fingerprint
+
+	Returns:
+		dict
+	"""
+	try:
+		return __local.buffer
+	except AttributeError:
+		__local.buffer = {}
+		return __local.buffer
+
+def _explain(host, sql):
+	"""Explain
+
+	Returns the EXPLAIN of a SELECT statement, or None if it's not a SELECT or
+	the EXPLAIN failed
+
+	Arguments:
+		host (str): The host the statement ran on
+		sql (str): The statement
+
+	Returns:
+		list|None
+	"""
+
+	# Only SELECTs can be explained without side effects
+	sStart = sql.lstrip()[:7].upper()
+	if not __conf['explain'] or \
+		not (sStart.startswith('SELECT') or sStart.startswith('WITH ')):
+		return None
+
+	# Run the EXPLAIN with the original select so that it isn't recorded
+	try:
+		return __originals['select'](host, 'EXPLAIN %s' % sql)
+	except Exception as e:
+		return [{'error': str(e.args)}]
+
+def _record(host, sql, seconds, rows):
+	"""Record
+
+	Adds a statement to the thread's buffer, and writes it to the slow log if
+	it took too long
+
+	Arguments:
+		host (str): The host the statement ran on
+		sql (str): The statement
+		seconds (float): The time it took
+		rows (uint): The rows returned or affected
+
+	Returns:
+		None
+	"""
+
+	# Get the fingerprint
+	sPrint, sNormal = fingerprint(sql)
+
+	# Add it to the buffer
+	dBuffer = _buffer()
+	try:
+		d = dBuffer[sPrint]
+		d['count'] += 1
+		d['time'] += seconds
+		d['rows'] += rows
+		if seconds > d['max']:
+			d['max'] = seconds
+	except KeyError:
+		d = dBuffer[sPrint] = {
+			'sql': sNormal,
+			'count': 1,
+			'time': seconds,
+			'rows': rows,
+			'max': seconds,
+			'slow': 0,
+			'endpoints': {}
+		}
+	sEndpoint = endpoint()
+	d['endpoints'][sEndpoint] = d['endpoints'].get(sEndpoint, 0) + 1
+
+	# If it's slow
+	if seconds * 1000 >= __conf['slow_ms']:
+		d['slow'] += 1
+
+		# Write it to the log
+		sLine = JSON.encode({
+			'time': int(time()),
+			'host': host,
+			'endpoint': sEndpoint,
+			'fingerprint': sPrint,
+			'ms': round(seconds * 1000, 3),
+			'rows': rows,
+			'sql': sql,
+			'explain': _explain(host, sql)
+		})
+		try:
+			with __lock:
+				with open(__conf['slow_log'], 'a') as oF:
+					oF.write('%s\n' % sLine)
+		except OSError as e:
+			print('Slow query log failed: %s' % str(e.args))
+
+	# If the thread has buffered too many, add them to Redis now
+	__local.pending = getattr(__local, 'pending', 0) + 1
+	if __local.pending >= _FLUSH_AT:
+		flush()
+
+def _rows(result, seltype):
+	"""Rows
+
+	Returns the number of rows in the result of a select
+
+	Arguments:
+		result (mixed): The result of the select
+		seltype (ESelect): The type of select
+
+	Returns:
+		uint
+	"""
+	if result is None:
+		return 0
+	if seltype in [Record_MySQL.ESelect.CELL, Record_MySQL.ESelect.ROW]:
+		return 1
+	return len(result)
+
+def _stream(host, sql):
+	"""Stream
+
+	Replaces records.stream, records the time the select took to run. The
+	rows are read once the request has ended, so they aren't counted
+
+	Arguments:
+		host (str): The host the select runs on
+		sql (str): The select
+
+	Returns:
+		generator
+	"""
+
+	# If we're off, just call the original
+	if not __conf['enabled']:
+		return __originals['stream'](host, sql)
+
+	# Run and time the select
+	fStart = time()
+	gRet = __originals['stream'](host, sql)
+	fTime = time() - fStart
+
+	# Record it, never letting the recording break the select
+	try:
+		_record(host, sql, fTime, 0)
+	except Exception as e:
+		print('Query log failed: %s' % str(e.args))
+
+	# Return the rows
+	return gRet
+
+def _wrap(name, rows):
+	"""Wrap
+
+	Returns a replacement for one of the Record_MySQL commands that times it
+
+	Arguments:
+		name (str): The name of the command
+		rows (callable): Returns the rows of the result given the result and
+			the arguments of the command
+
+	Returns:
+		classmethod
+	"""
+
+	# Store the original
+	fOriginal = __originals[name] = getattr(Record_MySQL.Commands, name)
+
+	def wrapper(cls, host, sql, *args, **kwargs):
+
+		# If we're off, or already inside a command, like when it retries
+		#	after a lost connection, just call the original
+		if not __conf['enabled'] or getattr(__local, 'active', False):
+			return fOriginal(host, sql, *args, **kwargs)
+
+		# Run and time the statement
+		__local.active = True
+		try:
+			fStart = time()
+			mRet = fOriginal(host, sql, *args, **kwargs)
+			fTime = time() - fStart
+
+			# Record it, never letting the recording break the statement
+			try:
+				_record(host, sql, fTime, rows(mRet, *args, **kwargs))
+			except Exception as e:
+				print('Query log failed: %s' % str(e.args))
+
+		# Allow the next command to be recorded
+		finally:
+			__local.active = False
+
+		# Return the result
+		return mRet
+
+	# Return the replacement
+	return classmethod(wrapper)
+
+def endpoint():
+	"""Endpoint
+
+	Returns the endpoint the current thread is handling, or '-' if it's not
+	in a request
+
+	Returns:
+		str
+	"""
+	return getattr(__local, 'endpoint', None) or '-'
+
+def fingerprint(sql):
+	"""Fingerprint
+
+	Returns the fingerprint of a statement and the normalised statement it
+	was made from, with every string and number replaced by ? and every
+	IN list shortened to a single ?+
+
+	Arguments:
+		sql (str): The statement
+
+	Returns:
+		tuple
+	"""
+
+	# Replace the values, keeping any quoted identifiers
+	sNormal = _VALUES.sub(lambda m: m.group(1) or '?', sql)
+
+	# Shorten the IN lists and the whitespace
+	sNormal = _IN_LIST.sub('IN (?+)', sNormal)
+	sNormal = _SPACES.sub(' ', sNormal).strip()
+
+	# Return the hash and the statement
+	return sha1(sNormal.encode('utf-8')).hexdigest()[:16], sNormal
+
+def flush():
+	"""Flush
+
+	Adds the statements buffered by the current thread to the totals in Redis
+
+	Returns:
+		None
+	"""
+
+	# If there's nothing buffered, or nowhere to put it, do nothing
+	dBuffer = _buffer()
+	if not dBuffer or __redis is None:
+		return
+
+	# Clear the buffer
+	__local.buffer = {}
+	__local.pending = 0
+
+	# Add everything in one trip
+	try:
+		oPipe = __redis.pipeline(transaction=False)
+		for sPrint, d in dBuffer.items():
+			oPipe.hsetnx('queries:sql', sPrint, d['sql'])
+			oPipe.hincrby('queries:count', sPrint, d['count'])
+			oPipe.hincrbyfloat('queries:time', sPrint, d['time'])
+			oPipe.hincrby('queries:rows', sPrint, d['rows'])
+			if d['slow']:
+				oPipe.hincrby('queries:slow', sPrint, d['slow'])
+			__max(keys=['queries:max'], args=[sPrint, d['max']], client=oPipe)
+			for sEndpoint, iCount in d['endpoints'].items():
+				oPipe.hincrby('queries:endpoints', '%s|%s' % (
+					sPrint, sEndpoint
+				), iCount)
+		oPipe.execute()
+	except Exception as e:
+		print('Query log flush failed: %s' % str(e.args))
+
+def init(redis, conf={}):
+	"""Init
+
+	Stores the Redis instance and the config, and replaces the Record_MySQL
+	commands, and records.stream, with ones that record each statement
+
+	Arguments:
+		redis (StrictRedis): A Redis instance
+		conf (dict): Optional, any of enabled, slow_ms, slow_log, and explain
+
+	Returns:
+		None
+	"""
+
+	global __max, __redis
+
+	# Store the redis instance and register the max script
+	__redis = redis
+	__max = redis.register_script(_MAX)
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
+
+	# Replace the commands, only once, and make sure whatever a cron or
+	#	worker buffered is added when it exits
+	if not __originals:
+		atexit.register(flush)
+		Record_MySQL.Commands.select = _wrap('select',
+			lambda ret, seltype=Record_MySQL.ESelect.ALL, *a, **k: \
+				_rows(ret, seltype)
+		)
+		Record_MySQL.Commands.insert = _wrap('insert', lambda ret, *a, **k: 1)
+		Record_MySQL.Commands.execute = _wrap('execute',
+			lambda ret, *a, **k: isinstance(ret, int) and ret or 0
+		)
+		__originals['stream'] = records.stream
+		records.stream = _stream
+
+def request_end():
+	"""Request End
+
+	Adds the statements of the request to Redis and forgets the endpoint
+
+	Returns:
+		None
+	"""
+	flush()
+	__local.endpoint = None
+
+def request_start(endpoint):
+	"""Request Start
+
+	Stores the endpoint the current thread is handling so that it's recorded
+	with every statement
+
+	Arguments:
+		endpoint (str): The method and path of the request
+
+	Returns:
+		None
+	"""
+	__local.endpoint = endpoint
+	__local.buffer = {}
+	__local.pending = 0
+
+def reset():
+	"""Reset
+
+	Removes all the totals from Redis
+
+	Returns:
+		None
+	"""
+	__redis.delete('queries:sql', 'queries:count', 'queries:time',
+		'queries:rows', 'queries:slow', 'queries:max', 'queries:endpoints')
+
+def stats(limit=None):
+	"""Stats
+
+	Returns the totals of each fingerprint, the ones that took the most time
+	overall first
+
+	Arguments:
+		limit (uint): Optional, the maximum number of fingerprints to return
+
+	Returns:
+		dict[]
+	"""
+
+	# Fetch all the hashes in one trip
+	oPipe = __redis.pipeline(transaction=False)
+	for s in ['sql', 'count', 'time', 'rows', 'slow', 'max', 'endpoints']:
+		oPipe.hgetall('queries:%s' % s)
+	dSQL, dCount, dTime, dRows, dSlow, dMax, dEndpoints = oPipe.execute()
+
+	# Create a record for each fingerprint
+	dRet = {}
+	for sPrint, sSQL in dSQL.items():
+		iCount = int(dCount.get(sPrint, 0))
+		fTime = float(dTime.get(sPrint, 0))
+		dRet[sPrint] = {
+			'fingerprint': sPrint.decode(),
+			'sql': sSQL.decode(),
+			'count': iCount,
+			'rows': int(dRows.get(sPrint, 0)),
+			'slow': int(dSlow.get(sPrint, 0)),
+			'ms_total': round(fTime * 1000, 3),
+			'ms_avg': iCount and round(fTime * 1000 / iCount, 3) or 0,
+			'ms_max': round(float(dMax.get(sPrint, 0)) * 1000, 3),
+			'endpoints': {}
+		}
+
+	# Add the endpoints to each fingerprint
+	for sField, sCount in dEndpoints.items():
+		sPrint, sEndpoint = sField.decode().split('|', 1)
+		try:
+			dRet[sPrint.encode()]['endpoints'][sEndpoint] = int(sCount)
+		except KeyError:
+			pass
+
+	# Sort by the total time
+	lRet = sorted(dRet.values(), key=lambda d: d['ms_total'], reverse=True)
+
+	# Return the stats
+	return limit and lRet[:limit] or lRet
@@ -0,0 +1,224 @@
+# coding=utf8
+""" Replica
+
+Decides whether read only report queries can be sent to the read replica. The
+replica is skipped when it's too far behind the primary, and for a short time
+after a user writes anything, so that they always see their own changes
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import threading
+from time import time
+
+# Pip imports
+import pymysql
+from RestOC import Conf, Record_MySQL
+
+__redis = None
+"""The Redis instance"""
+
+__conf = {
+	'host': 'replica',
+	'primary': 'primary',
+	'max_lag': 5,
+	'lag_check': 5,
+	'timeout': 2,
+	'sticky': 10
+}
+"""The names of the replica and primary hosts, the maximum seconds the replica
+can be behind, the seconds to keep the lag before checking it again, the
+seconds the check can take, and the seconds a user's reads stay on the primary
+after they write, which should be more than max_lag"""
+
+__enabled = False
+"""If a replica is configured"""
+
+__lag = {'checked': 0, 'seconds': None}
+"""The last lag found and when it was checked"""
+
+__lock = threading.Lock()
+"""Lock so that only one thread checks the lag at a time"""
+
+def _key(user):
+	"""Key
+
+	Returns the key used to mark that a user wrote recently
+
+	Arguments:
+		user (str): The ID of the user
+
+	Returns:
+		str
+	"""
+	return 'replica:wrote:%s' % user
+
+def current(custom):
+	"""Current
+
+	Returns true if data read with the custom host info returned by custom is
+	as current as the primary, either because it was read from the primary,
+	or because the replica wasn't behind at all
+
+	Arguments:
+		custom (dict): The custom host info
+
+	Returns:
+		bool
+	"""
+	return not custom or lag() == 0
+
+def custom(user=None):
+	"""Custom
+
+	Returns the custom host info to pass to the records for a read only
+	query. Empty, and so the primary, unless the replica can be used
+
+	Arguments:
+		user (str): Optional, the ID of the user making the request
+
+	Returns:
+		dict
+	"""
+
+	# If there's no replica, use the primary
+	if not __enabled:
+		return {}
+
+	# If the user wrote something recently, use the primary
+	if user and __redis.exists(_key(user)):
+		return {}
+
+	# If the replica is too far behind, use the primary
+	iLag = lag()
+	if iLag is None or iLag > __conf['max_lag']:
+		return {}
+
+	# Use the replica
+	return {'host': __conf['host']}
+
+def init(redis, conf={}):
+	"""Init
+
+	Stores the Redis instance and the config, and checks if a replica host
+	exists
+
+	Arguments:
+		redis (StrictRedis): A Redis instance
+		conf (dict): Optional, any of host, primary, max_lag, lag_check,
+			timeout, and sticky
+
+	Returns:
+		None
+	"""
+
+	global __enabled, __redis
+
+	# Store the redis instance
+	__redis = redis
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
+
+	# The replica is only used if it's in the config
+	__enabled = Conf.get(('mysql', 'hosts', __conf['host'])) is not None
+
+def lag():
+	"""Lag
+
+	Returns the seconds the replica is behind the primary, or None if it's
+	not replicating, unless it's the same server as the primary, or can't be
+	reached. The value is kept for a few seconds
+	so that the replica isn't asked on every request
+
+	Returns:
+		uint|None
+	"""
+
+	# If the last check is still recent, return it
+	if time() - __lag['checked'] < __conf['lag_check']:
+		return __lag['seconds']
+
+	# If another thread is already checking, return the last value
+	if not __lock.acquire(blocking=False):
+		return __lag['seconds']
+
+	try:
+
+		# Ask the replica for its status on a connection of its own, so that
+		#	a replica that's down fails quickly, instead of holding up the
+		#	request while Record_MySQL retries. Use the old statement on
+		#	servers that don't know the new one
+		try:
+			dHosts = Record_MySQL.__dict__['__mdHosts']
+			oCon = pymysql.connect(**dict(dHosts[__conf['host']],
+				connect_timeout=__conf['timeout'],
+				read_timeout=__conf['timeout'],
+				cursorclass=pymysql.cursors.DictCursor
+			))
+			try:
+				with oCon.cursor() as oCursor:
+					try:
+						oCursor.execute('SHOW REPLICA STATUS')
+					except pymysql.err.ProgrammingError:
+						oCursor.execute('SHOW SLAVE STATUS')
+					dStatus = oCursor.fetchone()
+			finally:
+				oCon.close()
+
+			# If it's not set up as a replica, it only has the same data as
+			#	the primary if it is the primary
+			if not dStatus:
+				if dHosts[__conf['host']] == dHosts.get(__conf['primary']):
+					mSeconds = 0
+				else:
+					mSeconds = None
+
+			# Else, get the seconds behind, which is NULL if replication has
+			#	stopped
+			else:
+				if 'Seconds_Behind_Source' in dStatus:
+					mSeconds = dStatus['Seconds_Behind_Source']
+				else:
+					mSeconds = dStatus.get('Seconds_Behind_Master')
+				if mSeconds is not None:
+					mSeconds = int(mSeconds)
+
+		# If the replica can't be reached, don't use it
+		except Exception as e:
+			print('Replica lag check failed: %s' % str(e.args))
+			mSeconds = None
+
+		# Store the result
+		__lag['seconds'] = mSeconds
+		__lag['checked'] = time()
+
+	# Let other threads check again
+	finally:
+		__lock.release()
+
+	# Return the lag
+	return mSeconds
+
+def wrote(user):
+	"""Wrote
+
+	Marks that a user just wrote something, so that their reads go to the
+	primary until the replica has caught up
+
+	Arguments:
+		user (str): The ID of the user
+
+	Returns:
+		None
+	"""
+	if __enabled:
+		__redis.set(_key(user), 1, ex=__conf['sticky'])
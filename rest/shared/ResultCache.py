@@ -0,0 +1,120 @@
+# coding=utf8
+""" Result Cache
+
+Stores the results of report requests in Redis, keyed by the request, its
+arguments, the clients the caller can see, and the current version of those
+clients. Any change to the clients changes the key, so stale results are never
+returned, they're just left to expire. Results read from the replica while
+it's behind are never stored, as they can be older than the versions in their
+key. Every lookup sets the X-Cache header to HIT or MISS
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from hashlib import sha1
+
+# Pip imports
+from RestOC import JSON
+
+# Shared imports
+from . import Headers, Replica, Versions
+
+__redis = None
+"""The Redis instance"""
+
+__conf = {
+	'enabled': True,
+	'ttl': 300
+}
+"""If results are cached, and the seconds they're kept"""
+
+def get(name, args, clients):
+	"""Get
+
+	Returns the key of the request and its cached result, or None for the
+	result if it isn't cached
+
+	Arguments:
+		name (str): The name of the request
+		args (dict): The arguments of the request
+		clients (str|str[]): The ID or IDs of the clients the result is
+			limited to, or None for every client
+
+	Returns:
+		tuple
+	"""
+
+	# If caching is off, there's no key or result
+	if not __conf['enabled']:
+		return None, None
+
+	# Generate the key from the request, its sorted arguments, the clients,
+	#	and their versions
+	if clients is not None:
+		clients = isinstance(clients, str) and [clients] or sorted(clients)
+	sKey = 'results:%s:%s' % (name, sha1(JSON.encode([
+		sorted(args.items()),
+		clients,
+		Versions.get(clients)
+	]).encode('utf-8')).hexdigest())
+
+	# Fetch the result
+	sResult = __redis.get(sKey)
+
+	# If there's none, note the miss
+	if sResult is None:
+		Headers.set('X-Cache', 'MISS')
+		return sKey, None
+
+	# Note the hit and return the result
+	Headers.set('X-Cache', 'HIT')
+	return sKey, JSON.decode(sResult)
+
+def init(redis, conf={}):
+	"""Init
+
+	Stores the Redis instance and the config
+
+	Arguments:
+		redis (StrictRedis): A Redis instance
+		conf (dict): Optional, any of enabled and ttl
+
+	Returns:
+		None
+	"""
+
+	global __redis
+
+	# Store the redis instance
+	__redis = redis
+
+	# Update the config
+	for k in __conf:
+		if k in conf:
+			__conf[k] = conf[k]
+
+def set(key, result, custom={}):
+	"""Set
+
+	Stores the result of a request under the key returned by get, unless it
+	was read from the replica while it was behind the primary, and returns the
+	result
+
+	Arguments:
+		key (str): The key returned by get, or None if caching is off
+		result (mixed): The result of the request
+		custom (dict): Optional, the custom host info the result was read
+			with, as returned by Replica.custom
+
+	Returns:
+		mixed
+	"""
+	if key is not None and Replica.current(custom):
+		__redis.set(key, JSON.encode(result), ex=__conf['ttl'])
+	return result
@@ -0,0 +1,160 @@
+# coding=utf8
+""" Versions
+
+Counters in Redis that go up every time data changes, so that anything
+generated from the data can be keyed by them and never served once it's stale.
+Each client has its own counter, any change to any client bumps a shared one,
+and changes that touch every client, like renaming a user, bump a global one.
+Tables listed as a whole have a counter each as well. The counters are always
+returned with a random epoch, created whenever it's missing, so that if Redis
+loses them and they start over, the values they had before never match again
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import uuid
+
+__redis = None
+"""The Redis instance"""
+
+def _epoch(value):
+	"""Epoch
+
+	Returns the epoch fetched with the counters, creating it if it's missing,
+	which means Redis lost every key and the counters started over
+
+	Arguments:
+		value (bytes|None): The epoch fetched
+
+	Returns:
+		str
+	"""
+
+	# If it's missing, create it, unless another process just did, and fetch
+	#	it again
+	if value is None:
+		__redis.set('version:epoch', uuid.uuid4().hex, nx=True)
+		value = __redis.get('version:epoch')
+
+	# Return it as a string
+	return value.decode('utf-8')
+
+def _clients(clients):
+	"""Clients
+
+	Returns the clients as a sorted list without duplicates
+
+	Arguments:
+		clients (str|str[]): The ID or IDs of the clients
+
+	Returns:
+		str[]
+	"""
+	if isinstance(clients, str):
+		return [clients]
+	return sorted(set(clients))
+
+def bump(clients):
+	"""Bump
+
+	Bumps the counters of the given clients, and the one of any client
+
+	Arguments:
+		clients (str|str[]): The ID or IDs of the clients that changed
+
+	Returns:
+		None
+	"""
+	oPipe = __redis.pipeline(transaction=False)
+	for s in _clients(clients):
+		oPipe.incr('version:client:%s' % s)
+	oPipe.incr('version:any')
+	oPipe.execute()
+
+def bump_all():
+	"""Bump All
+
+	Bumps the global counter, for changes that affect data of every client
+
+	Returns:
+		None
+	"""
+	__redis.incr('version:global')
+
+def bump_tables(tables):
+	"""Bump Tables
+
+	Bumps the counters of the given tables
+
+	Arguments:
+		tables (str[]): The names of the tables that changed
+
+	Returns:
+		None
+	"""
+	oPipe = __redis.pipeline(transaction=False)
+	for s in tables:
+		oPipe.incr('version:table:%s' % s)
+	oPipe.execute()
+
+def get(clients=None):
+	"""Get
+
+	Returns the epoch and the current counters for data on the given clients,
+	or on every client if None is passed
+
+	Arguments:
+		clients (str|str[]): Optional, the ID or IDs of the clients
+
+	Returns:
+		list
+	"""
+
+	# Get the keys, the epoch, the global one, then the one of any client or
+	#	the ones of each client
+	lKeys = ['version:epoch', 'version:global']
+	if clients is None:
+		lKeys.append('version:any')
+	else:
+		lKeys.extend(['version:client:%s' % s for s in _clients(clients)])
+
+	# Fetch and return them
+	lValues = __redis.mget(lKeys)
+	return [_epoch(lValues[0])] + [int(s or 0) for s in lValues[1:]]
+
+def init(redis):
+	"""Init
+
+	Stores the Redis instance and makes sure the epoch exists
+
+	Arguments:
+		redis (StrictRedis): A Redis instance
+
+	Returns:
+		None
+	"""
+	global __redis
+	__redis = redis
+	__redis.set('version:epoch', uuid.uuid4().hex, nx=True)
+
+def tables(tables):
+	"""Tables
+
+	Returns the epoch and the current counters of the given tables
+
+	Arguments:
+		tables (str[]): The names of the tables
+
+	Returns:
+		list
+	"""
+	lValues = __redis.mget(
+		['version:epoch'] + ['version:table:%s' % s for s in tables]
+	)
+	return [_epoch(lValues[0])] + [int(s or 0) for s in lValues[1:]]
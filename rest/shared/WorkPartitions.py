@@ -0,0 +1,420 @@
+# coding=utf8
+""" Work Partitions
+
+Manages the monthly RANGE partitions of the work table on the `end` field.
+Open work, with no end, is kept in its own partition, every month has one, and
+a last partition catches anything past the months created so far. Old months
+can be swapped out into a compressed archive table, after which their range
+belongs to the open work partition
+
+MySQL requires every unique key of a partitioned table to include the field
+it's partitioned on, and `end` can be NULL, so the table has no primary key,
+just an index on `_id`, which is still generated by UUID()
+"""
+
+__author__		= "Chris Nasr"
+__copyright__	= "Ouroboros Coding Inc."
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from datetime import datetime, timezone
+
+# Pip imports
+from RestOC import Record_MySQL
+
+# Record imports
+from records import transaction, Work
+
+# Defines
+FUTURE = 'p_future'
+OPEN = 'p_open'
+
+def _month(value, add=0):
+	"""Month
+
+	Returns the start of the month of the timestamp, plus or minus the given
+	number of months, in UTC
+
+	Arguments:
+		value (uint): The timestamp
+		add (int): Optional, the number of months to add
+
+	Returns:
+		datetime
+	"""
+	oDT = datetime.fromtimestamp(value, timezone.utc)
+	iMonth = oDT.year * 12 + oDT.month - 1 + add
+	return datetime(iMonth // 12, iMonth % 12 + 1, 1, tzinfo=timezone.utc)
+
+def _months(first, last):
+	"""Months
+
+	Returns the SQL for the partition of every month from the first to the
+	last, inclusive
+
+	Arguments:
+		first (datetime): The start of the first month
+		last (datetime): The start of the last month
+
+	Returns:
+		str[]
+	"""
+	lRet = []
+	oMonth = first
+	while oMonth <= last:
+		oNext = _month(int(oMonth.timestamp()), 1)
+		lRet.append('PARTITION `%s` VALUES LESS THAN (%d)' % (
+			oMonth.strftime('p%Y%m'), int(oNext.timestamp())
+		))
+		oMonth = oNext
+	return lRet
+
+def _exchange(names):
+	"""Exchange
+
+	Copies everything in the exchange table into the archive, replacing
+	anything already copied by a run that didn't finish, and then empties it
+
+	Arguments:
+		names (dict): The names returned by _names
+
+	Returns:
+		uint
+	"""
+
+	# Count the rows waiting to be archived
+	iCount = Record_MySQL.Commands.select(
+		names['host'],
+		"SELECT COUNT(*) FROM `%(db)s`.`%(exchange)s`" % names,
+		Record_MySQL.ESelect.CELL
+	)
+
+	# If there's any, copy them
+	if iCount:
+		Record_MySQL.Commands.execute(
+			names['host'],
+			"REPLACE INTO `%(db)s`.`%(archive)s`\n" \
+			"SELECT * FROM `%(db)s`.`%(exchange)s`" % names
+		)
+
+	# Empty the table and return the count
+	Record_MySQL.Commands.execute(
+		names['host'],
+		"TRUNCATE TABLE `%(db)s`.`%(exchange)s`" % names
+	)
+	return iCount
+
+def _names(custom={}):
+	"""Names
+
+	Returns the names of the work table, its archive, and the table used to
+	move partitions out of it
+
+	Arguments:
+		custom (dict): Custom Host and DB info
+
+	Returns:
+		dict
+	"""
+	dStruct = Work.struct(custom)
+	return {
+		'host': dStruct['host'],
+		'db': dStruct['db'],
+		'table': dStruct['table'],
+		'archive': '%s_archive' % dStruct['table'],
+		'exchange': '%s_exchange' % dStruct['table'],
+		'open': OPEN
+	}
+
+def archive(months, custom={}):
+	"""Archive
+
+	Moves every month that ended more than the given number of months ago to
+	the archive table. Each month is swapped out of the work table with an
+	empty table in a single statement, so its rows are never in both tables,
+	or in neither, and then copied into the archive. The now empty partition
+	is merged into the open work partition instead of being dropped, so that
+	anything written to the month after it was swapped out is kept, and
+	archived on the next run
+
+	Arguments:
+		months (uint): The number of full months to keep
+		custom (dict): Custom Host and DB info
+
+	Returns:
+		dict
+	"""
+
+	# Get the names
+	dNames = _names(custom)
+
+	# Make sure the archive exists
+	archive_create(custom)
+
+	# Archive anything left in the exchange table by a run that didn't finish,
+	#	then create it again so it always matches the work table
+	if Record_MySQL.Commands.select(
+		dNames['host'],
+		"SELECT COUNT(*)\n" \
+		"FROM `information_schema`.`TABLES`\n" \
+		"WHERE `TABLE_SCHEMA` = '%(db)s'\n" \
+		"AND `TABLE_NAME` = '%(exchange)s'" % dNames,
+		Record_MySQL.ESelect.CELL
+	):
+		_exchange(dNames)
+		Record_MySQL.Commands.execute(
+			dNames['host'],
+			"DROP TABLE `%(db)s`.`%(exchange)s`" % dNames
+		)
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"CREATE TABLE `%(db)s`.`%(exchange)s` LIKE `%(db)s`.`%(table)s`" % dNames
+	)
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"ALTER TABLE `%(db)s`.`%(exchange)s` REMOVE PARTITIONING" % dNames
+	)
+
+	# Anything before the start of this month, minus the months to keep, is
+	#	archived
+	iBefore = int(_month(int(datetime.now(timezone.utc).timestamp()), -months).timestamp())
+
+	# Go through each month partition, oldest first, so that each one is
+	#	next to the open work partition by the time it's merged into it
+	dRet = {}
+	for sName, iLess in partitions(custom):
+		if sName in [OPEN, FUTURE] or iLess > iBefore:
+			continue
+
+		# Swap the month with the empty exchange table
+		dNames['partition'] = sName
+		dNames['less'] = iLess
+		Record_MySQL.Commands.execute(
+			dNames['host'],
+			"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+			"EXCHANGE PARTITION `%(partition)s`\n" \
+			"WITH TABLE `%(db)s`.`%(exchange)s`" % dNames
+		)
+
+		# Copy the month into the archive
+		dRet[sName] = _exchange(dNames)
+
+		# Merge the empty partition into the open work one
+		Record_MySQL.Commands.execute(
+			dNames['host'],
+			"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+			"REORGANIZE PARTITION `%(open)s`, `%(partition)s` INTO (\n" \
+			"\tPARTITION `%(open)s` VALUES LESS THAN (%(less)d)\n" \
+			")" % dNames
+		)
+
+	# Move any old work that ended up in the open work partition, because it
+	#	was written to a month after it was swapped out, in a transaction so
+	#	it's never in both tables
+	dNames['before'] = iBefore
+	with transaction(dNames['host']):
+		Record_MySQL.Commands.execute(
+			dNames['host'],
+			"REPLACE INTO `%(db)s`.`%(archive)s`\n" \
+			"SELECT * FROM `%(db)s`.`%(table)s` PARTITION (`%(open)s`)\n" \
+			"WHERE `end` < FROM_UNIXTIME(%(before)d)" % dNames
+		)
+		iLate = Record_MySQL.Commands.execute(
+			dNames['host'],
+			"DELETE FROM `%(db)s`.`%(table)s` PARTITION (`%(open)s`)\n" \
+			"WHERE `end` < FROM_UNIXTIME(%(before)d)" % dNames
+		)
+	if iLate:
+		dRet[OPEN] = iLate
+
+	# Drop the exchange table
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"DROP TABLE `%(db)s`.`%(exchange)s`" % dNames
+	)
+
+	# Return the months archived
+	return dRet
+
+def archive_create(custom={}):
+	"""Archive Create
+
+	Creates the archive table, if it doesn't exist, as a compressed copy of
+	the work table with no partitions and its primary key back
+
+	Arguments:
+		custom (dict): Custom Host and DB info
+
+	Returns:
+		bool
+	"""
+
+	# Get the names
+	dNames = _names(custom)
+
+	# If it already exists, do nothing
+	if Record_MySQL.Commands.select(
+		dNames['host'],
+		"SELECT COUNT(*)\n" \
+		"FROM `information_schema`.`TABLES`\n" \
+		"WHERE `TABLE_SCHEMA` = '%(db)s'\n" \
+		"AND `TABLE_NAME` = '%(archive)s'" % dNames,
+		Record_MySQL.ESelect.CELL
+	):
+		return False
+
+	# Create it
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"CREATE TABLE `%(db)s`.`%(archive)s` LIKE `%(db)s`.`%(table)s`" % dNames
+	)
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"ALTER TABLE `%(db)s`.`%(archive)s`\n" \
+		"DROP INDEX `_id`,\n" \
+		"ADD PRIMARY KEY (`_id`),\n" \
+		"ROW_FORMAT=COMPRESSED\n" \
+		"REMOVE PARTITIONING" % dNames
+	)
+
+	# Return OK
+	return True
+
+def convert(ahead=3, custom={}):
+	"""Convert
+
+	Partitions the work table, with a partition for every month from the
+	first work ended through the given number of months ahead. The table is
+	copied so writes are blocked until it's done
+
+	Arguments:
+		ahead (uint): The number of months after this one to create
+		custom (dict): Custom Host and DB info
+
+	Returns:
+		uint
+	"""
+
+	# Get the names
+	dNames = _names(custom)
+
+	# Find the first month with ended work, or this one if there's none
+	iFirst = Record_MySQL.Commands.select(
+		dNames['host'],
+		"SELECT UNIX_TIMESTAMP(MIN(`end`)) FROM `%(db)s`.`%(table)s`" % dNames,
+		Record_MySQL.ESelect.CELL
+	)
+	iNow = int(datetime.now(timezone.utc).timestamp())
+	oFirst = _month(iFirst and int(iFirst) or iNow)
+
+	# Generate the partitions, the open work first, then every month, then
+	#	whatever comes after
+	lPartitions = ['PARTITION `%s` VALUES LESS THAN (1)' % OPEN] + \
+		_months(oFirst, _month(iNow, ahead)) + \
+		['PARTITION `%s` VALUES LESS THAN MAXVALUE' % FUTURE]
+
+	# Replace the primary key and partition the table
+	dNames['partitions'] = ',\n\t'.join(lPartitions)
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+		"DROP PRIMARY KEY,\n" \
+		"ADD INDEX `_id` (`_id`)\n" \
+		"PARTITION BY RANGE (UNIX_TIMESTAMP(`end`)) (\n" \
+		"\t%(partitions)s\n" \
+		")" % dNames
+	)
+
+	# Return the number of partitions
+	return len(lPartitions)
+
+def ensure(ahead=3, custom={}):
+	"""Ensure
+
+	Makes sure a partition exists for every month through the given number of
+	months ahead, splitting them off the last partition
+
+	Arguments:
+		ahead (uint): The number of months after this one that must exist
+		custom (dict): Custom Host and DB info
+
+	Raises:
+		ValueError
+
+	Returns:
+		str[]
+	"""
+
+	# Get the names and the existing partitions
+	dNames = _names(custom)
+	lPartitions = partitions(custom)
+	if not lPartitions:
+		raise ValueError('%(db)s.%(table)s is not partitioned' % dNames)
+
+	# Find the start of the month after the last one
+	lMonths = [l for l in lPartitions if l[0] not in [OPEN, FUTURE]]
+	iNow = int(datetime.now(timezone.utc).timestamp())
+	oNext = lMonths and \
+		datetime.fromtimestamp(lMonths[-1][1], timezone.utc) or \
+		_month(iNow)
+
+	# Generate the missing months
+	lMissing = _months(oNext, _month(iNow, ahead))
+	if not lMissing:
+		return []
+
+	# Split them off the last partition, which is empty unless work ended in
+	#	the future
+	dNames['partitions'] = ',\n\t'.join(lMissing + [
+		'PARTITION `%s` VALUES LESS THAN MAXVALUE' % FUTURE
+	])
+	dNames['future'] = FUTURE
+	Record_MySQL.Commands.execute(
+		dNames['host'],
+		"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+		"REORGANIZE PARTITION `%(future)s` INTO (\n" \
+		"\t%(partitions)s\n" \
+		")" % dNames
+	)
+
+	# Return the names of the new partitions
+	return [s.split('`')[1] for s in lMissing]
+
+def partitions(custom={}):
+	"""Partitions
+
+	Returns the name and upper limit of every partition of the work table in
+	order, or an empty list if it's not partitioned. The limit of the last
+	partition is None
+
+	Arguments:
+		custom (dict): Custom Host and DB info
+
+	Returns:
+		list[]
+	"""
+
+	# Get the names
+	dNames = _names(custom)
+
+	# Fetch the partitions
+	lRows = Record_MySQL.Commands.select(
+		dNames['host'],
+		"SELECT `PARTITION_NAME` as `name`,\n" \
+		"	`PARTITION_DESCRIPTION` as `less`\n" \
+		"FROM `information_schema`.`PARTITIONS`\n" \
+		"WHERE `TABLE_SCHEMA` = '%(db)s'\n" \
+		"AND `TABLE_NAME` = '%(table)s'\n" \
+		"AND `PARTITION_NAME` IS NOT NULL\n" \
+		"ORDER BY `PARTITION_ORDINAL_POSITION`" % dNames,
+		Record_MySQL.ESelect.ALL
+	)
+
+	# Return the names and limits
+	return [[
+		d['name'],
+		d['less'] != 'MAXVALUE' and int(d['less']) or None
+	] for d in lRows]
@@ -0,0 +1,212 @@
+# coding=utf8
+""" Bench Compression
+
+Compares the size of work listings and the CPU it takes to compress them with
+each encoding and level, at several numbers of records, both as a single JSON
+response and streamed as NDJSON in chunks. The records are synthetic, shaped
+like those returned by Work.range, so no DB is needed
+
+	python -m tools.bench_compression [rows,rows,...]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import gzip
+import json
+import random
+import sys
+from time import process_time, time
+import uuid
+
+# Shared imports
+from shared import Compress
+
+# Defines
+_CHUNK = 65536
+_CLIENTS = 10
+_PROJECTS = 5
+_TASKS = 20
+_USERS = 20
+_WORDS = ['fixed', 'added', 'reviewed', 'the', 'invoice', 'report', 'for',
+	'client', 'meeting', 'about', 'deploy', 'bug', 'in', 'page', 'tests']
+
+def levels():
+	"""Levels
+
+	Returns the encodings and levels to try, brotli only if it's installed
+
+	Returns:
+		list[]
+	"""
+	lRet = [['gzip', 1], ['gzip', 6], ['gzip', 9]]
+	if 'br' in Compress.ENCODINGS:
+		lRet.extend([['br', 1], ['br', 4], ['br', 11]])
+	return lRet
+
+def records(rows):
+	"""Records
+
+	Generates random work records with the same fields and names as the ones
+	returned by Work.range
+
+	Arguments:
+		rows (uint): The number of records
+
+	Returns:
+		dict[]
+	"""
+
+	# Create the users, and the clients' projects' tasks
+	lUsers = [[str(uuid.uuid4()), 'Bench User %d' % i] for i in range(_USERS)]
+	lTasks = []
+	for i in range(_CLIENTS):
+		sClient = str(uuid.uuid4())
+		for j in range(_PROJECTS):
+			sProject = str(uuid.uuid4())
+			for k in range(_TASKS):
+				lTasks.append({
+					'client': sClient,
+					'clientName': 'Bench Client %d' % i,
+					'project': sProject,
+					'projectName': 'Bench Project %d' % j,
+					'task': str(uuid.uuid4()),
+					'taskName': 'Bench Task %d' % k
+				})
+
+	# Create the records
+	iNow = int(time())
+	lRet = []
+	for i in range(rows):
+		iEnd = iNow - random.randint(0, 31536000)
+		sUser, sName = random.choice(lUsers)
+		d = {'_id': str(uuid.uuid4())}
+		d.update(random.choice(lTasks))
+		d['user'] = sUser
+		d['userName'] = sName
+		d['start'] = iEnd - random.randint(60, 14400)
+		d['end'] = iEnd
+		d['description'] = ' '.join(random.sample(_WORDS, random.randint(0, 8)))
+		lRet.append(d)
+
+	# Return the records
+	return lRet
+
+def chunks(lines):
+	"""Chunks
+
+	Joins lines into chunks the way StreamRoute does
+
+	Arguments:
+		lines (str[]): The lines
+
+	Returns:
+		generator
+	"""
+	lBuffer = []
+	iLen = 0
+	for s in lines:
+		lBuffer.append(s)
+		iLen += len(s)
+		if iLen >= _CHUNK:
+			yield ''.join(lBuffer).encode('utf-8')
+			lBuffer = []
+			iLen = 0
+	if lBuffer:
+		yield ''.join(lBuffer).encode('utf-8')
+
+def timed(f):
+	"""Timed
+
+	Calls the function and returns the CPU seconds it took and its result
+
+	Arguments:
+		f (callable): The function to call
+
+	Returns:
+		tuple
+	"""
+	fStart = process_time()
+	mRet = f()
+	return process_time() - fStart, mRet
+
+def run(sizes=[1000, 10000, 50000, 100000]):
+	"""Run
+
+	Compresses each size of listing with each encoding and level and prints
+	the results
+
+	Arguments:
+		sizes (uint[]): The numbers of records to try
+
+	Returns:
+		int
+	"""
+
+	# Note the encodings that will be tried
+	print('Encodings: %s\n' % ', '.join(Compress.ENCODINGS))
+	print('%-8s %-6s %-5s %-3s %12s %12s %7s %9s %8s' % (
+		'rows', 'mode', 'enc', 'lvl', 'bytes', 'compressed', 'ratio',
+		'cpu ms', 'MB/s'
+	))
+
+	# Go through each size
+	for iRows in sizes:
+		lRecords = records(iRows)
+
+		# Encode it as a single response, and as the lines of a stream
+		bJSON = json.dumps({'data': lRecords}).encode('utf-8')
+		lLines = ['%s\n' % json.dumps(d) for d in lRecords]
+		iNDJSON = sum(len(s) for s in lLines)
+
+		# Try each level
+		for sEncoding, iLevel in levels():
+
+			# Compress the single response
+			fCPU, bOut = timed(
+				lambda: Compress.compress(bJSON, sEncoding, iLevel)
+			)
+			print('%-8d %-6s %-5s %-3d %12d %12d %6.1f%% %9.2f %8.1f' % (
+				iRows, 'json', sEncoding, iLevel, len(bJSON), len(bOut),
+				len(bOut) * 100 / len(bJSON), fCPU * 1000,
+				len(bJSON) / 1048576 / (fCPU or 1e-9)
+			))
+
+			# Make sure it decompresses to the same thing
+			if sEncoding == 'gzip' and gzip.decompress(bOut) != bJSON:
+				print('gzip round trip failed')
+				return 1
+
+			# Compress the stream, flushing every chunk
+			fCPU, lOut = timed(
+				lambda: list(Compress.stream(chunks(lLines), sEncoding, iLevel))
+			)
+			iOut = sum(len(b) for b in lOut)
+			print('%-8d %-6s %-5s %-3d %12d %12d %6.1f%% %9.2f %8.1f' % (
+				iRows, 'stream', sEncoding, iLevel, iNDJSON, iOut,
+				iOut * 100 / iNDJSON, fCPU * 1000,
+				iNDJSON / 1048576 / (fCPU or 1e-9)
+			))
+
+			# Make sure the stream decompresses to the same lines
+			if sEncoding == 'gzip' and \
+				gzip.decompress(b''.join(lOut)).decode('utf-8') != ''.join(lLines):
+				print('gzip stream round trip failed')
+				return 1
+
+		print('')
+
+	# Return OK
+	return 0
+
+# Only run if called directly
+if __name__ == '__main__':
+	sys.exit(run(
+		len(sys.argv) > 1 and \
+			[int(s) for s in sys.argv[1].split(',')] or \
+			[1000, 10000, 50000, 100000]
+	))
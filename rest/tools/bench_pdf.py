@@ -0,0 +1,145 @@
+# coding=utf8
+""" Bench PDF
+
+Compares the invoices per second generated by starting wkhtmltopdf for every
+PDF against sending them to the renderer pool, nodes.pdf.renderer, which must
+already be running. The invoice template is filled with sample data so no DB
+is needed
+
+	python -m tools.bench_pdf [invoices] [concurrency]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from concurrent.futures import ThreadPoolExecutor
+import sys
+from time import perf_counter
+
+# Pip imports
+import pdfkit
+from RestOC import Conf, Templates
+
+# Shared imports
+from shared import PDF
+
+# Tools imports
+from . import init
+
+def html(items=10):
+	"""HTML
+
+	Generates the HTML of a sample invoice
+
+	Arguments:
+		items (uint): The number of projects on the invoice
+
+	Returns:
+		str
+	"""
+	dAddress = {
+		'address': '123 Main Street',
+		'city': 'Montreal',
+		'division': 'QC',
+		'country': 'CA'
+	}
+	return Templates.generate('pdf/invoice.html', {
+		'company': dict(dAddress, name='Bench Company', payable_to='Bench Company'),
+		'client': dict(dAddress, name='Bench Client'),
+		'invoice': {
+			'identifier': 'BENCH1',
+			'created': '2026-10-17',
+			'due': '2026-11-16',
+			'elapsedTime': '%d:00' % (items * 4),
+			'subtotal': '%d.00' % (items * 400),
+			'taxes': [{'name': 'GST', 'amount': '%d.00' % (items * 20)}],
+			'total': '%d.00' % (items * 420)
+		},
+		'items': [{
+			'projectName': 'Bench Project %d' % i,
+			'elapsedTime': '4:00',
+			'amount': '400.00'
+		} for i in range(items)],
+		'additional': [],
+		'currency': '$'
+	}, 'en-US')
+
+def timed(f, count, concurrency):
+	"""Timed
+
+	Generates the given number of PDFs and returns the invoices per second
+
+	Arguments:
+		f (callable): Generates a single PDF
+		count (uint): The number of PDFs
+		concurrency (uint): The number generated at the same time
+
+	Returns:
+		float
+	"""
+	fStart = perf_counter()
+	with ThreadPoolExecutor(max_workers=concurrency) as oPool:
+		for b in oPool.map(lambda i: f(), range(count)):
+			if not b.startswith(b'%PDF'):
+				raise ValueError('invalid pdf')
+	return count / (perf_counter() - fStart)
+
+def run(count=50, concurrency=None):
+	"""Run
+
+	Generates the invoices both ways, one at a time, and then as many at a
+	time as there are renderers
+
+	Arguments:
+		count (uint): The number of invoices for each run
+		concurrency (uint): Optional, the number at a time, defaults to the
+			renderer workers
+
+	Returns:
+		int
+	"""
+
+	# Init the templates and the client, without the fallback so we know
+	#	the pool is being used
+	Templates.init('templates')
+	PDF.init(dict(Conf.get('pdf', {}), fallback=False))
+	iConcurrency = concurrency or Conf.get(('pdf', 'renderer', 'workers'), 4)
+
+	# Generate the HTML once
+	sHTML = html()
+
+	# Make sure the renderer is up
+	try:
+		PDF.generate(sHTML)
+	except PDF.PDFException as e:
+		print('Renderer failed: %s' % str(e.args))
+		return 1
+
+	# Time each way
+	for sName, f in [
+		['single', lambda: pdfkit.from_string(sHTML, False)],
+		['pooled', lambda: PDF.generate(sHTML)]
+	]:
+		for iAtOnce in sorted(set([1, iConcurrency])):
+			print('%-6s x%-3d %8.2f invoices/s' % (
+				sName, iAtOnce, timed(f, count, iAtOnce)
+			))
+
+	# Return OK
+	return 0
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Load the config
+	init()
+
+	# Run and exit with the result
+	sys.exit(run(
+		len(sys.argv) > 1 and int(sys.argv[1]) or 50,
+		len(sys.argv) > 2 and int(sys.argv[2]) or None
+	))
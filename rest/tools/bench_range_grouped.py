@@ -0,0 +1,212 @@
+# coding=utf8
+""" Bench Range Grouped
+
+Compares the time it takes Work.range_grouped to return the grouped tasks when
+the grouping is done by the DB versus when it's done in Python, using a
+synthetic dataset created in a separate `_bench` DB
+
+	python -m tools.bench_range_grouped [rows] [keep]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import random
+import sys
+from time import perf_counter, time
+import uuid
+
+# Pip imports
+from RestOC import Record_MySQL
+
+# Record imports
+from records import Client, Project, Task, User, Work
+
+# Tools imports
+from . import init
+
+# Defines
+_BENCH = {'append': 'bench'}
+_CLIENTS = 10
+_PROJECTS = 5
+_TASKS = 20
+_USERS = 20
+_BATCH = 10000
+_YEARS = 5
+
+def populate(rows):
+	"""Populate
+
+	Creates the bench DB, its tables, and fills them with random data
+
+	Arguments:
+		rows (uint): The number of work records to create
+
+	Returns:
+		str[]: The IDs of the clients created
+	"""
+
+	# Get the work structure
+	dStruct = Work.struct(_BENCH)
+
+	# Create the DB and the tables
+	Record_MySQL.Commands.execute(
+		dStruct['host'],
+		'CREATE DATABASE IF NOT EXISTS `%s`' % dStruct['db']
+	)
+	for o in [Client, Project, Task, User, Work]:
+		o.table_create(_BENCH)
+
+	# Create the users
+	lUsers = []
+	for i in range(_USERS):
+		oUser = User({
+			'email': 'bench%d@localhost' % i,
+			'passwd': '0' * 72,
+			'type': 'worker',
+			'name': 'Bench User %d' % i,
+			'locale': 'en-US',
+			'verified': True
+		}, _BENCH)
+		lUsers.append(oUser.create())
+
+	# Create the clients, their projects, and the projects' tasks
+	lClients = []
+	lTasks = []
+	for i in range(_CLIENTS):
+		oClient = Client({
+			'name': 'Bench Client %d' % i,
+			'city': 'Montreal',
+			'division': 'QC',
+			'country': 'CA',
+			'due': 30,
+			'currency': 'CAD',
+			'rate': '100.00',
+			'task_minimum': 15
+		}, _BENCH)
+		sClient = oClient.create()
+		lClients.append(sClient)
+		for j in range(_PROJECTS):
+			oProject = Project({
+				'client': sClient,
+				'name': 'Bench Project %d' % j,
+				'description': ''
+			}, _BENCH)
+			sProject = oProject.create()
+			for k in range(_TASKS):
+				oTask = Task({
+					'project': sProject,
+					'name': 'Bench Task %d' % k
+				}, _BENCH)
+				lTasks.append([sProject, oTask.create()])
+
+	# Insert the work in batches, spread out over the years
+	iNow = int(time())
+	iSpread = _YEARS * 31536000
+	iCount = 0
+	while iCount < rows:
+		lValues = []
+		for i in range(min(_BATCH, rows - iCount)):
+			sProject, sTask = random.choice(lTasks)
+			iEnd = iNow - random.randint(0, iSpread)
+			lValues.append(
+				"('%s','%s','%s','%s',FROM_UNIXTIME(%d),FROM_UNIXTIME(%d),'')" % (
+					str(uuid.uuid4()), sProject, sTask, random.choice(lUsers),
+					iEnd - random.randint(60, 14400), iEnd
+				)
+			)
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"INSERT INTO `%s`.`%s` " \
+			"(`_id`, `project`, `task`, `user`, `start`, `end`, `description`) " \
+			"VALUES %s" % (dStruct['db'], dStruct['table'], ','.join(lValues))
+		)
+		iCount += len(lValues)
+
+	# Return the clients
+	return lClients
+
+def timed(start, end, clients, aggregate):
+	"""Timed
+
+	Runs range_grouped once and returns the seconds it took and the number of
+	records returned
+
+	Arguments:
+		start (uint): The start of the range
+		end (uint): The end of the range
+		clients (str[]): The clients to fetch
+		aggregate (bool): Passed to range_grouped
+
+	Returns:
+		tuple
+	"""
+	fStart = perf_counter()
+	lRecords = Work.range_grouped(start, end, clients, aggregate, custom=_BENCH)
+	return perf_counter() - fStart, len(lRecords)
+
+def run(rows=1000000, keep=False):
+	"""Run
+
+	Populates the bench DB and times both modes of range_grouped
+
+	Arguments:
+		rows (uint): The number of work records to create
+		keep (bool): Don't drop the bench DB when done
+
+	Returns:
+		int
+	"""
+
+	# Get the work structure
+	dStruct = Work.struct(_BENCH)
+
+	# Create the data
+	print('Populating %d work records in `%s`' % (rows, dStruct['db']))
+	fStart = perf_counter()
+	lClients = populate(rows)
+	print('Populated in %.2fs\n' % (perf_counter() - fStart))
+
+	# Try the range of all the work, a year, and a month, for one client and
+	#	then all of them
+	iNow = int(time())
+	for sRange, iSeconds in [
+		['all', _YEARS * 31536000],
+		['year', 31536000],
+		['month', 2592000]
+	]:
+		for sClients, lFilter in [
+			['one client', lClients[:1]],
+			['all clients', lClients]
+		]:
+			fSQL, iSQL = timed(iNow - iSeconds, iNow, lFilter, True)
+			fPy, iPy = timed(iNow - iSeconds, iNow, lFilter, False)
+			print('%-6s %-12s sql %8.3fs (%d rows)  python %8.3fs (%d rows)  %.1fx' % (
+				sRange, sClients, fSQL, iSQL, fPy, iPy, fPy / (fSQL or 1)
+			))
+
+	# Drop the DB unless we want to keep it
+	if not keep:
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			'DROP DATABASE IF EXISTS `%s`' % dStruct['db']
+		)
+
+	# Return OK
+	return 0
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Init the DB
+	init(dbs=['primary'])
+
+	# Run and exit with the result
+	sys.exit(run(
+		len(sys.argv) > 1 and int(sys.argv[1]) or 1000000,
+		len(sys.argv) > 2 and sys.argv[2] == 'keep'
+	))
@@ -0,0 +1,189 @@
+# coding=utf8
+""" Bench Startup
+
+Measures the time from starting nodes.rest.primary to its first response, with
+the compiled definitions and with the definitions parsed from the JSON. The
+first request is a signin, which loads the user records, so it needs the DB
+and Redis in the config to be up
+
+	python -m tools.bench_startup [runs]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter, sleep
+import urllib.error
+import urllib.request
+
+# Pip imports
+from RestOC import Conf, JSON, REST
+
+# Record imports
+from records import DEFINITIONS_COMPILED
+
+# Tools imports
+from . import init
+from .compile_definitions import run as compile_definitions
+
+# Defines
+_TIMEOUT = 60
+
+def _first_response(url):
+	"""First Response
+
+	Starts the primary REST node and returns the seconds until it answers its
+	first request
+
+	Arguments:
+		url (str): The url of the signin request
+
+	Raises:
+		RuntimeError
+
+	Returns:
+		float
+	"""
+
+	# Create the request, with credentials that don't exist
+	oReq = urllib.request.Request(
+		url,
+		data=JSON.encode({
+			'email': 'bench_startup@localhost',
+			'passwd': 'bench'
+		}).encode('utf-8'),
+		headers={'Content-Type': 'application/json; charset=utf-8'},
+		method='POST'
+	)
+
+	# Start the node
+	fStart = perf_counter()
+	oProc = subprocess.Popen(
+		[sys.executable, '-m', 'nodes.rest.primary'],
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.DEVNULL
+	)
+
+	try:
+
+		# Keep trying until the node answers
+		while perf_counter() - fStart < _TIMEOUT:
+
+			# If it died, there's nothing to measure
+			if oProc.poll() is not None:
+				raise RuntimeError('node exited with %d' % oProc.returncode)
+
+			# Any answer, even an error, is a response
+			try:
+				with urllib.request.urlopen(oReq, timeout=5) as oRes:
+					oRes.read()
+				return perf_counter() - fStart
+			except urllib.error.HTTPError:
+				return perf_counter() - fStart
+			except (urllib.error.URLError, ConnectionError):
+				sleep(0.01)
+
+		# Took too long
+		raise RuntimeError('no response after %ds' % _TIMEOUT)
+
+	# Stop the node
+	finally:
+		oProc.terminate()
+		try:
+			oProc.wait(10)
+		except subprocess.TimeoutExpired:
+			oProc.kill()
+			oProc.wait()
+
+def _runs(url, count):
+	"""Runs
+
+	Starts the node the given number of times and prints the min, median, and
+	max of the times to the first response
+
+	Arguments:
+		url (str): The url of the signin request
+		count (uint): The number of times to start the node
+
+	Returns:
+		float
+	"""
+
+	# Start it each time
+	lTimes = [_first_response(url) for _ in range(count)]
+
+	# Print the results
+	fMedian = statistics.median(lTimes)
+	print('\tmin: %.1fms, median: %.1fms, max: %.1fms' % (
+		min(lTimes) * 1000, fMedian * 1000, max(lTimes) * 1000
+	))
+
+	# Return the median
+	return fMedian
+
+def run(count):
+	"""Run
+
+	Measures the startup of the node with and without the compiled definitions
+
+	Arguments:
+		count (uint): The number of times to start the node for each
+
+	Returns:
+		int
+	"""
+
+	# Get the url of the signin request
+	sURL = '%ssignin' % REST.Config(Conf.get('rest'))['primary']['url']
+
+	# Move any existing compiled definitions out of the way
+	sKeep = '%s.keep' % DEFINITIONS_COMPILED
+	if os.path.exists(DEFINITIONS_COMPILED):
+		os.replace(DEFINITIONS_COMPILED, sKeep)
+
+	try:
+
+		# Time it with the JSON parsed
+		print('Parsed definitions, %d runs' % count)
+		fParsed = _runs(sURL, count)
+
+		# Compile the definitions and time it again
+		if compile_definitions() != 0:
+			return 1
+		print('Compiled definitions, %d runs' % count)
+		fCompiled = _runs(sURL, count)
+
+	# Put back the original file, or remove the one we compiled
+	finally:
+		if os.path.exists(sKeep):
+			os.replace(sKeep, DEFINITIONS_COMPILED)
+		elif os.path.exists(DEFINITIONS_COMPILED):
+			os.remove(DEFINITIONS_COMPILED)
+
+	# Print the difference
+	print('Median difference: %.1fms (%.1f%%)' % (
+		(fParsed - fCompiled) * 1000,
+		(fParsed - fCompiled) / fParsed * 100
+	))
+
+	# Return OK
+	return 0
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Load the config
+	init()
+
+	# Run and exit with the result
+	sys.exit(run(
+		len(sys.argv) > 1 and int(sys.argv[1]) or 5
+	))
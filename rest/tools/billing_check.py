@@ -0,0 +1,277 @@
+# coding=utf8
+""" Billing Check
+
+Compares shared.Billing against the calculation Primary._generate_invoice used
+to do row by row, on randomly generated clients and work, then times the
+engine on a client with a large amount of work. Needs no DB
+
+	python -m tools.billing_check [cases] [rows] [seed]
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+from decimal import Decimal, ROUND_UP
+import random
+import sys
+from time import perf_counter
+import uuid
+
+# Shared imports
+from shared import Billing
+
+def legacy(works, client, taxes, additional):
+	"""Legacy
+
+	The calculation as it was done by Primary._generate_invoice before it was
+	moved to shared.Billing, kept as the reference
+
+	Arguments:
+		works (dict[]): The work records
+		client (dict): The client
+		taxes (list): The company taxes
+		additional (list): The additional lines
+
+	Returns:
+		dict
+	"""
+
+	# Init the time and prices per project
+	dProjects = {}
+
+	# Calculate the total elapsed per unique task
+	dTasks = {}
+	for d in works:
+		iElapsed = d['end'] - d['start']
+		try:
+			dTasks[d['task']]['elapsed'] += iElapsed
+		except KeyError:
+			dTasks[d['task']] = {
+				'project': d['project'],
+				'elapsed': iElapsed
+			}
+
+	# Go through each unique task
+	for d in dTasks.values():
+		iMinutes, iRemainder = divmod(d['elapsed'], 60)
+		if iRemainder > 15:
+			iMinutes += 1
+		if client['task_minimum'] == 1:
+			iTotalMinutes = iMinutes
+		else:
+			iBlocks, iRemainder = divmod(iMinutes, client['task_minimum'])
+			if client['task_overflow'] == 0 or iRemainder > client['task_overflow']:
+				iBlocks += 1
+			iTotalMinutes = client['task_minimum'] * iBlocks
+		try:
+			dProjects[d['project']]['minutes'] += iTotalMinutes
+		except KeyError:
+			dProjects[d['project']] = {
+				'_id': d['project'],
+				'minutes': iTotalMinutes,
+				'price': Decimal('0.00')
+			}
+
+	# Go through each project and calculate the amount
+	deSubTotal = Decimal('0.00')
+	for sProject in dProjects:
+		deHours = Decimal(dProjects[sProject]['minutes']) / Decimal(60)
+		dePrice = Decimal(client['rate']) * deHours
+		dProjects[sProject]['amount'] = dePrice.quantize(Decimal('1.00'), rounding=ROUND_UP)
+		deSubTotal += dProjects[sProject]['amount']
+
+	# Go through each additional and add/subtract from the subtotal
+	for d in additional:
+		if d['type'] == 'cost':
+			deSubTotal += Decimal(d['amount'])
+		else:
+			deSubTotal -= Decimal(d['amount'])
+
+	# Calculate the taxes and total
+	deTotal = Decimal(deSubTotal)
+	lTaxes = []
+	if client['taxes']:
+		for d in taxes:
+			dePercentage = Decimal(d['percentage']) / Decimal('100')
+			deAmount = (deSubTotal * dePercentage).quantize(Decimal('1.00'))
+			lTaxes.append({
+				'name': d['name'],
+				'amount': deAmount
+			})
+			deTotal += deAmount
+
+	# Return the generated data
+	return {
+		'subtotal': deSubTotal,
+		'taxes': lTaxes,
+		'total': deTotal,
+		'additional': additional,
+		'items': list(dProjects.values())
+	}
+
+def random_case(rnd, rows):
+	"""Random Case
+
+	Generates a random client, company taxes, additional lines, and work
+
+	Arguments:
+		rnd (random.Random): The generator to use
+		rows (uint): The maximum number of work records
+
+	Returns:
+		tuple
+	"""
+
+	# Generate the client, favouring the edge cases of the minimum and
+	#	overflow
+	iMinimum = rnd.choice([1, 1, 5, 6, 10, 15, 30, 60, rnd.randint(1, 60)])
+	dClient = {
+		'rate': '%d.%02d' % (rnd.randint(0, 500), rnd.randint(0, 99)),
+		'task_minimum': iMinimum,
+		'task_overflow': rnd.choice([0, 0, iMinimum - 1, rnd.randint(0, iMinimum)]),
+		'taxes': rnd.random() < 0.7
+	}
+
+	# Generate the taxes
+	lTaxes = [{
+		'name': 'Tax %d' % i,
+		'percentage': '%d.%03d' % (rnd.randint(0, 20), rnd.randint(0, 999))
+	} for i in range(rnd.randint(0, 3))]
+
+	# Generate the additional lines
+	lAdditional = [{
+		'type': rnd.choice(['cost', 'discount']),
+		'amount': '%d.%02d' % (rnd.randint(0, 1000), rnd.randint(0, 99))
+	} for i in range(rnd.randint(0, 3))]
+
+	# Generate projects and tasks, then the work on them, including lengths
+	#	right around the rounding boundaries
+	lProjects = [str(uuid.UUID(int=rnd.getrandbits(128))) for i in range(rnd.randint(1, 8))]
+	lTasks = [
+		[str(uuid.UUID(int=rnd.getrandbits(128))), rnd.choice(lProjects)] \
+		for i in range(rnd.randint(1, 40))
+	]
+	lWorks = []
+	for i in range(rnd.randint(0, rows)):
+		sTask, sProject = rnd.choice(lTasks)
+		iStart = rnd.randint(1600000000, 1700000000)
+		iLength = rnd.choice([
+			rnd.randint(0, 59),
+			rnd.randint(14, 17) + 60 * rnd.randint(0, 120),
+			rnd.randint(0, 28800)
+		])
+		lWorks.append({
+			'project': sProject,
+			'task': sTask,
+			'start': iStart,
+			'end': iStart + iLength
+		})
+
+	# Return the case
+	return lWorks, dClient, lTaxes, lAdditional
+
+def check(cases, rows, seed):
+	"""Check
+
+	Runs both calculations on random cases and returns the number that differ
+
+	Arguments:
+		cases (uint): The number of cases to run
+		rows (uint): The maximum number of work records per case
+		seed (int): The seed for the random generator
+
+	Returns:
+		uint
+	"""
+
+	# Init the generator and failure count
+	oRandom = random.Random(seed)
+	iFailed = 0
+
+	# Run each case
+	for i in range(cases):
+		lWorks, dClient, lTaxes, lAdditional = random_case(oRandom, rows)
+
+		# Calculate with both
+		dExpected = legacy(lWorks, dClient, lTaxes, lAdditional)
+		dResult = Billing.invoice(
+			Billing.columns(lWorks), dClient, lTaxes, lAdditional
+		)
+
+		# Compare the values, including the types and order
+		if repr(dExpected) != repr(dResult):
+			iFailed += 1
+			print('FAIL case %d (seed %d)\n%s\n%s\n' % (
+				i, seed, dExpected, dResult
+			))
+
+	# Return the failures
+	return iFailed
+
+def bench(rows, seed):
+	"""Bench
+
+	Times both calculations on a single client with the given amount of work
+
+	Arguments:
+		rows (uint): The number of work records
+		seed (int): The seed for the random generator
+
+	Returns:
+		None
+	"""
+
+	# Generate a large case
+	oRandom = random.Random(seed)
+	lWorks, dClient, lTaxes, lAdditional = random_case(oRandom, 0)
+	lProjects = [str(uuid.uuid4()) for i in range(20)]
+	lTasks = [[str(uuid.uuid4()), oRandom.choice(lProjects)] for i in range(2000)]
+	for i in range(rows):
+		sTask, sProject = oRandom.choice(lTasks)
+		iStart = oRandom.randint(1600000000, 1700000000)
+		lWorks.append({
+			'project': sProject,
+			'task': sTask,
+			'start': iStart,
+			'end': iStart + oRandom.randint(0, 28800)
+		})
+
+	# Time the conversion to columns on its own, then both calculations
+	fStart = perf_counter()
+	dColumns = Billing.columns(lWorks)
+	fColumns = perf_counter() - fStart
+
+	fStart = perf_counter()
+	Billing.invoice(dColumns, dClient, lTaxes, lAdditional)
+	fEngine = perf_counter() - fStart
+
+	fStart = perf_counter()
+	legacy(lWorks, dClient, lTaxes, lAdditional)
+	fLegacy = perf_counter() - fStart
+
+	# Print the results
+	print('%d rows: columns %.1fms, engine %.1fms, legacy %.1fms' % (
+		rows, fColumns * 1000, fEngine * 1000, fLegacy * 1000
+	))
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Get the arguments
+	iCases = len(sys.argv) > 1 and int(sys.argv[1]) or 2000
+	iRows = len(sys.argv) > 2 and int(sys.argv[2]) or 100000
+	iSeed = len(sys.argv) > 3 and int(sys.argv[3]) or random.randrange(1 << 30)
+
+	# Check the results match
+	iFailed = check(iCases, 200, iSeed)
+	print('%d / %d cases match (seed %d)' % (iCases - iFailed, iCases, iSeed))
+
+	# Time a large client
+	bench(iRows, iSeed)
+
+	# Exit with the result
+	sys.exit(iFailed and 1 or 0)
@@ -0,0 +1,104 @@
+# coding=utf8
+""" Cache Check
+
+Checks that results read from the replica are stored by shared.ResultCache
+when the replica isn't behind, so the second identical request is a HIT, and
+are not stored when it is behind. Uses the Redis in the config, but needs no
+DB, the lag of the replica is set directly
+
+	python -m tools.cache_check
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import sys
+from time import time
+import uuid
+
+# Pip imports
+from redis import StrictRedis
+from RestOC import Conf
+
+# Shared imports
+from shared import Headers, Replica, ResultCache, Versions
+
+# Tools imports
+from . import init
+
+def request(lag, args):
+	"""Request
+
+	Makes the same calls a cached service request does, reading from the
+	replica with the given lag, and returns the X-Cache header set
+
+	Arguments:
+		lag (uint): The seconds the replica is behind
+		args (dict): The arguments of the request
+
+	Returns:
+		str
+	"""
+
+	# Set the lag as if it was just checked
+	Replica.__dict__['__lag'].update(seconds=lag, checked=time())
+
+	# Look up the result, and if it's not there, store it as read from the
+	#	replica
+	Headers.clear()
+	sKey, mResult = ResultCache.get('cache_check', args, None)
+	if mResult is None:
+		ResultCache.set(sKey, {'rows': [1, 2, 3]}, Replica.custom())
+
+	# Return the header
+	return Headers.pop()['X-Cache']
+
+def run():
+	"""Run
+
+	Makes two identical requests with the replica caught up, and two with it
+	behind, and checks the second one of each
+
+	Returns:
+		int
+	"""
+
+	# Init the modules with the Redis in the config
+	oRedis = StrictRedis(**Conf.get(('redis', 'primary'), {
+		'host': 'localhost',
+		'port': 6379,
+		'db': 0
+	}))
+	Versions.init(oRedis)
+	ResultCache.init(oRedis, {'enabled': True, 'ttl': 60})
+	Replica.init(oRedis, dict(Conf.get(('mysql', 'replica'), {}), lag_check=60))
+	Replica.__dict__['__lag'].update(seconds=0, checked=time())
+	if not Replica.custom():
+		print('No replica in the config')
+		return 1
+
+	# Go through each case
+	iFailed = 0
+	for iLag, sExpected in [[0, 'HIT'], [3, 'MISS']]:
+		dArgs = {'check': str(uuid.uuid4())}
+		lHeaders = [request(iLag, dArgs), request(iLag, dArgs)]
+		bOK = lHeaders == ['MISS', sExpected]
+		if not bOK:
+			iFailed += 1
+		print('lag %d: %s, %s' % (iLag, ', '.join(lHeaders), bOK and 'OK' or 'FAILED'))
+
+	# Return the result
+	return iFailed and 1 or 0
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Load the config
+	init()
+
+	# Run and exit with the result
+	sys.exit(run())
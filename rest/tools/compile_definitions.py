@@ -0,0 +1,96 @@
+# coding=utf8
+""" Compile Definitions
+
+Parses every record definition and generates its config once, and stores the
+results along with the checksum of each JSON file, so that processes starting
+up can load them instead of parsing the JSON again. Must be run again after
+any of the definitions, or Python, FormatOC, or RestOC, change, else the
+changed definitions are parsed as before
+
+	python -m tools.compile_definitions
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import os
+import pickle
+import sys
+from time import perf_counter
+
+# Pip imports
+from FormatOC import Tree
+from RestOC import Record_MySQL
+
+# Record imports
+from records import DEFINITIONS_COMPILED, definition_checksum, \
+					definitions_version
+
+def run():
+	"""Run
+
+	Compiles the definitions and writes the file
+
+	Returns:
+		int
+	"""
+
+	# Go through each definition
+	dDefinitions = {}
+	fParse = 0.0
+	for sFile in sorted(os.listdir('definitions')):
+		if not sFile.endswith('.json'):
+			continue
+		sName = sFile[:-5]
+
+		# Parse it and generate the config, without the DB, which comes from
+		#	the config of the process loading it
+		fStart = perf_counter()
+		dConf = Record_MySQL.Record.generate_config(
+			Tree.fromFile('definitions/%s' % sFile)
+		)
+		fParse += perf_counter() - fStart
+
+		# Store it with the checksum of the JSON
+		dDefinitions[sName] = {
+			'checksum': definition_checksum(sName),
+			'config': dConf
+		}
+
+	# Pickle everything, and make sure it comes back the same before keeping it
+	sData = pickle.dumps({
+		'version': definitions_version(),
+		'definitions': dDefinitions
+	}, pickle.HIGHEST_PROTOCOL)
+	fStart = perf_counter()
+	dLoaded = pickle.loads(sData)
+	fLoad = perf_counter() - fStart
+	for sName, d in dDefinitions.items():
+		if dLoaded['definitions'][sName]['config']['tree'].toDict() != \
+			d['config']['tree'].toDict():
+			print('%s does not survive pickling, nothing written' % sName)
+			return 1
+
+	# Write it to a temporary file and move it in place so that a starting
+	#	process never sees half a file
+	sTemp = '%s.%d' % (DEFINITIONS_COMPILED, os.getpid())
+	with open(sTemp, 'wb') as oF:
+		oF.write(sData)
+	os.replace(sTemp, DEFINITIONS_COMPILED)
+
+	# Notify
+	print('%d definitions compiled to %s (%d bytes)' % (
+		len(dDefinitions), DEFINITIONS_COMPILED, len(sData)
+	))
+	print('parsing: %.2fms, loading: %.2fms' % (fParse * 1000, fLoad * 1000))
+
+	# Return OK
+	return 0
+
+# Only run if called directly
+if __name__ == '__main__':
+	sys.exit(run())
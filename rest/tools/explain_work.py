@@ -0,0 +1,192 @@
+# coding=utf8
+""" Explain Work
+
+Runs EXPLAIN on every statement generated by the Work query methods and fails
+if any of them has to do a full scan of the work table, or, once it's
+partitioned, has to read every partition of it. Pages of work must also be
+read in the order of the index, without sorting the whole range first, so a
+later page is explained and printed as well. Run against a DB with a
+representative amount of data, on small tables MySQL will often prefer a full
+scan regardless of the indexes available
+
+	python -m tools.explain_work
+"""
+
+__author__		= "Chris Nasr"
+__version__		= "1.0.0"
+__maintainer__	= "Chris Nasr"
+__email__		= "chris@ouroboroscoding.com"
+__created__		= "2026-10-17"
+
+# Python imports
+import sys
+from time import time
+
+# Pip imports
+import body
+from RestOC import Record_MySQL
+
+# Record imports
+from records import Client, User, Work, cursor_encode
+
+# Shared imports
+from shared import WorkPartitions
+
+# Tools imports
+from . import init
+
+# The alias used for the work table in all Work queries
+_WORK_ALIAS = 'w'
+
+def explain(select, host, sql, partitions=0, sorted_=False, show=False):
+	"""Explain
+
+	Runs EXPLAIN on the given SQL and returns any rows that indicate a full
+	scan of the work table, or a read of all its partitions
+
+	Arguments:
+		select (callable): The original select method
+		host (str): The host the SQL was run on
+		sql (str): The SQL to explain
+		partitions (uint): Optional, the number of partitions of the work
+			table, 0 if it isn't partitioned
+		sorted_ (bool): Optional, also return the rows that have to sort,
+			for statements that must be read in the order of an index
+		show (bool): Optional, print the plan
+
+	Returns:
+		list
+	"""
+
+	# Fetch the plan
+	lPlan = select(host, 'EXPLAIN %s' % sql, Record_MySQL.ESelect.ALL)
+
+	# If requested, print it
+	if show:
+		for d in lPlan:
+			print('     %s' % ', '.join(
+				'%s=%s' % (k, d[k]) for k in
+				['table', 'type', 'key', 'rows', 'Extra'] if k in d
+			))
+
+	# Return the rows on the work table that use a full scan, weren't pruned
+	#	to the partitions they need, or sort when they shouldn't
+	return [
+		d for d in lPlan
+		if d['table'] == _WORK_ALIAS and (
+			d['type'] == 'ALL' or (
+				partitions and d.get('partitions') and
+				len(d['partitions'].split(',')) >= partitions
+			) or (
+				sorted_ and 'filesort' in (d.get('Extra') or '')
+			)
+		)
+	]
+
+def run():
+	"""Run
+
+	Runs each Work query method, capturing and explaining the SQL generated
+
+	Returns:
+		int
+	"""
+
+	# Store the real select so we can pass through to it
+	fSelect = Record_MySQL.Commands.select
+
+	# The list of statements generated by the current method
+	lStatements = []
+
+	# Capture each statement before running it
+	def capture(host, sql, seltype=Record_MySQL.ESelect.ALL, field=None, errcnt=0):
+		lStatements.append([host, sql])
+		return fSelect(host, sql, seltype, field, errcnt)
+
+	# Get a timeframe of the last month
+	iEnd = int(time())
+	iStart = iEnd - 2592000
+
+	# Find a client and a user to use as arguments
+	dClient = Client.get(raw=['_id'], limit=1)
+	dUser = User.get(raw=['_id'], limit=1)
+	sClient = dClient and dClient['_id'] or body.constants.EMPTY_UUID
+	sUser = dUser and dUser['_id'] or body.constants.EMPTY_UUID
+
+	# Read the first page of the timeframe to get the cursor of the next one
+	lFirst = Work.range(iStart, iEnd, limit=100)
+	sCursor = lFirst and \
+		cursor_encode(lFirst[-1]['end'], lFirst[-1]['_id']) or \
+		cursor_encode(iStart, body.constants.EMPTY_UUID)
+
+	# The methods to check and their arguments, the pages whose plans are
+	#	printed, and the ones that must be read in the order of the index.
+	#	With clients, MySQL may start from the projects and sort the few
+	#	rows that match instead
+	lPages = ['range (later page)', 'range (later page, clients)']
+	lOrdered = ['range (later page)']
+	lMethods = [
+		['by_user', Work.by_user, [sUser, iStart, iEnd]],
+		['by_user (client)', Work.by_user, [sUser, iStart, iEnd, sClient]],
+		['for_invoice', Work.for_invoice, [iStart, iEnd, sClient]],
+		['for_invoices', Work.for_invoices, [iStart, iEnd, [sClient]]],
+		['open_all', Work.open_all, []],
+		['range', Work.range, [iStart, iEnd]],
+		['range (clients)', Work.range, [iStart, iEnd, [sClient]]],
+		['range (later page)', Work.range, [iStart, iEnd, None, 100, sCursor]],
+		['range (later page, clients)', Work.range, [
+			iStart, iEnd, [sClient], 100, sCursor
+		]],
+		['range_grouped', Work.range_grouped, [iStart, iEnd, [sClient]]]
+	]
+
+	# Get the number of partitions of the work table, if it has any
+	iPartitions = len(WorkPartitions.partitions())
+
+	# Keep track of failures
+	iFailed = 0
+
+	# Swap in the capturing select
+	Record_MySQL.Commands.select = capture
+
+	try:
+
+		# Go through each method
+		for sName, fMethod, lArgs in lMethods:
+
+			# Reset the statements and run the method
+			lStatements.clear()
+			fMethod(*lArgs)
+
+			# Go through each statement generated
+			for sHost, sSQL in lStatements:
+
+				# Explain it and look for full scans or unpruned partitions,
+				#	and for pages, print the plan and look for sorts
+				lScans = explain(
+					fSelect, sHost, sSQL, iPartitions,
+					sName in lOrdered, sName in lPages
+				)
+
+				# If there's any, print the plan and mark the failure
+				if lScans:
+					iFailed += 1
+					print('FAIL %s\n%s\n%s\n' % (sName, sSQL, lScans))
+				else:
+					print('OK   %s' % sName)
+
+	# Put the real select back
+	finally:
+		Record_MySQL.Commands.select = fSelect
+
+	# Return the number of failures as the exit code
+	return iFailed and 1 or 0
+
+# Only run if called directly
+if __name__ == '__main__':
+
+	# Init the DB
+	init(dbs=['primary'])
+
+	# Run and exit with the result
+	sys.exit(run())
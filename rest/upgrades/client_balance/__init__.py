@@ -0,0 +1,4 @@
+# Import update files
+from . import create_client_balance
+
+modules = [ create_client_balance ]
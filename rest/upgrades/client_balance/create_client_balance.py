@@ -0,0 +1,16 @@
+# coding=utf8
+""" Create the client_balance table and fill it from the existing invoices and
+payments """
+
+# Record imports
+from records import ClientBalance
+
+def run():
+
+	# Create the table
+	ClientBalance.table_create()
+
+	# Generate the totals from all the existing invoices and payments
+	ClientBalance.rebuild()
+
+	return True
@@ -0,0 +1,4 @@
+# Import update files
+from . import alter_invoice_payment, alter_work
+
+modules = [ alter_invoice_payment, alter_work ]
@@ -0,0 +1,35 @@
+# coding=utf8
+""" Alter the invoice and payment tables to index them by creation time, on
+its own and by client, so that pages of them can be read from the index """
+
+# Pip imports
+from RestOC import Record_MySQL
+
+# Record imports
+from records import Invoice, Payment
+
+def run():
+
+	# Go through each table
+	for o in [Invoice, Payment]:
+
+		# Get the structure
+		dStruct = o.struct()
+
+		# Add the new indexes and drop the client one, which is the start of
+		#	the new client_created index. Using INPLACE with no lock allows
+		#	reads and writes to continue while the indexes are built
+		Record_MySQL.Commands.execute(
+			dStruct['host'],
+			"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+			"ADD INDEX `_created` (`_created`),\n" \
+			"ADD INDEX `client_created` (`client`, `_created`),\n" \
+			"DROP INDEX `client`,\n" \
+			"ALGORITHM=INPLACE, LOCK=NONE" % {
+				'db': dStruct['db'],
+				'table': dStruct['table']
+			}
+		)
+
+	# Return OK
+	return True
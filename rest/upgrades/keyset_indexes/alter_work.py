@@ -0,0 +1,31 @@
+# coding=utf8
+""" Alter the work table to index the end of work by ID, the order pages of it
+are read in, so that each page can be read from the index """
+
+# Pip imports
+from RestOC import Record_MySQL
+
+# Record imports
+from records import Work
+
+def run():
+
+	# Get the work structure
+	dStruct = Work.struct()
+
+	# Add the new index and drop the end one, which is the start of it. Using
+	#	INPLACE with no lock allows reads and writes to continue while the
+	#	index is built
+	Record_MySQL.Commands.execute(
+		dStruct['host'],
+		"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+		"ADD INDEX `end_id` (`end`, `_id`),\n" \
+		"DROP INDEX `end`,\n" \
+		"ALGORITHM=INPLACE, LOCK=NONE" % {
+			'db': dStruct['db'],
+			'table': dStruct['table']
+		}
+	)
+
+	# Return OK
+	return True
@@ -0,0 +1,4 @@
+# Import update files
+from . import create_work_daily
+
+modules = [ create_work_daily ]
@@ -0,0 +1,15 @@
+# coding=utf8
+""" Create the work_daily table and fill it from the existing work """
+
+# Record imports
+from records import WorkDaily
+
+def run():
+
+	# Create the table
+	WorkDaily.table_create()
+
+	# Generate the totals from all the existing work
+	WorkDaily.rebuild()
+
+	return True
@@ -0,0 +1,4 @@
+# Import version files
+from . import alter_work
+
+modules = [ alter_work ]
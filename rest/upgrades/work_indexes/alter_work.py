@@ -0,0 +1,33 @@
+# coding=utf8
+""" Alter the work table to index the end of work by project and user """
+
+# Pip imports
+from RestOC import Record_MySQL
+
+# Record imports
+from records import Work
+
+def run():
+
+	# Get the work structure
+	dStruct = Work.struct()
+
+	# Add the new indexes and drop the single column ones they replace. Using
+	#	INPLACE with no lock allows reads and writes to continue while the
+	#	indexes are built
+	Record_MySQL.Commands.execute(
+		dStruct['host'],
+		"ALTER TABLE `%(db)s`.`%(table)s`\n" \
+		"ADD INDEX `end` (`end`),\n" \
+		"ADD INDEX `project_end` (`project`, `end`),\n" \
+		"ADD INDEX `user_end` (`user`, `end`),\n" \
+		"DROP INDEX `project`,\n" \
+		"DROP INDEX `user`,\n" \
+		"ALGORITHM=INPLACE, LOCK=NONE" % {
+			'db': dStruct['db'],
+			'table': dStruct['table']
+		}
+	)
+
+	# Return OK
+	return True
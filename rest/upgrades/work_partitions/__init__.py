@@ -0,0 +1,4 @@
+# Import update files
+from . import partition_work
+
+modules = [ partition_work ]
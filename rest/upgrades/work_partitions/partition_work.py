@@ -0,0 +1,19 @@
+# coding=utf8
+""" Partition the work table by the month work ended, and create its archive.
+The table is copied, so writes to work are blocked until it's done """
+
+# Pip imports
+from RestOC import Conf
+
+# Shared imports
+from shared import WorkPartitions
+
+def run():
+
+	# Partition the table through the months ahead the cron keeps
+	WorkPartitions.convert(Conf.get(('work', 'partitions_ahead'), 3))
+
+	# Create the empty archive
+	WorkPartitions.archive_create()
+
+	return True
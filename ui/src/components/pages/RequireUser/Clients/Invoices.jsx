@@ -83,6 +83,10 @@ export default function Invoices(props) {
 		}, error => {
 			if(error.code === 1100) {
 				events.get('error').trigger('No such invoice');
+			} else if(error.code === 2104) {
+				events.get('error').trigger('The PDF is still being generated, please try again in a moment');
+			} else if(error.code === 2105) {
+				events.get('error').trigger('The PDF failed to generate: ' + error.msg);
 			} else {
 				events.get('error').trigger(error);
 			}